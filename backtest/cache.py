@@ -0,0 +1,211 @@
+# backtest/cache.py
+
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import importlib
+import numpy as np
+
+RESULT_CACHE_DIR = "backtest/cache"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+EVICT_TO_FRACTION = 0.9      # evict down to 90% of the bound so every put doesn't rescan
+# Code every backtest result depends on besides the strategies themselves
+ENGINE_MODULES = ("backtest.kernel", "backtest.metrics", "backtest.event_backtester", "core.risk_manager",
+                  "core.indicators", "core.strategy_engine", "ml.selector_predictor")
+
+_file_digests = {}
+
+
+def file_digest(path):
+    """
+    Content hash of a file (None when missing), memoized on mtime and size.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_digests.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _file_digests[path] = (stamp, digest)
+    return digest
+
+
+def module_digest(name):
+    module = sys.modules.get(name) or importlib.import_module(name)
+    return file_digest(module.__file__)
+
+
+def strategy_digest(strategy):
+    """
+    Name, params and source of a strategy instance, including the modules of
+    its base classes, so editing one strategy only changes its own keys.
+    """
+    cls = type(strategy)
+    modules = sorted({c.__module__ for c in cls.__mro__ if c.__module__ != "builtins"})
+    return {
+        "name": strategy.name(),
+        "params": getattr(strategy, "params", {}),
+        "source": [module_digest(m) for m in modules],
+    }
+
+
+def data_digest(arrays):
+    """
+    Hash of the candle arrays (open/high/low/close/volume), which also pins the
+    data range.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for col in ("open", "high", "low", "close", "volume"):
+        if col in arrays:
+            h.update(np.ascontiguousarray(arrays[col], dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def risk_config():
+    from core.risk_manager import RiskManager
+    return {name: value for name, value in vars(RiskManager).items() if name.isupper()}
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        return hashlib.blake2b(np.ascontiguousarray(value).tobytes(), digest_size=16).hexdigest()
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+
+def backtest_key(kind, strategies, data, **settings):
+    """
+    Content address of a backtest: what is computed (kind), the strategies'
+    source and params, the engine code, RiskManager's config, the candles
+    (arrays or a precomputed data_digest) and any run settings.
+    """
+    parts = {
+        "kind": kind,
+        "strategies": [strategy_digest(s) for s in strategies],
+        "engine": [module_digest(m) for m in ENGINE_MODULES],
+        "risk": risk_config(),
+        "data": data if isinstance(data, str) else data_digest(data),
+        "settings": settings,
+    }
+    encoded = json.dumps(parts, sort_keys=True, default=_encode)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Pickled backtest results on disk under their content key, bounded to
+    max_bytes by evicting the least recently used entries (hits touch the
+    file's mtime). Writes are atomic, so pool workers can share one cache.
+    """
+
+    def __init__(self, root=RESULT_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size = None
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.pkl")
+
+    def _entries(self):
+        entries = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".pkl"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return default
+        except Exception:
+            # Truncated or from an incompatible version: drop it and recompute
+            self._remove(path)
+            self.stats["misses"] += 1
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats["hits"] += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, path)
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def evict(self, target=None):
+        target = int(self.max_bytes * EVICT_TO_FRACTION) if target is None else target
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                self.stats["evicted"] += 1
+        self._size = total
+
+    def clear(self):
+        self.evict(target=0)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest result cache")
+    parser.add_argument("--root", default=RESULT_CACHE_DIR)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.root)
+    if args.clear:
+        cache.clear()
+    entries = cache._entries()
+    newest = max((mtime for mtime, _, _ in entries), default=None)
+    print(f"[🗄️] {len(entries)} cached results, {sum(size for _, size, _ in entries) / 1e6:.1f} MB in {args.root}"
+          + (f", last used {time.ctime(newest)}" if newest else ""))
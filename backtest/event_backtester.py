@@ -0,0 +1,347 @@
+# backtest/event_backtester.py
+
+import math
+import random
+import argparse
+import numpy as np
+import pandas as pd
+from config import TRAILING_STOP
+from backtest.metrics import summarize, DEFAULT_BALANCE, FEE_RATE
+from core.indicators import atr as atr_series
+from core.risk_manager import RiskManager, trailing_stop_update
+from core.strategy_engine import StrategyEngine
+from core.strategy_registry import get_registry
+from data.historical_loader import load_candles_csv, MS_PER_CANDLE
+from ml.predictor import PredictMarketDirection
+from ml.selector_predictor import zone_codes
+from strategies.base import as_arrays, SIGNAL_NAMES
+
+COOLDOWN_TP_SECONDS = 3 * 60    # same as main.py's cooldown_tp / cooldown_sl
+COOLDOWN_SL_SECONDS = 6 * 60
+ZONE_LOOKBACK = 20
+
+LONG, SHORT = 1, -1
+
+
+class ReplayStrategyEngine(StrategyEngine):
+    """
+    StrategyEngine whose inputs are computed once for the whole history
+    (ML probabilities, zones, selector scores, strategy signals) and looked up
+    per bar, so the real decision flow runs without rebuilding DataFrames.
+    Call at(i) before select_strategy_and_generate_signal().
+    """
+
+    def __init__(self, symbol, timeframe, data: pd.DataFrame, ml_predictor=None, strategies=None,
+                 strategy_scores=None):
+        ml_predictor = ml_predictor or PredictMarketDirection(symbol=symbol, timeframe=timeframe)
+        strategies = strategies if strategies is not None else get_registry().get_strategies(symbol, timeframe)
+        super().__init__(symbol, timeframe, data, ml_predictor=ml_predictor, strategies=strategies, verbose=False)
+        self.i = len(data) - 1
+        self.strategy_scores = strategy_scores if strategy_scores is not None else StrategyEngine._load_strategy_scores(self)
+
+        arrays = as_arrays(data)
+        close = arrays["close"]
+        self.ml_probs = ml_predictor.predict_proba_batch(data)
+        self.zone_codes = zone_codes(close, ZONE_LOOKBACK)
+        self.zones = np.array(["Bearish", "Sideways", "Bullish"])[self.zone_codes + 1]
+        self.signals = {s.name(): s.generate_signals(arrays) for s in self.strategies}
+        self._selector_scores = None
+        self._selector_error = None
+
+    def at(self, i):
+        # Live engines are built fresh every cycle, so per-decision state starts empty
+        self.i = i
+        self.last_ml_confidence = None
+        self.last_market_zone = None
+        self.last_strategy_name = None
+        return self
+
+    def _predict_ml(self):
+        probs = None if self.ml_probs is None else self.ml_probs[self.i]
+        if probs is None or np.isnan(probs[0]):
+            return "HOLD", -1.0
+        return self.ml_predictor.get_signal_from_probs(probs), float(probs.max())
+
+    def _market_zone(self):
+        if self.i < ZONE_LOOKBACK - 1:
+            raise IndexError(f"need {ZONE_LOOKBACK} candles for the zone, have {self.i + 1}")
+        return str(self.zones[self.i])
+
+    def _score_selector(self):
+        # Every bar × strategy in one booster call. Zones of warm-up bars are
+        # Sideways here, which is also the live fallback when zone detection fails.
+        from ml.selector_predictor import get_selector, market_feature_matrix
+        arrays = as_arrays(self.data)
+        features = market_feature_matrix(arrays["open"], arrays["high"], arrays["low"], arrays["close"],
+                                         arrays["volume"], zones=self.zone_codes)
+        self.strategy_names = [s.name() for s in self.strategies]
+        self._selector_scores = get_selector().score_matrix(features, self.strategy_names)
+
+    def _select_with_model(self, zone):
+        if self._selector_scores is None and self._selector_error is None:
+            try:
+                self._score_selector()
+            except Exception as e:
+                self._selector_error = e
+        if self._selector_error is not None:
+            raise self._selector_error
+
+        probs = self._selector_scores[self.i]
+        if np.all(np.isnan(probs)):
+            raise ValueError(f"Selector knows none of the strategies: {self.strategy_names}")
+        best_idx = int(np.nanargmax(probs))
+        return self.strategy_names[best_idx], float(probs[best_idx])
+
+    def _strategy_signal(self, strategy):
+        return SIGNAL_NAMES[int(self.signals[strategy.name()][self.i])]
+
+    def _load_strategy_scores(self):
+        return self.strategy_scores
+
+
+class EventBacktester:
+    """
+    Replays candles bar by bar through the live decision path: StrategyEngine
+    for the signal, RiskManager sizing with the engine's zone/confidence, the
+    post-close cooldown and the trailing-stop rule, against a simulated
+    exchange holding one bracket position at a time.
+
+    Fills: entries at the signal candle's close; SL/TP are checked from the next
+    candle on, at the open when it gaps through a level, and the SL wins when
+    one candle touches both (or as stored 1m candles order them, given a
+    resolver). The trailing stop moves on each candle's close.
+    """
+
+    def __init__(self, symbol, timeframe, candles: pd.DataFrame, balance=DEFAULT_BALANCE, fee_rate=FEE_RATE,
+                 compound=False, trailing_config=None, engine=None, seed=None, resolver=None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.candles = candles
+        self.initial_balance = balance
+        self.fee_rate = fee_rate
+        self.compound = compound
+        self.resolver = resolver  # IntrabarResolver for candles touching both SL and TP
+        self.trailing_config = trailing_config if trailing_config is not None else TRAILING_STOP
+        if seed is not None:
+            random.seed(seed)  # _select_best_strategy picks at random on a short journal
+        self.engine = engine or ReplayStrategyEngine(symbol, timeframe, candles)
+
+        bar_seconds = MS_PER_CANDLE[timeframe] / 1000
+        self.cooldown_bars = {
+            "TP": max(1, math.ceil(COOLDOWN_TP_SECONDS / bar_seconds)),
+            "SL": max(1, math.ceil(COOLDOWN_SL_SECONDS / bar_seconds)),
+        }
+
+        arrays = as_arrays(candles)
+        self.times = candles.index.values.astype("datetime64[ms]").astype(np.int64)
+        self.open, self.high, self.low, self.close = (arrays[c] for c in ("open", "high", "low", "close"))
+        self.atr = atr_series(self.high, self.low, self.close)
+        self.volatility = pd.Series(self.close).pct_change().rolling(10).std().to_numpy()
+
+    def _size(self, i, signal, balance):
+        engine = self.engine
+        confidence = engine.last_ml_confidence if engine.last_ml_confidence is not None else 1.0
+        zone = engine.last_market_zone if engine.last_market_zone is not None else "Unknown"
+        atr = self.atr[i] if i >= 13 else None
+        qty, leverage, sl, tp = RiskManager.position_from_state(
+            signal, self.close[i], atr, self.volatility[i], balance, zone, confidence, verbose=False
+        )
+        return qty, leverage, sl, tp, zone, confidence
+
+    def _exit_price(self, i, side, sl, tp):
+        o, h, l = self.open[i], self.high[i], self.low[i]
+        if side == LONG:
+            if o <= sl:
+                return o, "SL"
+            if o >= tp:
+                return o, "TP"
+            sl_hit, tp_hit = l <= sl, h >= tp
+        else:
+            if o >= sl:
+                return o, "SL"
+            if o <= tp:
+                return o, "TP"
+            sl_hit, tp_hit = h >= sl, l <= tp
+
+        if sl_hit and tp_hit and self.resolver is not None:
+            result, price = self.resolver.resolve(self.times[i], side, sl, tp)
+            return price, result
+        if sl_hit:
+            return sl, "SL"
+        if tp_hit:
+            return tp, "TP"
+        return None, None
+
+    def run(self, start=0):
+        """
+        Returns {"trades": [dict], "equity": np.ndarray per candle, "summary": dict}.
+        """
+        n = len(self.close)
+        equity = np.full(n, float(self.initial_balance))
+        trades = []
+        balance = self.initial_balance
+        position = None
+        next_entry = start
+        engine = self.engine
+        trailing = self.trailing_config.get("enabled", True)
+
+        for i in range(start, n):
+            close = self.close[i]
+
+            if position is not None and i > position["entry_bar"]:
+                exit_price, result = self._exit_price(i, position["side"], position["sl"], position["tp"])
+                if exit_price is not None:
+                    if result == "SL" and position["trailed"]:
+                        result = "TRAILING_SL"
+                    balance += self._close(position, i, exit_price, result, trades)
+                    next_entry = i + self.cooldown_bars["SL" if trades[-1]["pnl"] < 0 else "TP"]
+                    position = None
+                elif trailing:
+                    action, _, new_sl = trailing_stop_update(
+                        position["signal"], position["entry"], close, position["sl"], position["tp"],
+                        self.trailing_config
+                    )
+                    if action == "update":
+                        position["sl"] = new_sl
+                        position["trailed"] = True
+
+            if position is None and i >= next_entry:
+                signal = engine.at(i).select_strategy_and_generate_signal()
+                if signal in ("LONG", "SHORT"):
+                    sizing_balance = balance if self.compound else self.initial_balance
+                    qty, leverage, sl, tp, zone, confidence = self._size(i, signal, sizing_balance)
+                    if qty > 0:
+                        position = {
+                            "signal": signal, "side": LONG if signal == "LONG" else SHORT,
+                            "entry_bar": i, "entry": close, "qty": qty, "leverage": leverage,
+                            "sl": sl, "tp": tp, "initial_sl": sl, "trailed": False,
+                            "strategy": engine.last_strategy_name or "ML", "zone": zone, "confidence": confidence,
+                        }
+
+            if position is None:
+                equity[i] = balance
+            else:
+                equity[i] = balance + position["side"] * (close - position["entry"]) * position["qty"] \
+                            - self.fee_rate * position["entry"] * position["qty"]
+
+        if position is not None:
+            balance += self._close(position, n - 1, self.close[-1], "END", trades)
+            equity[-1] = balance
+
+        summary = summarize([t["pnl"] for t in trades], equity, self.initial_balance)
+        return {"trades": trades, "equity": equity, "summary": summary}
+
+    def _close(self, position, i, exit_price, result, trades):
+        qty = position["qty"]
+        fees = self.fee_rate * (position["entry"] + exit_price) * qty
+        pnl = position["side"] * (exit_price - position["entry"]) * qty - fees
+        times = self.candles.index
+        trades.append({
+            "symbol": self.symbol,
+            "side": position["signal"],
+            "strategy": position["strategy"],
+            "entry_time": times[position["entry_bar"]],
+            "exit_time": times[i],
+            "entry": position["entry"],
+            "exit": exit_price,
+            "qty": qty,
+            "leverage": position["leverage"],
+            "sl": position["initial_sl"],
+            "tp": position["tp"],
+            "zone": position["zone"],
+            "confidence": position["confidence"],
+            "result": result,
+            "bars": i - position["entry_bar"],
+            "fees": fees,
+            "pnl": pnl,
+        })
+        return pnl
+
+
+def result_key(symbol, timeframe, candles, **settings):
+    """
+    Result-cache key of an EventBacktester run with the live engine inputs:
+    every registered strategy, the ML and selector models and the strategy
+    performance journal, plus the candles and run settings. Without a seed a
+    short journal makes runs random; use a seed for reproducible cached runs.
+    """
+    from backtest.cache import backtest_key, file_digest
+    from core.performance_logger import LOG_FILE
+    from ml.predictor import resolve_model_path
+    from ml.selector_predictor import SELECTOR_MODEL_PATH, SELECTOR_ENCODER_PATH
+
+    settings = {"balance": DEFAULT_BALANCE, "fee_rate": FEE_RATE, "compound": False, "trailing_config": TRAILING_STOP,
+                "seed": None, "intrabar": None, **settings}
+    models = [file_digest(p) for p in (resolve_model_path(symbol, timeframe), SELECTOR_MODEL_PATH,
+                                       SELECTOR_ENCODER_PATH, LOG_FILE)]
+    return backtest_key("event", get_registry().get_strategies(symbol, timeframe), as_arrays(candles),
+                        symbol=symbol, timeframe=timeframe, models=models, **settings)
+
+
+def run_backtest(path, symbol, timeframe, cache=None, **kwargs):
+    """
+    Event-driven run over a candle CSV, served from a ResultCache when given
+    and the code, models, data and settings are unchanged. Runs without a
+    seed aren't reproducible, so they are never cached.
+    """
+    candles = load_candles_csv(path)
+    if cache is None or kwargs.get("engine") is not None or kwargs.get("seed") is None:
+        return EventBacktester(symbol, timeframe, candles, **kwargs).run()
+    settings = {k: v for k, v in kwargs.items() if k != "resolver"}
+    settings["intrabar"] = kwargs["resolver"].cache_tag() if kwargs.get("resolver") is not None else None
+    key = result_key(symbol, timeframe, candles, **settings)
+    return cache.get_or_compute(key, lambda: EventBacktester(symbol, timeframe, candles, **kwargs).run())
+
+
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description="Replay stored candles through StrategyEngine and RiskManager")
+    parser.add_argument("candles", nargs="?", default="ETHUSDT_1h.csv")
+    parser.add_argument("--symbol", default="ETHUSDT")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--balance", type=float, default=DEFAULT_BALANCE)
+    parser.add_argument("--fee", type=float, default=FEE_RATE)
+    parser.add_argument("--compound", action="store_true", help="size from running balance instead of a fixed one")
+    parser.add_argument("--seed", type=int, default=None, help="fix the random strategy pick; only seeded runs are cached")
+    parser.add_argument("--trades-csv", default=None)
+    parser.add_argument("--intrabar", action="store_true", help="order SL/TP inside candles from stored 1m data")
+    parser.add_argument("--no-cache", action="store_true", help="recompute even when a cached result exists")
+    args = parser.parse_args()
+
+    from backtest.cache import ResultCache
+    cache = ResultCache()
+    started = time.perf_counter()
+    candles = load_candles_csv(args.candles)
+    resolver = None
+    if args.intrabar:
+        from backtest.intrabar import IntrabarResolver
+        from data.candle_store import CandleStore
+        resolver = IntrabarResolver(CandleStore(), args.symbol, args.timeframe)
+    settings = dict(balance=args.balance, fee_rate=args.fee, compound=args.compound, seed=args.seed)
+    # Without a seed the run isn't reproducible: neither served from nor stored in the cache
+    use_cache = not args.no_cache and args.seed is not None
+    cache_key = result_key(args.symbol, args.timeframe, candles,
+                           intrabar=resolver.cache_tag() if resolver else None, **settings)
+    report = cache.get(cache_key) if use_cache else None
+    cached = report is not None
+    if not cached:
+        backtester = EventBacktester(args.symbol, args.timeframe, candles, resolver=resolver, **settings)
+        prepared = time.perf_counter()
+        report = backtester.run()
+        finished = time.perf_counter()
+        if use_cache:
+            cache.put(cache_key, report)
+
+    for key, value in report["summary"].items():
+        print(f"{key:>18}: {value:.4f}" if isinstance(value, float) else f"{key:>18}: {value}")
+    if cached:
+        print(f"[🗄️] Cached result {cache_key[:12]} (rerun with --no-cache to recompute)")
+    else:
+        print(f"[⏱️] {len(candles)} candles: setup {prepared - started:.2f}s, "
+              f"replay {finished - prepared:.3f}s ({len(candles) / max(finished - prepared, 1e-9):,.0f} bars/s)")
+    if resolver:
+        print(f"[🔬] Intrabar resolution: {resolver.stats}")
+    if args.trades_csv:
+        pd.DataFrame(report["trades"]).to_csv(args.trades_csv, index=False)
+        print(f"[📝] Trades written to {args.trades_csv}")
@@ -0,0 +1,82 @@
+# backtest/intrabar.py
+
+import numpy as np
+from data.historical_loader import MS_PER_CANDLE
+
+FINE_INTERVAL = "1m"
+
+
+class IntrabarResolver:
+    """
+    Decides which of SL and TP was hit first on a candle whose range contains
+    both, by walking the stored 1m candles inside it. Only ambiguous candles
+    get here, and the 1m history is memory-mapped from the candle store on
+    first use, so unambiguous bars cost nothing. Falls back to SL first when
+    1m data is missing or one 1m candle still spans both levels.
+    """
+
+    def __init__(self, store, symbol, interval, fine_interval=FINE_INTERVAL):
+        self.store = store
+        self.symbol = symbol
+        self.bar_ms = MS_PER_CANDLE[interval]
+        self.fine_interval = fine_interval
+        self.available = None
+        self.stats = {"resolved": 0, "tp_first": 0, "still_ambiguous": 0, "no_data": 0}
+
+    def cache_tag(self):
+        """
+        What the resolved results depend on besides the coarse candles, for
+        result-cache keys: the fine interval and the content of its stored
+        candles (None digests when missing).
+        """
+        from backtest.cache import file_digest
+        return [self.fine_interval] + [file_digest(p) for p in self.store.files(self.symbol, self.fine_interval)]
+
+    def _fine(self, bar_open_ms):
+        if self.available is None:
+            self.available = self.store.has(self.symbol, self.fine_interval)
+        if not self.available:
+            return None
+        _, arrays = self.store.load_range(self.symbol, self.fine_interval, bar_open_ms, bar_open_ms + self.bar_ms)
+        return arrays if len(arrays["close"]) else None
+
+    def resolve(self, bar_open_ms, side, sl, tp):
+        """
+        ("SL" | "TP", fill price) for a position of side +1/-1 on the candle
+        opening at bar_open_ms.
+        """
+        fine = self._fine(int(bar_open_ms))
+        if fine is None:
+            self.stats["no_data"] += 1
+            return "SL", sl
+
+        o, h, l = fine["open"], fine["high"], fine["low"]
+        if side > 0:
+            sl_hit, tp_hit = l <= sl, h >= tp
+        else:
+            sl_hit, tp_hit = h >= sl, l <= tp
+        hit = sl_hit | tp_hit
+        if not hit.any():
+            # 1m data disagrees with the coarse candle; keep the conservative answer
+            self.stats["no_data"] += 1
+            return "SL", sl
+
+        k = int(hit.argmax())
+        if sl_hit[k] and tp_hit[k]:
+            self.stats["still_ambiguous"] += 1
+            return "SL", sl
+
+        self.stats["resolved"] += 1
+        if sl_hit[k]:
+            return "SL", (o[k] if side * (o[k] - sl) <= 0 else sl)
+        self.stats["tp_first"] += 1
+        return "TP", (o[k] if side * (o[k] - tp) >= 0 else tp)
+
+    def resolve_many(self, bar_open_ms, side, sl, tp):
+        """
+        Vectors of reasons ("SL"/"TP") and prices for several ambiguous candles.
+        """
+        results = [self.resolve(t, s, a, b) for t, s, a, b in zip(bar_open_ms, side, sl, tp)]
+        reasons = np.array([r for r, _ in results], dtype=object)
+        prices = np.array([p for _, p in results], dtype=np.float64)
+        return reasons, prices
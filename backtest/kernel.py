@@ -0,0 +1,204 @@
+# backtest/kernel.py
+
+import argparse
+import numpy as np
+from backtest.metrics import summarize, DEFAULT_BALANCE, FEE_RATE
+from core.indicators import atr as atr_series
+from core.risk_manager import RiskManager
+from ml.selector_predictor import zone_codes
+from strategies.base import as_arrays
+
+EXIT_SL, EXIT_TP, EXIT_END = 0, 1, 2
+EXIT_NAMES = {EXIT_SL: "SL", EXIT_TP: "TP", EXIT_END: "END"}
+FIRST_WINDOW = 32            # bars scanned per entry in the first pass, doubled for trades still open
+MAX_BLOCK_CELLS = 1 << 22    # entries × bars compared per block, bounds memory on long histories
+
+# Same fill rules as the event backtester: enter at the signal candle's close,
+# check SL/TP from the next candle, fill at the open when it gaps through a
+# level, SL first when one candle touches both unless an IntrabarResolver
+# orders the two from 1m candles.
+
+
+def first_barrier(entry_bar, side, sl, tp, open_, high, low, close, times=None, resolver=None):
+    """
+    Exit bar, price and reason (EXIT_*) for every entry, resolved with
+    windowed array comparisons instead of walking bars. Entries that never
+    hit a level exit at the last close with EXIT_END. With an IntrabarResolver
+    (and candle open times), candles touching both levels are decided from 1m data.
+    """
+    n = len(close)
+    m = len(entry_bar)
+    exit_bar = np.full(m, n - 1, dtype=np.int64)
+    exit_price = np.full(m, close[-1] if n else np.nan)
+    reason = np.full(m, EXIT_END, dtype=np.int8)
+
+    pending = np.arange(m)
+    start = np.asarray(entry_bar, dtype=np.int64) + 1
+    window = FIRST_WINDOW
+    while pending.size:
+        rows = max(1, MAX_BLOCK_CELLS // window)
+        unresolved = []
+        for b in range(0, pending.size, rows):
+            idx = pending[b:b + rows]
+            bars = start[idx, None] + np.arange(window)
+            inside = bars < n
+            bars = np.minimum(bars, n - 1)
+            s = side[idx, None]
+            sl_i, tp_i = sl[idx, None], tp[idx, None]
+            lo, hi = low[bars], high[bars]
+            long_ = s > 0
+            sl_hit = np.where(long_, lo <= sl_i, hi >= sl_i) & inside
+            tp_hit = np.where(long_, hi >= tp_i, lo <= tp_i) & inside
+            hit = sl_hit | tp_hit
+
+            found = hit.any(axis=1)
+            rows_hit = np.flatnonzero(found)
+            first = hit[rows_hit].argmax(axis=1)
+            j = bars[rows_hit, first]
+            touched_sl = sl_hit[rows_hit, first]
+            k = idx[rows_hit]
+            s, o = side[k], open_[j]
+            gap_sl = s * (o - sl[k]) <= 0
+            gap_tp = s * (o - tp[k]) >= 0
+            exit_bar[k] = j
+            exit_price[k] = np.select([gap_sl, gap_tp, touched_sl], [o, o, sl[k]], tp[k])
+            reason[k] = np.select([gap_sl, gap_tp, touched_sl], [EXIT_SL, EXIT_TP, EXIT_SL], EXIT_TP)
+
+            if resolver is not None:
+                ambiguous = np.flatnonzero(touched_sl & tp_hit[rows_hit, first] & ~gap_sl & ~gap_tp)
+                if ambiguous.size:
+                    a = k[ambiguous]
+                    reasons, prices = resolver.resolve_many(times[j[ambiguous]], side[a], sl[a], tp[a])
+                    exit_price[a] = prices
+                    reason[a] = np.where(reasons == "TP", EXIT_TP, EXIT_SL)
+
+            # Still open and there are bars left past this window
+            missed = idx[~found]
+            unresolved.append(missed[start[missed] + window < n])
+        pending = np.concatenate(unresolved) if unresolved else pending[:0]
+        start[pending] += window
+        window *= 2
+    return exit_bar, exit_price, reason
+
+
+def chain_trades(entry_bar, exit_bar, cooldown_bars=1):
+    """
+    Indexes of the entries actually taken with one position at a time: after an
+    exit at bar j the next entry is the first signal at or after j + cooldown_bars.
+    Loops over trades, not bars.
+    """
+    nxt = np.searchsorted(entry_bar, exit_bar + cooldown_bars, side="left").tolist()
+    taken = []
+    k, m = 0, len(entry_bar)
+    while k < m:
+        taken.append(k)
+        k = nxt[k]
+    return np.array(taken, dtype=np.int64)
+
+
+def backtest_signals(open_, high, low, close, signals, zones=None, confidence=1.0, atr=None,
+                     balance=DEFAULT_BALANCE, fee_rate=FEE_RATE, cooldown_bars=1, times=None, resolver=None):
+    """
+    Bracket-order backtest of per-bar entry signals (SIGNAL_LONG/SHORT/HOLD):
+    RiskManager's ATR SL/TP with zone and confidence multipliers, risk-based
+    qty on a fixed balance, one position at a time, fees on both sides.
+    zones: per-bar ZONE_CODES or names (None = no zone adjustment);
+    confidence: scalar or per-bar; resolver + times (open ms per candle):
+    intrabar SL/TP ordering. Returns per-trade arrays, a realized equity
+    curve and a summary.
+    """
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    n = len(close)
+    atr = atr_series(high, low, close) if atr is None else np.asarray(atr, dtype=np.float64)
+
+    candidates = np.flatnonzero(np.asarray(signals)[:n - 1] != 0)
+    side = np.asarray(signals)[candidates].astype(np.float64)
+    zone = None if zones is None else np.asarray(zones)[candidates]
+    conf = np.asarray(confidence, dtype=np.float64)
+    conf = np.full(len(candidates), float(conf)) if conf.ndim == 0 else conf[candidates]
+
+    sl_mult, tp_mult = RiskManager.sl_tp_multiplier_arrays(zone, conf)
+    entry = close[candidates]
+    sl, tp = RiskManager.bracket_levels(side, entry, atr[candidates], sl_mult, tp_mult)
+
+    exit_bar, exit_price, reason = first_barrier(candidates, side, sl, tp, open_, high, low, close, times, resolver)
+    taken = chain_trades(candidates, exit_bar, cooldown_bars)
+
+    entry, side, sl, tp = entry[taken], side[taken], sl[taken], tp[taken]
+    exit_bar, exit_price, reason = exit_bar[taken], exit_price[taken], reason[taken]
+    qty = balance * RiskManager.MAX_RISK_PCT / np.abs(entry - sl)
+    fees = fee_rate * (entry + exit_price) * qty
+    pnl = side * (exit_price - entry) * qty - fees
+
+    equity = balance + np.cumsum(np.bincount(exit_bar, weights=pnl, minlength=n))
+    return {
+        "entry_bar": candidates[taken], "exit_bar": exit_bar, "side": side.astype(np.int8),
+        "entry": entry, "exit": exit_price, "sl": sl, "tp": tp, "qty": qty,
+        "fees": fees, "pnl": pnl, "reason": reason,
+        "equity": equity,
+        "summary": summarize(pnl, equity, balance),
+    }
+
+
+def backtest_strategy(strategy, candles, zones="auto", confidence=1.0, **kwargs):
+    """
+    Runs a strategy's vectorized signals through the kernel. By default zones are
+    the 20-bar trend zones and confidence 1.0, which is what the live sizing gets
+    on the strategy path.
+    """
+    arrays = as_arrays(candles)
+    signals = strategy.generate_signals(arrays)
+    if isinstance(zones, str) and zones == "auto":
+        zones = zone_codes(arrays["close"])
+    return backtest_signals(arrays["open"], arrays["high"], arrays["low"], arrays["close"], signals,
+                            zones=zones, confidence=confidence, **kwargs)
+
+
+def summary_key(strategy, data, fee_rate=FEE_RATE, intrabar=None):
+    """
+    Result-cache key of backtest_strategy(...)["summary"] with default zones,
+    confidence and ATR; shared by the CLI and the sweep runner. data: candle
+    arrays or their data_digest; intrabar: the resolver's cache_tag(), if any.
+    """
+    from backtest.cache import backtest_key
+    return backtest_key("kernel-summary", [strategy], data, fee_rate=fee_rate, intrabar=intrabar)
+
+
+if __name__ == "__main__":
+    import time
+    from core.strategy_registry import get_registry
+    from data.historical_loader import load_candles_csv
+
+    parser = argparse.ArgumentParser(description="Vectorized bracket-order backtest of every strategy")
+    parser.add_argument("candles", nargs="?", default="ETHUSDT_1h.csv")
+    parser.add_argument("--symbol", default="ETHUSDT")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--fee", type=float, default=FEE_RATE)
+    parser.add_argument("--intrabar", action="store_true", help="order SL/TP inside candles from stored 1m data")
+    parser.add_argument("--no-cache", action="store_true", help="recompute even when a cached result exists")
+    args = parser.parse_args()
+
+    from backtest.cache import ResultCache, data_digest
+    cache = ResultCache()
+    candles = load_candles_csv(args.candles)
+    times = candles.index.values.astype("datetime64[ms]").astype(np.int64)
+    digest = data_digest(as_arrays(candles))
+    for strategy in get_registry().get_strategies(args.symbol, args.timeframe):
+        resolver = None
+        if args.intrabar:
+            from backtest.intrabar import IntrabarResolver
+            from data.candle_store import CandleStore
+            resolver = IntrabarResolver(CandleStore(), args.symbol, args.timeframe)
+        started = time.perf_counter()
+        key = summary_key(strategy, digest, args.fee, resolver.cache_tag() if resolver else None)
+        summary = None if args.no_cache else cache.get(key)
+        cached = summary is not None
+        if not cached:
+            summary = backtest_strategy(strategy, candles, fee_rate=args.fee, times=times, resolver=resolver)["summary"]
+            cache.put(key, summary)
+        elapsed = time.perf_counter() - started
+        print(f"{strategy.name():>28}: {summary['trades']:>5} trades, win {summary['win_rate']:.2%}, "
+              f"net {summary['net_pnl']:+.2f}, max DD {summary['max_drawdown_pct']:.1f}% "
+              f"({'cached, ' if cached else ''}{elapsed * 1000:.1f} ms)")
+        if resolver:
+            print(f"{'':>30}intrabar: {resolver.stats}")
@@ -0,0 +1,27 @@
+# backtest/metrics.py
+
+import numpy as np
+
+DEFAULT_BALANCE = 1000
+FEE_RATE = 0.0004               # taker fee per side
+
+
+def summarize(pnl, equity, initial_balance=DEFAULT_BALANCE):
+    """
+    Headline numbers for a run: per-trade net PnL array and the equity curve.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = float(((peak - equity) / peak).max()) if len(equity) else 0.0
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl <= 0]
+    return {
+        "trades": len(pnl),
+        "win_rate": float(len(wins) / len(pnl)) if len(pnl) else 0.0,
+        "net_pnl": float(pnl.sum()),
+        "return_pct": float((equity[-1] / initial_balance - 1) * 100) if len(equity) else 0.0,
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float("inf"),
+        "expectancy": float(pnl.mean()) if len(pnl) else 0.0,
+        "max_drawdown_pct": drawdown * 100,
+    }
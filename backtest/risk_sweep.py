@@ -0,0 +1,210 @@
+# backtest/risk_sweep.py
+
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from backtest.metrics import DEFAULT_BALANCE, FEE_RATE
+from core.indicators import atr as atr_series
+from core.performance_logger import ENTRY_LOG_FILE
+from core.risk_manager import RiskManager
+
+MAX_HOLD_BARS = 500
+# zone/confidence strength scales RiskManager's adjustments: 0 = off, 1 = as configured, 2 = twice as strong
+DEFAULT_GRID = {
+    "sl_mult": [0.5, 0.8, 1.0, 1.5, 2.0, 2.5],
+    "tp_mult": [0.8, 1.2, 1.6, 2.0, 2.5, 3.0],
+    "zone_strength": [0.0, 1.0, 2.0],
+    "confidence_strength": [0.0, 1.0, 2.0],
+}
+
+
+def grid_cells(grid=DEFAULT_GRID):
+    names = list(grid)
+    return pd.DataFrame(list(itertools.product(*(grid[n] for n in names))), columns=names)
+
+
+def load_entries(path=ENTRY_LOG_FILE, symbol=None, timeframe=None):
+    """
+    Recorded entries (main.py's entry log) as a DataFrame, optionally for one symbol/timeframe.
+    """
+    entries = pd.read_csv(path)
+    if symbol:
+        entries = entries[entries["symbol"] == symbol]
+    if timeframe:
+        entries = entries[entries["timeframe"] == timeframe]
+    entries["timestamp"] = pd.to_datetime(entries["timestamp"], format="ISO8601")
+    return entries.sort_values("timestamp").reset_index(drop=True)
+
+
+def entries_from_signals(signals, zones=None, confidence=1.0):
+    """
+    Every non-HOLD bar of a vectorized strategy's signals as an entry, for
+    sweeping before enough live entries have been recorded.
+    """
+    bars = np.flatnonzero(np.asarray(signals)[:-1] != 0)
+    entries = pd.DataFrame({"bar": bars, "side": np.where(np.asarray(signals)[bars] > 0, "LONG", "SHORT")})
+    names = np.array(["Bearish", "Sideways", "Bullish"])
+    entries["zone"] = "Unknown" if zones is None else names[np.asarray(zones)[bars] + 1]
+    entries["confidence"] = confidence
+    return entries
+
+
+def _excursions(entry_bar, side, entry, open_, high, low, close, horizon):
+    """
+    Per entry and bar after it (E, horizon): running max adverse and favorable
+    moves and the open's adverse move, as fractions of the entry price, plus
+    the return if still open at the horizon.
+    """
+    n = len(close)
+    bars = entry_bar[:, None] + 1 + np.arange(horizon)
+    inside = bars < n
+    bars = np.minimum(bars, n - 1)
+    long_ = side[:, None] > 0
+    e = entry[:, None]
+
+    adverse = np.where(long_, e - low[bars], high[bars] - e) / e
+    favorable = np.where(long_, high[bars] - e, e - low[bars]) / e
+    open_adverse = np.where(long_, e - open_[bars], open_[bars] - e) / e
+    # Bars past the data can't hit anything; -1 (a 100% move the other way) is below any distance
+    adverse[~inside] = -1.0
+    favorable[~inside] = -1.0
+
+    last = np.minimum(entry_bar + horizon, n - 1)
+    final_return = side * (close[last] - entry) / entry
+    return np.maximum.accumulate(adverse, axis=1), np.maximum.accumulate(favorable, axis=1), open_adverse, final_return
+
+
+def _first_reach(running_max, distances):
+    """
+    First bar where each entry's running max reaches each cell's distance:
+    running_max (E, W) non-decreasing rows, distances (C, E) → (C, E) indexes,
+    W where never reached. One searchsorted over all rows, each row shifted
+    into its own band so the flattened array stays sorted.
+    """
+    n_entries, width = running_max.shape
+    span = float(np.nanmax(running_max)) + 2.0   # values live in [-1, max]
+    offsets = np.arange(n_entries) * span
+    flat = (running_max + offsets[:, None]).ravel()
+    queries = distances + offsets[None, :]
+    return np.searchsorted(flat, queries, side="left") - (np.arange(n_entries) * width)[None, :]
+
+
+def sweep_risk_grid(entries, open_, high, low, close, entry_bar, cells=None, atr=None,
+                    horizon=MAX_HOLD_BARS, balance=DEFAULT_BALANCE, fee_rate=FEE_RATE):
+    """
+    Replays recorded entries under every SL/TP/zone/confidence multiplier
+    cell in one batched pass. entries needs side, zone, confidence (and
+    optionally entry) columns; entry_bar is each entry's candle index.
+    Positions are independent (as recorded live), held at most `horizon`
+    candles. Same fills as the backtesters: SL/TP from the next candle, gaps
+    at the open, SL first on a candle touching both.
+    Returns one row per cell with trades, win_rate, expectancy, net_pnl,
+    profit_factor and max_drawdown_pct.
+    """
+    cells = grid_cells() if cells is None else cells
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    atr = atr_series(high, low, close) if atr is None else np.asarray(atr, dtype=np.float64)
+    entry_bar = np.asarray(entry_bar, dtype=np.int64)
+    side = np.where(entries["side"].to_numpy() == "LONG", 1.0, -1.0)
+    entry = entries["entry"].to_numpy(dtype=np.float64) if "entry" in entries else close[entry_bar]
+
+    # Per-entry zone and confidence factors, relative to the base multipliers
+    base_sl, base_tp = RiskManager.SL_ATR_MULTIPLIER, RiskManager.TP_ATR_MULTIPLIER
+    zone_sl, zone_tp = RiskManager.sl_tp_multiplier_arrays(entries["zone"].fillna("Unknown").to_numpy(), 1.0)
+    conf_sl, _ = RiskManager.sl_tp_multiplier_arrays(None, entries["confidence"].fillna(1.0).to_numpy())
+    zone_sl, zone_tp, conf = zone_sl / base_sl, zone_tp / base_tp, conf_sl / base_sl
+
+    zs = cells["zone_strength"].to_numpy()[:, None]
+    cs = cells["confidence_strength"].to_numpy()[:, None]
+    conf_adj = 1 + cs * (conf[None, :] - 1)
+    sl_mult = cells["sl_mult"].to_numpy()[:, None] * (1 + zs * (zone_sl[None, :] - 1)) * conf_adj
+    tp_mult = cells["tp_mult"].to_numpy()[:, None] * (1 + zs * (zone_tp[None, :] - 1)) * conf_adj
+
+    # SL/TP distances as fractions of entry, with RiskManager's fallback when ATR is unusable
+    entry_atr = atr[entry_bar]
+    valid = (np.isfinite(entry_atr) & (entry_atr != 0))[None, :]
+    d_sl = np.where(valid, entry_atr[None, :] * sl_mult / entry[None, :], RiskManager.FALLBACK_SL_PCT)
+    d_tp = np.where(valid, entry_atr[None, :] * tp_mult / entry[None, :], RiskManager.FALLBACK_TP_PCT)
+
+    adverse, favorable, open_adverse, final_return = _excursions(entry_bar, side, entry, open_, high, low, close, horizon)
+    t_sl = _first_reach(adverse, d_sl)
+    t_tp = _first_reach(favorable, d_tp)
+
+    width = adverse.shape[1]
+    t = np.minimum(t_sl, t_tp)
+    hit = t < width
+    ov = open_adverse[np.arange(len(entry))[None, :], np.minimum(t, width - 1)]
+    gap_sl, gap_tp = ov >= d_sl, -ov >= d_tp
+    touched_sl = t_sl == t
+    ret = np.select([gap_sl, gap_tp, touched_sl], [-ov, -ov, -d_sl], d_tp)
+    ret = np.where(hit, ret, final_return[None, :])
+
+    # Risk-based qty: risk / (entry * d_sl); fees on entry and exit notional, exit = entry * (1 + side * ret)
+    risk = balance * RiskManager.MAX_RISK_PCT
+    pnl = risk * (ret - fee_rate * (2 + side[None, :] * ret)) / d_sl
+
+    equity = balance + np.cumsum(pnl, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), balance)
+    gains = np.where(pnl > 0, pnl, 0).sum(axis=1)
+    losses = -np.where(pnl <= 0, pnl, 0).sum(axis=1)
+
+    results = cells.copy()
+    results["trades"] = pnl.shape[1]
+    results["win_rate"] = (pnl > 0).mean(axis=1)
+    results["expectancy"] = pnl.mean(axis=1)
+    results["net_pnl"] = pnl.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results["profit_factor"] = np.where(losses > 0, gains / losses, np.inf)
+    results["max_drawdown_pct"] = ((peak - equity) / peak).max(axis=1) * 100
+    return results
+
+
+if __name__ == "__main__":
+    import time
+    from data.historical_loader import load_candles_csv
+
+    parser = argparse.ArgumentParser(description="Expectancy and drawdown over a grid of SL/TP/zone/confidence multipliers")
+    parser.add_argument("candles", nargs="?", default="ETHUSDT_1h.csv")
+    parser.add_argument("--symbol", default="ETHUSDT")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--entries", default=None, help=f"recorded entries (e.g. {ENTRY_LOG_FILE})")
+    parser.add_argument("--strategy", default=None, help="use a strategy's signals instead of recorded entries")
+    parser.add_argument("--horizon", type=int, default=MAX_HOLD_BARS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    candles = load_candles_csv(args.candles)
+    arrays = {col: candles[col].to_numpy(dtype=np.float64) for col in ("open", "high", "low", "close")}
+
+    if args.entries:
+        entries = load_entries(args.entries, args.symbol, args.timeframe)
+        times = candles.index.values.astype("datetime64[ms]").astype(np.int64)
+        stamps = entries["timestamp"].values.astype("datetime64[ms]").astype(np.int64)
+        entry_bar = np.searchsorted(times, stamps, side="right") - 1
+        keep = (entry_bar >= 0) & (entry_bar < len(times) - 1)
+        entries, entry_bar = entries[keep].reset_index(drop=True), entry_bar[keep]
+    else:
+        from core.strategy_registry import get_registry
+        from ml.selector_predictor import zone_codes
+        name = args.strategy or "BreakoutStrategy"
+        strategy = get_registry().classes[name](args.symbol, args.timeframe)
+        signals = strategy.generate_signals({**arrays, "volume": candles["volume"].to_numpy()})
+        entries = entries_from_signals(signals, zone_codes(arrays["close"]))
+        entry_bar = entries["bar"].to_numpy()
+
+    started = time.perf_counter()
+    results = sweep_risk_grid(entries, arrays["open"], arrays["high"], arrays["low"], arrays["close"],
+                              entry_bar, horizon=args.horizon)
+    elapsed = time.perf_counter() - started
+    print(f"[🧮] {len(results)} cells × {len(entries)} entries in {elapsed * 1000:.1f} ms")
+
+    current = results[(results["sl_mult"] == RiskManager.SL_ATR_MULTIPLIER) &
+                      (results["tp_mult"] == RiskManager.TP_ATR_MULTIPLIER) &
+                      (results["zone_strength"] == 1.0) & (results["confidence_strength"] == 1.0)]
+    pd.set_option("display.width", 200)
+    if not current.empty:
+        print("Current settings:")
+        print(current.to_string(index=False))
+    print(f"Top {args.top} by expectancy:")
+    print(results.sort_values("expectancy", ascending=False).head(args.top).to_string(index=False))
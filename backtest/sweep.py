@@ -0,0 +1,239 @@
+# backtest/sweep.py
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from backtest.cache import ResultCache, RESULT_CACHE_DIR
+from backtest.metrics import FEE_RATE
+
+SWEEP_DB_PATH = "backtest/sweep_results.db"
+JOBS_PER_TASK = 16          # configs per pool task, all on one symbol so worker caches are reused
+PROGRESS_EVERY_SECONDS = 10
+SUMMARY_FIELDS = ("trades", "win_rate", "net_pnl", "return_pct", "profit_factor", "expectancy", "max_drawdown_pct")
+
+# Worker-side state, set once per process by _init_worker
+_store = None
+_cache = None
+_prepared = {}
+
+
+def job_id(symbol, timeframe, strategy, params):
+    return f"{symbol}:{timeframe}:{strategy}:{json.dumps(params, sort_keys=True)}"
+
+
+def param_combinations(cls):
+    """
+    Every combination of the strategy's PARAM_GRID on top of its defaults.
+    """
+    names = list(cls.PARAM_GRID)
+    combos = []
+    for values in itertools.product(*(cls.PARAM_GRID[n] for n in names)):
+        params = {**cls.DEFAULT_PARAMS, **dict(zip(names, values))}
+        if cls.valid_params(params):
+            combos.append(params)
+    return combos or [dict(cls.DEFAULT_PARAMS)]
+
+
+def build_jobs(symbols, timeframe, strategy_classes):
+    return [
+        (job_id(symbol, timeframe, name, params), symbol, timeframe, name, params)
+        for symbol in symbols
+        for name, cls in sorted(strategy_classes.items())
+        for params in param_combinations(cls)
+    ]
+
+
+def open_results(path=SWEEP_DB_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    columns = ", ".join(f"{field} REAL" for field in SUMMARY_FIELDS)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS sweep_results ("
+        "job_id TEXT PRIMARY KEY, symbol TEXT, timeframe TEXT, strategy TEXT, params TEXT, "
+        f"{columns}, elapsed REAL, finished_at INTEGER, cache_key TEXT)"
+    )
+    if "cache_key" not in {row[1] for row in db.execute("PRAGMA table_info(sweep_results)")}:
+        db.execute("ALTER TABLE sweep_results ADD COLUMN cache_key TEXT")
+    db.commit()
+    return db
+
+
+def finished_jobs(db):
+    # job_id -> result-cache key of the code/data it was computed with
+    return dict(db.execute("SELECT job_id, cache_key FROM sweep_results"))
+
+
+def _init_worker(store_root, cache_root):
+    global _store, _cache
+    from data.candle_store import CandleStore
+    _store = CandleStore(store_root)
+    _cache = ResultCache(cache_root) if cache_root else None
+
+
+def _prepare(symbol, timeframe):
+    # Memory-mapped candles plus the strategy-independent inputs, once per symbol per worker
+    key = (symbol, timeframe)
+    if key not in _prepared:
+        from core.indicators import atr
+        from ml.selector_predictor import zone_codes
+        _, arrays = _store.load(symbol, timeframe)
+        _prepared.clear()
+        _prepared[key] = (arrays, zone_codes(arrays["close"]), atr(arrays["high"], arrays["low"], arrays["close"]))
+    return _prepared[key]
+
+
+def _run_jobs(jobs, fee_rate):
+    from backtest.kernel import backtest_strategy
+    from core.strategy_registry import get_registry
+
+    classes = get_registry().classes
+    results = []
+    for jid, key, symbol, timeframe, name, params in jobs:
+        started = time.perf_counter()
+        try:
+            arrays, zones, atr = _prepare(symbol, timeframe)
+            strategy = classes[name](symbol, timeframe, params=params)
+            summary = backtest_strategy(strategy, arrays, zones=zones, atr=atr, fee_rate=fee_rate)["summary"]
+            if _cache is not None:
+                _cache.put(key, summary)
+            results.append((jid, key, symbol, timeframe, name, params, summary, time.perf_counter() - started, None))
+        except Exception as e:
+            results.append((jid, key, symbol, timeframe, name, params, None, time.perf_counter() - started, str(e)))
+    return results
+
+
+def _job_keys(jobs, classes, store_root, fee_rate):
+    # Content keys in the parent: one data digest per symbol, then per-config strategy source + params
+    from backtest.cache import data_digest
+    from backtest.kernel import summary_key
+    from data.candle_store import CandleStore
+
+    store = CandleStore(store_root)
+    digests = {}
+    keys = []
+    for _, symbol, timeframe, name, params in jobs:
+        if (symbol, timeframe) not in digests:
+            digests[(symbol, timeframe)] = data_digest(store.load(symbol, timeframe)[1])
+        strategy = classes[name](symbol, timeframe, params=params)
+        keys.append(summary_key(strategy, digests[(symbol, timeframe)], fee_rate))
+    return keys
+
+
+def _write_rows(db, results):
+    rows = [
+        (jid, symbol, tf, name, json.dumps(params, sort_keys=True),
+         *(summary[f] for f in SUMMARY_FIELDS), elapsed, int(time.time()), key)
+        for jid, key, symbol, tf, name, params, summary, elapsed, error in results if not error
+    ]
+    db.executemany(
+        f"INSERT OR REPLACE INTO sweep_results VALUES ({', '.join('?' * (len(SUMMARY_FIELDS) + 8))})", rows
+    )
+    db.commit()
+    return len(rows)
+
+
+def run_sweep(symbols, timeframe, strategy_names=None, workers=None, db_path=SWEEP_DB_PATH,
+              store_root=None, fee_rate=FEE_RATE, cache_root=RESULT_CACHE_DIR):
+    """
+    Backtests every symbol × strategy × parameter combination on a process
+    pool and streams each summary into the sweep_results table. Jobs already
+    in the table with the same content key are skipped, so an interrupted
+    sweep resumes where it stopped, and after editing one strategy only its
+    configs rerun. Configs found in the result cache (cache_root, None to
+    disable) are written without running.
+    """
+    from core.strategy_registry import get_registry
+    from data.candle_store import CANDLE_STORE_DIR
+
+    store_root = store_root or CANDLE_STORE_DIR
+    classes = get_registry().classes
+    if strategy_names:
+        classes = {name: cls for name, cls in classes.items() if name in strategy_names}
+
+    db = open_results(db_path)
+    done = finished_jobs(db)
+    jobs = build_jobs(symbols, timeframe, classes)
+    keys = _job_keys(jobs, classes, store_root, fee_rate)
+    jobs = [(job[0], key, *job[1:]) for job, key in zip(jobs, keys) if done.get(job[0]) != key]
+
+    cache = ResultCache(cache_root) if cache_root else None
+    if cache is not None:
+        cached = [(*job, cache.get(job[1]), 0.0, None) for job in jobs]
+        hits = [row for row in cached if row[6] is not None]
+        _write_rows(db, hits)
+        jobs = [job for job, row in zip(jobs, cached) if row[6] is None]
+    print(f"[🧪] Sweep: {len(jobs)} configs to run, {len(keys) - len(jobs)} up to date in {db_path} or the cache")
+    if not jobs:
+        db.close()
+        return 0
+
+    tasks = [jobs[i:i + JOBS_PER_TASK] for i in range(0, len(jobs), JOBS_PER_TASK)]
+    workers = workers or os.cpu_count() or 1
+    started = last_report = time.time()
+    completed = failed = 0
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                               initializer=_init_worker, initargs=(store_root, cache_root))
+    try:
+        futures = [pool.submit(_run_jobs, task, fee_rate) for task in tasks]
+        for future in as_completed(futures):
+            results = future.result()
+            for jid, *_, error in results:
+                if error:
+                    failed += 1
+                    print(f"[⚠️] {jid} failed: {error}")
+            completed += _write_rows(db, results)
+            if time.time() - last_report >= PROGRESS_EVERY_SECONDS:
+                last_report = time.time()
+                print(f"[📈] {completed}/{len(jobs)} configs ({completed / (last_report - started):.0f}/s)")
+    except KeyboardInterrupt:
+        print(f"[⏸️] Sweep interrupted after {completed} configs. Rerun to resume.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        db.close()
+
+    print(f"[✅] Sweep finished: {completed} configs, {failed} failed in {time.time() - started:.1f}s")
+    return completed
+
+
+def top_results(db_path=SWEEP_DB_PATH, order_by="expectancy", limit=20, min_trades=10):
+    if order_by not in SUMMARY_FIELDS:
+        raise ValueError(f"Unknown column {order_by}")
+    db = open_results(db_path)
+    try:
+        return db.execute(
+            f"SELECT symbol, strategy, params, trades, win_rate, net_pnl, max_drawdown_pct, {order_by} "
+            f"FROM sweep_results WHERE trades >= ? ORDER BY {order_by} DESC LIMIT ?", (min_trades, limit)
+        ).fetchall()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from data.candle_store import CandleStore, CANDLE_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Symbol × strategy × parameter backtest sweep")
+    parser.add_argument("--symbols", nargs="*", default=None, help="defaults to every symbol in the candle store")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--strategies", nargs="*", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--db", default=SWEEP_DB_PATH)
+    parser.add_argument("--store", default=CANDLE_STORE_DIR)
+    parser.add_argument("--fee", type=float, default=FEE_RATE)
+    parser.add_argument("--cache", default=RESULT_CACHE_DIR, help="result cache directory ('' to disable)")
+    parser.add_argument("--top", type=int, default=10, help="print the best N configs afterwards")
+    args = parser.parse_args()
+
+    symbols = args.symbols or CandleStore(args.store).symbols(args.timeframe)
+    run_sweep(symbols, args.timeframe, args.strategies, args.workers, args.db, args.store, args.fee, args.cache or None)
+    for row in top_results(args.db, limit=args.top):
+        symbol, strategy, params, trades, win_rate, net_pnl, drawdown, expectancy = row
+        print(f"{symbol:>10} {strategy:>28} {params:<70} {int(trades):>5} trades "
+              f"win {win_rate:.2%} net {net_pnl:+.2f} DD {drawdown:.1f}% exp {expectancy:+.3f}")
@@ -14,3 +14,52 @@ TRAILING_STOP = {
     "activation_pct": 0.005,  # +0.5% profit to activate trailing
     "trail_pct": 0.003        # trails by 0.3%
 }
+
+# Portfolio limits as multiples of the risk balance, checked before every new entry
+PORTFOLIO_RISK = {
+    "max_gross_exposure": 10.0,      # sum of |notional| across symbols
+    "max_symbol_exposure": 6.0,      # |notional| of one symbol
+    "max_correlated_exposure": 8.0,  # notional seen from the new symbol, weighted by return correlation
+    "correlation_halflife": 96,      # candles
+    "min_overlap": 20,               # aligned returns before a pair's own correlation is used
+    "prior_correlation": 0.7         # until then (crypto majors mostly move together)
+}
+
+# Drawdown watchdog: unrealized loss limits checked on every mark price update
+WATCHDOG = {
+    "symbol_max_loss_pct": 0.03,     # of the position's entry notional
+    "account_max_loss_pct": 0.05,    # total unrealized loss, of wallet balance
+    "poll_seconds": 1.0,             # REST mark price polling while the price stream is down (weight 1 per symbol)
+    "positions_refresh_seconds": 5   # positionRisk reload while the account stream is down
+}
+
+ACCOUNT_SETTINGS = {
+    "margin_type": "CROSSED",        # per symbol; None leaves it as set on the exchange
+    "dual_side_position": False      # entries and closes assume one-way mode; None leaves it alone
+}
+
+SCHEDULER = {
+    "close_delay_seconds": 2,        # wake this long after a candle closes so the closed kline is served
+    "near_pct": 0.004,               # price within this fraction of SL/TP → poll every near_seconds
+    "near_seconds": 5,
+    "position_seconds": 60,          # poll cap for open positions far from SL/TP
+    "retry_seconds": 15              # next attempt when a pass failed before the symbol was observed
+}
+
+SHARDING = {
+    "db_path": "data/coordinator.db",  # SQLite file shared by the worker processes of one host
+    "vnodes": 64,                      # hash ring points per worker
+    "heartbeat_seconds": 10,
+    "lease_seconds": 45,               # heartbeat silence after which a worker is dead and its symbols move
+    "weight_per_minute": 2000          # shared request weight budget (Binance allows 2400/min per IP; the rest is for flatten/watchdog)
+}
+
+UNIVERSE = {
+    "enabled": True,                 # False: trade main.SYMBOLS only
+    "top_k": 10,
+    "pinned": ["BTCUSDT", "ETHUSDT"],  # always traded, on top of the top_k
+    "rescan_seconds": 3600,
+    "min_quote_volume": 50_000_000,  # 24h USDT volume
+    "max_spread_bps": 5.0,
+    "weights": {"volume": 1.0, "volatility": 0.5, "spread": 0.5}
+}
@@ -0,0 +1,267 @@
+# core/account_state.py
+
+import time
+import threading
+from config import BINANCE_API_KEY, BINANCE_API_SECRET, BASE_URL
+
+REFRESH_SECONDS = 60          # REST refresh while the user data stream is down
+RESYNC_SECONDS = 15 * 60      # consistency refresh while it is up
+MARGIN_ASSET = "USDT"
+
+_account_state = None
+_account_state_lock = threading.Lock()
+
+
+def _f(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class AccountState:
+    """
+    Wallet balance, available margin, positions and per-symbol leverage kept
+    in memory: seeded from /fapi/v2/account, then updated from the futures
+    user data stream (ACCOUNT_UPDATE / ACCOUNT_CONFIG_UPDATE) when
+    python-binance is installed, with a periodic REST refresh as the fallback
+    and as a slow resync. Readers never make a signed request.
+
+    Available margin is exact after each REST refresh; between refreshes it is
+    re-estimated from stream updates as cross wallet + cross unrealized PnL -
+    cross initial margin (open-order margin is not in the events).
+    """
+
+    def __init__(self, client=None, refresh_seconds=REFRESH_SECONDS, resync_seconds=RESYNC_SECONDS,
+                 stream=True):
+        if client is None:
+            from exchange.binance import BinanceFuturesClient
+            client = BinanceFuturesClient()
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self.resync_seconds = resync_seconds
+        self.stream = stream
+        self.lock = threading.Lock()
+
+        self.assets = {}        # asset -> wallet / cross_wallet / available / unrealized
+        self.positions = {}     # symbol -> amount / entry / unrealized / isolated
+        self.leverage = {}      # symbol -> int
+        self.margin_type = {}   # symbol -> "CROSSED" / "ISOLATED"
+        self.refreshed_at = 0.0
+        self.attempted_at = 0.0
+        self.updated_at = 0.0
+        self.events = 0
+        self.available_exact = False
+        self._seed_ms = 0
+        self._twm = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- lifecycle ------------------------------------------------------
+
+    def start(self):
+        self.refresh()
+        if self.stream:
+            self._start_stream()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._stop_stream()
+
+    def _start_stream(self):
+        try:
+            from binance import ThreadedWebsocketManager
+        except ImportError:
+            print(f"[⚠️] python-binance not installed; account state refreshes every {self.refresh_seconds}s")
+            self.stream = False
+            return False
+        try:
+            self._twm = ThreadedWebsocketManager(api_key=BINANCE_API_KEY, api_secret=BINANCE_API_SECRET,
+                                                 testnet="testnet" in BASE_URL)
+            self._twm.start()
+            self._twm.start_futures_user_socket(callback=self.apply_event)
+            print("[📡] Account user data stream started.")
+            return True
+        except Exception as e:
+            print(f"[⚠️] Account stream failed to start: {e}")
+            self._stop_stream()
+            return False
+
+    def _stop_stream(self):
+        twm, self._twm = self._twm, None
+        if twm is not None:
+            try:
+                twm.stop()
+            except Exception:
+                pass
+
+    def streaming(self):
+        return self._twm is not None and self._twm.is_alive()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(1):
+            interval = self.resync_seconds if self.streaming() else self.refresh_seconds
+            if time.time() - self.attempted_at < interval:
+                continue
+            if self.stream and not self.streaming():
+                self._stop_stream()
+                self._start_stream()
+            self.refresh()
+
+    # ---- updates --------------------------------------------------------
+
+    def refresh(self):
+        """
+        Full reload from /fapi/v2/account. Returns False (keeping the last
+        state) when the request fails.
+        """
+        self.attempted_at = time.time()
+        started_ms = int(self.attempted_at * 1000)
+        try:
+            data = self.client.get_account()
+        except Exception as e:
+            print(f"[⚠️] Account refresh failed: {e}")
+            return False
+        if "assets" not in data:
+            print(f"[⚠️] Unexpected account payload: {data}")
+            return False
+
+        assets = {
+            a["asset"]: {
+                "wallet": _f(a.get("walletBalance")),
+                "cross_wallet": _f(a.get("crossWalletBalance", a.get("walletBalance"))),
+                "available": _f(a.get("availableBalance")),
+                "unrealized": _f(a.get("unrealizedProfit")),
+            }
+            for a in data["assets"]
+        }
+        positions, leverage, margin_type = {}, {}, {}
+        for p in data.get("positions", []):
+            symbol = p["symbol"]
+            leverage[symbol] = int(_f(p.get("leverage"), 1))
+            margin_type[symbol] = "ISOLATED" if p.get("isolated") else "CROSSED"
+            amount = _f(p.get("positionAmt"))
+            if amount:
+                positions[symbol] = {
+                    "amount": amount,
+                    "entry": _f(p.get("entryPrice")),
+                    "unrealized": _f(p.get("unrealizedProfit")),
+                    "isolated": bool(p.get("isolated")),
+                }
+        with self.lock:
+            self.assets, self.positions, self.leverage = assets, positions, leverage
+            self.margin_type = margin_type
+            self.refreshed_at = self.updated_at = time.time()
+            self.available_exact = True
+            self._seed_ms = started_ms
+        return True
+
+    def apply_event(self, msg):
+        """
+        User data stream callback. Events older than the last REST snapshot
+        are already reflected in it and are skipped.
+        """
+        event = msg.get("e") if isinstance(msg, dict) else None
+        if event == "error":
+            print(f"[⚠️] Account stream error: {msg}")
+            self._stop_stream()
+            return
+        if event == "listenKeyExpired":
+            self._stop_stream()
+            return
+        if event not in ("ACCOUNT_UPDATE", "ACCOUNT_CONFIG_UPDATE"):
+            return
+        if msg.get("E", 0) < self._seed_ms:
+            return
+
+        with self.lock:
+            if event == "ACCOUNT_CONFIG_UPDATE":
+                config = msg.get("ac")
+                if config:
+                    self.leverage[config["s"]] = int(config["l"])
+            else:
+                update = msg.get("a", {})
+                for b in update.get("B", []):
+                    asset = self.assets.setdefault(b["a"], {"wallet": 0.0, "cross_wallet": 0.0,
+                                                            "available": 0.0, "unrealized": 0.0})
+                    asset["wallet"] = _f(b.get("wb"))
+                    asset["cross_wallet"] = _f(b.get("cw"))
+                for p in update.get("P", []):
+                    if p.get("mt"):
+                        self.margin_type[p["s"]] = "ISOLATED" if p["mt"] == "isolated" else "CROSSED"
+                    amount = _f(p.get("pa"))
+                    if amount:
+                        self.positions[p["s"]] = {
+                            "amount": amount,
+                            "entry": _f(p.get("ep")),
+                            "unrealized": _f(p.get("up")),
+                            "isolated": p.get("mt") == "isolated",
+                        }
+                    else:
+                        self.positions.pop(p["s"], None)
+                self._estimate_available()
+            self.events += 1
+            self.updated_at = time.time()
+
+    def _estimate_available(self):
+        asset = self.assets.get(MARGIN_ASSET)
+        if asset is None:
+            return
+        cross = [(s, p) for s, p in self.positions.items() if not p["isolated"]]
+        unrealized = sum(p["unrealized"] for _, p in cross)
+        margin = sum(abs(p["amount"]) * p["entry"] / max(1, self.leverage.get(s, 1)) for s, p in cross)
+        asset["unrealized"] = sum(p["unrealized"] for p in self.positions.values())
+        asset["available"] = max(0.0, asset["cross_wallet"] + unrealized - margin)
+        self.available_exact = False
+
+    # ---- readers --------------------------------------------------------
+
+    def wallet_balance(self, asset=MARGIN_ASSET):
+        with self.lock:
+            a = self.assets.get(asset)
+            return a["wallet"] if a else None
+
+    def available_balance(self, asset=MARGIN_ASSET):
+        with self.lock:
+            a = self.assets.get(asset)
+            return a["available"] if a else None
+
+    def symbol_leverage(self, symbol):
+        with self.lock:
+            return self.leverage.get(symbol)
+
+    def position(self, symbol):
+        with self.lock:
+            p = self.positions.get(symbol)
+            return dict(p) if p else None
+
+    def snapshot(self):
+        with self.lock:
+            asset = self.assets.get(MARGIN_ASSET, {})
+            return {
+                "wallet": asset.get("wallet"),
+                "available": asset.get("available"),
+                "available_exact": self.available_exact,
+                "unrealized": asset.get("unrealized"),
+                "positions": {s: dict(p) for s, p in self.positions.items()},
+                "leverage": {s: self.leverage[s] for s in self.positions if s in self.leverage},
+                "streaming": self.streaming(),
+                "age_seconds": time.time() - self.updated_at if self.updated_at else None,
+                "events": self.events,
+            }
+
+
+def get_account_state(client=None, start=True):
+    """
+    Process-wide account state, started on first use.
+    """
+    global _account_state
+    with _account_state_lock:
+        if _account_state is None:
+            _account_state = AccountState(client)
+            if start:
+                _account_state.start()
+        return _account_state
@@ -0,0 +1,335 @@
+# core/coordinator.py
+
+import os
+import time
+import socket
+import bisect
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+from config import SHARDING
+
+# Request weights of the endpoints the bot uses (Binance USD-M, 1-minute IP window); others count 1
+REQUEST_WEIGHTS = {
+    "/fapi/v1/klines": 2,
+    "/fapi/v2/account": 5,
+    "/fapi/v2/positionRisk": 5,
+    "/fapi/v1/premiumIndex": 10,     # all symbols
+    "/fapi/v1/ticker/24hr": 40,      # all symbols
+    "/fapi/v1/ticker/bookTicker": 5, # all symbols
+}
+# Same endpoints for a single symbol
+SYMBOL_REQUEST_WEIGHTS = {
+    "/fapi/v1/premiumIndex": 1,
+    "/fapi/v1/ticker/24hr": 1,
+    "/fapi/v1/ticker/bookTicker": 2,
+}
+
+
+def request_weight(url, params=None):
+    path = urlparse(url).path
+    if path in SYMBOL_REQUEST_WEIGHTS and ("symbol" in (params or {}) or "symbol=" in urlparse(url).query):
+        return SYMBOL_REQUEST_WEIGHTS[path]
+    return REQUEST_WEIGHTS.get(path, 1)
+
+
+class HashRing:
+    """
+    Consistent hashing of symbols onto workers: each worker owns `vnodes`
+    points on the ring, so adding or losing one worker only moves about 1/N
+    of the symbols.
+    """
+
+    def __init__(self, nodes, vnodes=SHARDING["vnodes"]):
+        self.points = sorted((self._hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self.hashes = [h for h, _ in self.points]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def owner(self, key):
+        if not self.points:
+            return None
+        i = bisect.bisect(self.hashes, self._hash(key)) % len(self.points)
+        return self.points[i][1]
+
+    def assign(self, keys):
+        owners = {}
+        for key in keys:
+            owners.setdefault(self.owner(key), []).append(key)
+        return owners
+
+
+class Coordinator:
+    """
+    Shared state for a sharded run, in one SQLite file (WAL) that every
+    worker process on the host opens:
+
+    - workers: heartbeats; a worker silent for lease_seconds is dead and its
+      rows are dropped by whoever notices first;
+    - leases: symbol -> worker with an expiry. Each worker hashes the universe
+      onto the live workers and only trades symbols whose lease it holds, so
+      during a rebalance a symbol is never traded by two workers. A lease is
+      only given up once no pass is running for it (begin()/end());
+    - rate_budget: request weight used in the current minute across all
+      workers, bumped up to Binance's own X-MBX-USED-WEIGHT-1M count;
+    - exposure: signed notional per symbol, so each worker's portfolio caps
+      see every other worker's positions;
+    - universe: the symbols to split, as published by the supervisor's scanner.
+
+    Connections are per thread (sqlite3 objects can't cross threads) and
+    every write is a short BEGIN IMMEDIATE transaction.
+    """
+
+    def __init__(self, worker_id=None, path=SHARDING["db_path"], config=None):
+        self.config = {**SHARDING, **(config or {})}
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.path = path
+        self.local = threading.local()
+        self.held = set()
+        self.foreign = set()        # other workers' symbols last copied into the portfolio
+        self.busy = set()           # symbols with a pass in progress; their leases are kept
+        self.busy_lock = threading.Lock()
+        self.changed = threading.Event()
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._tx() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, pid INTEGER, "
+                       "started_at REAL, heartbeat_at REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (symbol TEXT PRIMARY KEY, worker_id TEXT, expires_at REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS rate_budget (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                       "window INTEGER, used INTEGER)")
+            db.execute("CREATE TABLE IF NOT EXISTS exposure (symbol TEXT PRIMARY KEY, worker_id TEXT, "
+                       "amount REAL, price REAL, updated_at REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS universe (symbol TEXT PRIMARY KEY, rank INTEGER)")
+            db.execute("INSERT OR IGNORE INTO rate_budget VALUES (0, 0, 0)")
+
+    def _db(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+        return db
+
+    @contextmanager
+    def _tx(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    # ---- membership and symbol leases -----------------------------------
+
+    def start(self, universe):
+        """
+        Joins the ring and keeps heartbeating and rebalancing on a
+        background thread; `universe` is used until one is published.
+        `changed` is set whenever the held set moves.
+        """
+        self.universe = list(universe)
+        self.rebalance()
+        threading.Thread(target=self._run, name="shard-coordinator", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._tx() as db:
+            db.execute("DELETE FROM leases WHERE worker_id = ?", (self.worker_id,))
+            db.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+
+    def _run(self):
+        while not self._stop.wait(self.config["heartbeat_seconds"]):
+            try:
+                self.rebalance()
+            except sqlite3.Error as e:
+                print(f"[⚠️] Coordinator update failed for {self.worker_id}: {e}")
+
+    def rebalance(self):
+        """
+        Heartbeat, expire dead workers, then take the leases of the symbols
+        the ring gives this worker (when free or expired) and give up the
+        rest, except the busy ones, which are renewed until end(). Returns
+        the symbols held.
+        """
+        with self.busy_lock:
+            return self._rebalance()
+
+    def _rebalance(self):
+        now = time.time()
+        lease_until = now + self.config["lease_seconds"]
+        with self._tx() as db:
+            db.execute("INSERT INTO workers VALUES (?, ?, ?, ?) ON CONFLICT(worker_id) DO UPDATE SET "
+                       "pid = excluded.pid, heartbeat_at = excluded.heartbeat_at",
+                       (self.worker_id, os.getpid(), now, now))
+            dead = [w for (w,) in db.execute("SELECT worker_id FROM workers WHERE heartbeat_at < ?",
+                                             (now - self.config["lease_seconds"],))]
+            for worker in dead:
+                print(f"[💀] Worker {worker} missed its heartbeat; releasing its symbols.")
+                db.execute("DELETE FROM workers WHERE worker_id = ?", (worker,))
+                db.execute("DELETE FROM leases WHERE worker_id = ?", (worker,))
+
+            members = [w for (w,) in db.execute("SELECT worker_id FROM workers ORDER BY worker_id")]
+            universe = [s for (s,) in db.execute("SELECT symbol FROM universe ORDER BY rank")] or self.universe
+            wanted = set(HashRing(members, self.config["vnodes"]).assign(universe).get(self.worker_id, []))
+            leases = {s: (w, t) for s, w, t in db.execute("SELECT symbol, worker_id, expires_at FROM leases")}
+
+            held = set()
+            for symbol, (worker, _) in leases.items():
+                if worker == self.worker_id and symbol not in wanted:
+                    if symbol in self.busy:
+                        db.execute("UPDATE leases SET expires_at = ? WHERE symbol = ?", (lease_until, symbol))
+                        held.add(symbol)
+                    else:
+                        db.execute("DELETE FROM leases WHERE symbol = ?", (symbol,))
+            for symbol in wanted:
+                worker, expires = leases.get(symbol, (None, 0))
+                if worker in (None, self.worker_id) or expires < now:
+                    db.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)", (symbol, self.worker_id, lease_until))
+                    held.add(symbol)
+
+        if held != self.held:
+            gained, lost = held - self.held, self.held - held
+            print(f"[🔀] {self.worker_id} now holds {len(held)} symbols (+{len(gained)} / -{len(lost)})")
+            self.held = held
+            self.changed.set()
+        return held
+
+    def symbols(self):
+        return sorted(self.held)
+
+    def begin(self, symbol):
+        """
+        Marks a pass over `symbol` as running so rebalance() keeps its lease
+        until end(). False when the lease is no longer held.
+        """
+        with self.busy_lock:
+            if symbol not in self.held:
+                return False
+            self.busy.add(symbol)
+            return True
+
+    def end(self, symbol):
+        with self.busy_lock:
+            self.busy.discard(symbol)
+
+    def owns(self, symbol):
+        # Straight from the table, e.g. right before an order: also false if this
+        # worker stalled long enough for another one to expire it
+        row = self._db().execute("SELECT worker_id, expires_at FROM leases WHERE symbol = ?", (symbol,)).fetchone()
+        return row is not None and row[0] == self.worker_id and row[1] >= time.time()
+
+    def publish_universe(self, symbols):
+        # Replaces the list every worker hashes (their start() universe is only the fallback)
+        with self._tx() as db:
+            db.execute("DELETE FROM universe")
+            db.executemany("INSERT INTO universe VALUES (?, ?)", [(s, i) for i, s in enumerate(symbols)])
+
+    # ---- global request budget ------------------------------------------
+
+    def acquire(self, weight=1):
+        """
+        Blocks until `weight` fits in this minute's shared budget.
+        """
+        limit = self.config["weight_per_minute"]
+        while True:
+            now = time.time()
+            window = int(now // 60)
+            with self._tx() as db:
+                saved, used = db.execute("SELECT window, used FROM rate_budget WHERE id = 0").fetchone()
+                used = used if saved == window else 0
+                if used + weight <= limit or used == 0:
+                    db.execute("UPDATE rate_budget SET window = ?, used = ? WHERE id = 0", (window, used + weight))
+                    return
+            time.sleep(min(1.0, (window + 1) * 60 - now))
+
+    def charge(self, weight=1):
+        # Counts `weight` without waiting (emergency traffic); others wait for it instead
+        window = int(time.time() // 60)
+        with self._tx() as db:
+            saved, used = db.execute("SELECT window, used FROM rate_budget WHERE id = 0").fetchone()
+            db.execute("UPDATE rate_budget SET window = ?, used = ? WHERE id = 0",
+                       (window, (used if saved == window else 0) + weight))
+
+    def report_used(self, used):
+        # The exchange's count also includes other clients on this IP; never go below it
+        window = int(time.time() // 60)
+        with self._tx() as db:
+            db.execute("UPDATE rate_budget SET used = MAX(used, ?) WHERE id = 0 AND window = ?", (used, window))
+
+    def session(self, exempt=False):
+        return BudgetedSession(self, exempt=exempt)
+
+    # ---- global exposure --------------------------------------------------
+
+    def publish_position(self, symbol, amount, price):
+        with self._tx() as db:
+            self._publish(db, symbol, amount, price)
+
+    def _publish(self, db, symbol, amount, price):
+        if amount:
+            db.execute("INSERT OR REPLACE INTO exposure VALUES (?, ?, ?, ?, ?)",
+                       (symbol, self.worker_id, float(amount), float(price), time.time()))
+        else:
+            db.execute("DELETE FROM exposure WHERE symbol = ?", (symbol,))
+
+    def reserve(self, portfolio, symbol, signal, qty, price):
+        """
+        Portfolio caps against the positions of every worker, checked and
+        recorded in one transaction so two workers can't both use the same
+        headroom. Returns cap_quantity's (qty, limit).
+        """
+        with self._tx() as db:
+            foreign = {s: (amount, p) for s, amount, p in db.execute(
+                "SELECT symbol, amount, price FROM exposure WHERE symbol != ?", (symbol,)) if s not in self.held}
+            for s in self.foreign - set(foreign):
+                portfolio.set_position(s, 0, 0)
+            for s, (amount, p) in foreign.items():
+                portfolio.set_position(s, amount, p)
+            self.foreign = set(foreign)
+            qty, limit = portfolio.cap_quantity(symbol, signal, qty, price)
+            if qty > 0:
+                self._publish(db, symbol, qty if signal == "LONG" else -qty, price)
+        return qty, limit
+
+
+class BudgetedSession(requests.Session):
+    """
+    requests.Session that takes each request's weight from the shared
+    budget first and reports the exchange's used-weight header back.
+    An exempt session (flatten, drawdown watchdog) never waits: its weight
+    is only charged, and runs in the gap between weight_per_minute and the
+    exchange's own limit.
+    """
+
+    def __init__(self, coordinator, exempt=False):
+        super().__init__()
+        self.coordinator = coordinator
+        self.exempt = exempt
+
+    def request(self, method, url, *args, **kwargs):
+        weight = request_weight(url, kwargs.get("params"))
+        if self.exempt:
+            try:
+                self.coordinator.charge(weight)
+            except sqlite3.Error:
+                pass
+        else:
+            self.coordinator.acquire(weight)
+        response = super().request(method, url, *args, **kwargs)
+        used = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used:
+            try:
+                self.coordinator.report_used(int(used))
+            except sqlite3.Error:
+                pass
+        return response
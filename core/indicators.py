@@ -0,0 +1,60 @@
+# core/indicators.py
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# NumPy versions of the pandas rolling indicators used across the bot. Every
+# function returns an array aligned with its input, NaN where pandas would be.
+
+
+def _rolling(values, window, reducer):
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=1)
+    return out
+
+
+def rolling_mean(values, window):
+    return _rolling(values, window, np.mean)
+
+
+def shift(values, periods=1):
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def true_range(high, low, close):
+    # Same as pd.concat([h - l, |h - prev_c|, |l - prev_c|]).max(axis=1): NaNs are skipped
+    prev_close = shift(close)
+    tr = np.fmax(np.abs(high - prev_close), np.abs(low - prev_close))
+    return np.fmax(high - low, tr)
+
+
+def atr(high, low, close, period=14):
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def rsi(close, period=14):
+    delta = np.diff(np.asarray(close, dtype=np.float64), prepend=np.nan)
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def rolling_max(values, window):
+    return _rolling(values, window, np.max)
+
+
+def rolling_min(values, window):
+    return _rolling(values, window, np.min)
+
+
+def ewm_mean(values, span):
+    # pandas' adjust=True EWM (Cython, one pass) so values match Series.ewm(span=...).mean() exactly
+    return pd.Series(values, dtype=np.float64).ewm(span=span).mean().to_numpy()
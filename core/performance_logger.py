@@ -1,12 +1,13 @@
 # core/performance_logger.py
 
+import csv
 import json
 import os
 from datetime import datetime
 
 LOG_FILE = "strategy_performance.json"
 
-def log_strategy_result(strategy_name, result, pnl, timestamp=None):
+def log_strategy_result(strategy_name, result, pnl, timestamp=None, symbol=None, timeframe=None):
     if timestamp is None:
         timestamp = datetime.utcnow().isoformat()
 
@@ -16,6 +17,10 @@ def log_strategy_result(strategy_name, result, pnl, timestamp=None):
         "result": result,  # "TP", "SL", "EMERGENCY", "CLOSE"
         "pnl": round(pnl, 2)
     }
+    if symbol:
+        # The selector trainer matches each trade to its own market's candles
+        entry["symbol"] = symbol
+        entry["timeframe"] = timeframe
 
     logs = []
     if os.path.exists(LOG_FILE):
@@ -26,3 +31,20 @@ def log_strategy_result(strategy_name, result, pnl, timestamp=None):
 
     with open(LOG_FILE, "w") as f:
         json.dump(logs[-200:], f, indent=2)  # keep last 200 entries
+
+
+ENTRY_LOG_FILE = "entry_signals.csv"
+ENTRY_FIELDS = ["timestamp", "symbol", "timeframe", "side", "strategy", "zone", "confidence", "entry", "sl", "tp"]
+
+def log_entry_signal(symbol, timeframe, side, strategy_name, zone, confidence, entry, sl, tp, timestamp=None):
+    # Every opened position, for replaying entries against other SL/TP settings
+    if timestamp is None:
+        timestamp = datetime.utcnow().isoformat()
+
+    row = [timestamp, symbol, timeframe, side, strategy_name, zone, confidence, entry, sl, tp]
+    new_file = not os.path.exists(ENTRY_LOG_FILE)
+    with open(ENTRY_LOG_FILE, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(ENTRY_FIELDS)
+        writer.writerow(row)
@@ -0,0 +1,186 @@
+# core/portfolio_risk.py
+
+import threading
+import numpy as np
+from config import PORTFOLIO_RISK
+from data.historical_loader import MS_PER_CANDLE
+
+RETURN_SLOTS = 512          # closed-candle returns kept per symbol for aligning late observers
+
+
+class PortfolioRisk:
+    """
+    Open notional across all symbols plus an exponentially weighted return
+    correlation matrix, updated one closed candle at a time. Every update and
+    every pre-trade check touches one row of the matrix, so the cost grows with
+    the number of symbols, not its square.
+
+    Limits (config.PORTFOLIO_RISK) are multiples of the risk balance:
+    gross |notional|, one symbol's |notional|, and the correlation-weighted
+    notional seen from the symbol being entered, which is what catches
+    BTC and ETH longs adding up to one large position.
+    """
+
+    def __init__(self, timeframe, balance=1000, limits=None, symbols=()):
+        self.limits = {**PORTFOLIO_RISK, **(limits or {})}
+        self.bar_ms = MS_PER_CANDLE[timeframe]
+        self.balance = balance
+        self.alpha = 1 - 0.5 ** (1 / self.limits["correlation_halflife"])
+        self.index = {}
+        self.lock = threading.Lock()
+
+        cap = max(8, len(symbols))
+        self.notional = np.zeros(cap)
+        self.gross = 0.0
+        self.last_close = np.full(cap, np.nan)
+        self.last_time = np.full(cap, -1, dtype=np.int64)
+        self.slot_time = np.full((cap, RETURN_SLOTS), -1, dtype=np.int64)
+        self.slot_return = np.zeros((cap, RETURN_SLOTS))
+        # Pairwise stats over the candles both symbols have: E[r_i r_j], E[r_i^2] (row i, seen with j), count
+        self.cross = np.zeros((cap, cap))
+        self.square = np.zeros((cap, cap))
+        self.overlap = np.zeros((cap, cap), dtype=np.int64)
+        for symbol in symbols:
+            self._slot(symbol)
+
+    def _slot(self, symbol):
+        i = self.index.get(symbol)
+        if i is not None:
+            return i
+        i = len(self.index)
+        if i == len(self.notional):
+            self._grow(2 * i)
+        self.index[symbol] = i
+        return i
+
+    def _grow(self, cap):
+        extra = cap - len(self.notional)
+        self.notional = np.pad(self.notional, (0, extra))
+        self.last_close = np.pad(self.last_close, (0, extra), constant_values=np.nan)
+        self.last_time = np.pad(self.last_time, (0, extra), constant_values=-1)
+        self.slot_time = np.pad(self.slot_time, ((0, extra), (0, 0)), constant_values=-1)
+        self.slot_return = np.pad(self.slot_return, ((0, extra), (0, 0)))
+        self.cross = np.pad(self.cross, ((0, extra), (0, extra)))
+        self.square = np.pad(self.square, ((0, extra), (0, extra)))
+        self.overlap = np.pad(self.overlap, ((0, extra), (0, extra)))
+
+    # ---- correlation ----------------------------------------------------
+
+    def observe(self, symbol, df):
+        """
+        Folds the closed candles of a kline frame (all but the forming last
+        one) that are newer than the last call for this symbol into the
+        correlation stats. Cheap to call every cycle.
+        """
+        closed = df.iloc[:-1]
+        if closed.empty:
+            return
+        times = closed.index.values.astype("datetime64[ms]").astype(np.int64)
+        closes = closed["close"].to_numpy(dtype=np.float64)
+        with self.lock:
+            i = self._slot(symbol)
+            new = times > self.last_time[i]
+            if not new.any():
+                return
+            start = int(np.argmax(new))
+            prev = self.last_close[i] if self.last_time[i] >= 0 else np.nan
+            if start > 0:
+                prev = closes[start - 1]
+            for t, close in zip(times[start:], closes[start:]):
+                if np.isfinite(prev) and prev > 0:
+                    self._update(i, int(t), close / prev - 1)
+                prev = close
+            self.last_time[i] = times[-1]
+            self.last_close[i] = closes[-1]
+
+    def _update(self, i, t, r):
+        slot = (t // self.bar_ms) % RETURN_SLOTS
+        self.slot_time[i, slot] = t
+        self.slot_return[i, slot] = r
+
+        # Every symbol that already has a return for this candle
+        n = len(self.index)
+        peers = np.flatnonzero(self.slot_time[:n, slot] == t)
+        peers = peers[peers != i]
+        rj = self.slot_return[peers, slot]
+        self.overlap[i, peers] += 1
+        self.overlap[peers, i] = self.overlap[i, peers]
+        # Plain running average until the half-life fills, then exponential forgetting
+        a = np.maximum(self.alpha, 1 / self.overlap[i, peers])
+        self.cross[i, peers] += a * (r * rj - self.cross[i, peers])
+        self.cross[peers, i] = self.cross[i, peers]
+        self.square[i, peers] += a * (r * r - self.square[i, peers])
+        self.square[peers, i] += a * (rj * rj - self.square[peers, i])
+
+    def correlation_row(self, symbol):
+        """
+        Return correlation of `symbol` with every tracked symbol (index order),
+        the configured prior for pairs without enough shared candles.
+        """
+        with self.lock:
+            return self._correlation_row(self._slot(symbol))
+
+    def _correlation_row(self, i):
+        n = len(self.index)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            row = self.cross[i, :n] / np.sqrt(self.square[i, :n] * self.square[:n, i])
+        trusted = (self.overlap[i, :n] >= self.limits["min_overlap"]) & np.isfinite(row)
+        row = np.where(trusted, np.clip(row, -1, 1), self.limits["prior_correlation"])
+        row[i] = 1.0
+        return row
+
+    # ---- exposure -------------------------------------------------------
+
+    def set_balance(self, balance):
+        self.balance = balance
+
+    def set_position(self, symbol, position_amt, price):
+        """
+        Signed position size (positionAmt) at a current price; 0 when flat.
+        """
+        with self.lock:
+            i = self._slot(symbol)
+            notional = float(position_amt) * float(price) if position_amt else 0.0
+            self.gross += abs(notional) - abs(self.notional[i])
+            self.notional[i] = notional
+
+    def cap_quantity(self, symbol, side, qty, price):
+        """
+        Largest part of a new `side` ("LONG"/"SHORT") order of qty at price
+        that keeps every portfolio limit: (allowed qty, binding limit or None).
+        """
+        d = 1.0 if side == "LONG" else -1.0
+        with self.lock:
+            i = self._slot(symbol)
+            n = len(self.index)
+            budget = self.balance
+            current = self.notional[i]
+            correlated = float(self._correlation_row(i) @ self.notional[:n])
+
+            # Most notional each limit still allows in direction d
+            room = {
+                "symbol": self.limits["max_symbol_exposure"] * budget - d * current,
+                "gross": self.limits["max_gross_exposure"] * budget - (self.gross - abs(current)) - d * current,
+                "correlated": self.limits["max_correlated_exposure"] * budget - d * correlated,
+            }
+        limit, headroom = min(room.items(), key=lambda item: item[1])
+        wanted = qty * price
+        if wanted <= headroom:
+            return qty, None
+        return max(0.0, headroom) / price, limit
+
+    def snapshot(self):
+        """
+        Gross/net notional and each symbol's notional and correlation-weighted
+        exposure, for reports (O(symbols^2)).
+        """
+        with self.lock:
+            n = len(self.index)
+            exposures = {s: float(self._correlation_row(i) @ self.notional[:n]) for s, i in self.index.items()}
+            return {
+                "balance": self.balance,
+                "gross": self.gross,
+                "net": float(self.notional[:n].sum()),
+                "notional": {s: float(self.notional[i]) for s, i in self.index.items()},
+                "correlated": exposures,
+            }
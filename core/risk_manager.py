@@ -5,7 +5,6 @@ import numpy as np
 from config import TRAILING_STOP
 from core.state_tracker import StateTracker
 from exchange.binance import BinanceFuturesClient
-from utils.telegram import send_telegram
 
 class RiskManager:
     MAX_RISK_PCT = 0.02   # 2% risk per trade
@@ -16,63 +15,176 @@ class RiskManager:
     FALLBACK_SL_PCT = 0.003 #0.01
     FALLBACK_TP_PCT = 0.006 #0.02
 
+    # Phase 13 zone and Phase 14 confidence adjustments, applied on top of the ATR multipliers
+    ZONE_MULTIPLIERS = {
+        "Bullish": (0.9, 1.2),     # (SL, TP)
+        "Bearish": (1.2, 0.9),
+        "Sideways": (0.8, 0.8),
+    }
+    FULL_CONFIDENCE = 0.99
+    CONFIDENCE_TIERS = [           # (min confidence, SL/TP factor), first match wins below FULL_CONFIDENCE
+        (0.95, 0.9),
+        (0.90, 0.85),
+        (0.80, 0.75),
+    ]
+
+    @staticmethod
+    def calculate_position(signal: str, df: pd.DataFrame, balance: float = 1000, zone: str = None, confidence: float = 1.0,
+                           verbose: bool = True):
+        close_price, atr, volatility = RiskManager.latest_state(df)
+        return RiskManager.position_from_state(signal, close_price, atr, volatility, balance, zone, confidence, verbose)
+
+    @staticmethod
+    def latest_state(df: pd.DataFrame, period: int = 14, volatility_window: int = 10):
+        """
+        (close, ATR, volatility) of the last candle from the tail of the frame
+        only: the same values as _calculate_atr and pct_change().rolling(10).std(),
+        without rolling over the whole history. ATR is None below `period` candles.
+        """
+        tail = df.iloc[-(max(period, volatility_window) + 1):]
+        high = tail["high"].to_numpy(dtype=np.float64)
+        low = tail["low"].to_numpy(dtype=np.float64)
+        close = tail["close"].to_numpy(dtype=np.float64)
+
+        atr = None
+        if len(df) >= period:
+            prev_close = np.concatenate(([np.nan], close[:-1]))
+            tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+            atr = float(tr[-period:].mean())
+
+        returns = close[1:] / close[:-1] - 1
+        volatility = float(returns[-volatility_window:].std(ddof=1)) if len(returns) >= volatility_window else np.nan
+        return float(close[-1]), atr, volatility
+
+    @staticmethod
+    def calculate_positions(signals, frames, balance=1000, zones=None, confidence=1.0):
+        """
+        calculate_position for many symbols at once: one signal and candle
+        frame per symbol → (qty, leverage, sl, tp) arrays.
+        """
+        state = np.array([RiskManager.latest_state(df) for df in frames], dtype=np.float64).reshape(-1, 3)
+        return RiskManager.position_arrays(signals, state[:, 0], state[:, 1], state[:, 2], balance, zones, confidence)
+
     @staticmethod
-    def calculate_position(signal: str, df: pd.DataFrame, balance: float = 1000, zone: str = None, confidence: float = 1.0):
-        close_price = df["close"].iloc[-1]
-        atr = RiskManager._calculate_atr(df)
+    def position_arrays(signals, close, atr, volatility, balance=1000, zones=None, confidence=1.0):
+        """
+        Vectorized position_from_state: per-symbol signals ("LONG"/"SHORT" or
+        +1/-1), latest close/ATR/volatility, scalar or per-symbol balance, zones
+        and confidence → (qty, leverage, sl, tp) arrays, element for element
+        what position_from_state returns, including its fallbacks: fallback
+        SL/TP for invalid ATR or zero SL distance, (0, 1, close, close) for an
+        unknown signal needing the fallback, (0, 1, sl, tp) for an invalid qty.
+        """
+        signals = np.asarray(signals)
+        is_long = (signals == "LONG") | (signals == 1) if signals.dtype.kind in "OUS" else signals == 1
+        is_short = (signals == "SHORT") if signals.dtype.kind in "OUS" else signals == -1
+        close = np.asarray(close, dtype=np.float64)
+        atr = np.asarray(atr, dtype=np.float64)
+        volatility = np.asarray(volatility, dtype=np.float64)
+        sl_mult, tp_mult = RiskManager.sl_tp_multiplier_arrays(zones, np.broadcast_to(confidence, close.shape))
+
+        # Like position_from_state, anything but LONG takes the SHORT branch when ATR is usable
+        side = np.where(is_long, 1.0, -1.0)
+        with np.errstate(invalid="ignore"):
+            needs_fallback = ~(np.isfinite(atr) & (atr != 0)) | (np.abs(close - (close - side * atr * sl_mult)) == 0)
+        sl, tp = RiskManager.bracket_levels(side, close, atr, sl_mult, tp_mult)
+        unknown = needs_fallback & ~(is_long | is_short)
+        sl = np.where(unknown, close, sl)
+        tp = np.where(unknown, close, tp)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            qty = np.asarray(balance, dtype=np.float64) * RiskManager.MAX_RISK_PCT / np.abs(close - sl)
+        leverage = RiskManager.leverage_for(volatility)
+        skip = unknown | ~np.isfinite(qty) | (qty == 0)
+        qty = np.where(skip, 0.0, qty)
+        leverage = np.where(skip, 1, leverage).astype(np.int64)
+        return qty, leverage, sl, tp
 
+    @staticmethod
+    def leverage_for(volatility):
+        """
+        DEFAULT_LEVERAGE scaled down by volatility, within 1..MAX_LEVERAGE;
+        1 when volatility is unknown (NaN, e.g. too few candles). Scalar or array.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            leverage = np.trunc(RiskManager.DEFAULT_LEVERAGE / (np.asarray(volatility, dtype=np.float64) * 100 + 1))
+        return np.minimum(RiskManager.MAX_LEVERAGE, np.maximum(1, np.nan_to_num(leverage, nan=1)))
+
+    @staticmethod
+    def sl_tp_multipliers(zone: str = None, confidence: float = 1.0, verbose: bool = False):
         # Default multipliers
         sl_mult = RiskManager.SL_ATR_MULTIPLIER
         tp_mult = RiskManager.TP_ATR_MULTIPLIER
 
         # 📉 Adjust based on zone if available (Phase 13)
         if zone:
-            print(f"[🌍] Adjusting SL/TP for market zone: {zone}")
-            if zone == "Bullish":
-                sl_mult *= 0.9
-                tp_mult *= 1.2
-            elif zone == "Bearish":
-                sl_mult *= 1.2
-                tp_mult *= 0.9
-            elif zone == "Sideways":
-                sl_mult *= 0.8
-                tp_mult *= 0.8
-            print(f"[⚙️] Zone-based multipliers applied: SL x{sl_mult:.2f}, TP x{tp_mult:.2f}")
+            if verbose:
+                print(f"[🌍] Adjusting SL/TP for market zone: {zone}")
+            if zone in RiskManager.ZONE_MULTIPLIERS:
+                zone_sl, zone_tp = RiskManager.ZONE_MULTIPLIERS[zone]
+                sl_mult *= zone_sl
+                tp_mult *= zone_tp
+            if verbose:
+                print(f"[⚙️] Zone-based multipliers applied: SL x{sl_mult:.2f}, TP x{tp_mult:.2f}")
 
         # 📐 Adjust further if ML confidence is weak (Phase 14)
-        if confidence < 0.99:
-            if confidence >= 0.95:
-                sl_mult *= 0.9
-                tp_mult *= 0.9
-            elif confidence >= 0.90:
-                sl_mult *= 0.85
-                tp_mult *= 0.85
-            elif confidence >= 0.80:
-                sl_mult *= 0.75
-                tp_mult *= 0.75
-            print(f"[📐] Confidence-based multipliers applied: SL x{sl_mult:.2f}, TP x{tp_mult:.2f} for conf {confidence:.2f}")
+        if confidence < RiskManager.FULL_CONFIDENCE:
+            for min_confidence, factor in RiskManager.CONFIDENCE_TIERS:
+                if confidence >= min_confidence:
+                    sl_mult *= factor
+                    tp_mult *= factor
+                    break
+            if verbose:
+                print(f"[📐] Confidence-based multipliers applied: SL x{sl_mult:.2f}, TP x{tp_mult:.2f} for conf {confidence:.2f}")
 
+        return sl_mult, tp_mult
 
-        if atr is None or np.isnan(atr) or atr == 0:
-            print(f"[⚠️] Invalid ATR ({atr}). Using fallback SL/TP percentages.")
-            sl_pct = RiskManager.FALLBACK_SL_PCT
-            tp_pct = RiskManager.FALLBACK_TP_PCT
-
-            if signal == "LONG":
-                sl_price = close_price * (1 - sl_pct)
-                tp_price = close_price * (1 + tp_pct)
-            elif signal == "SHORT":
-                sl_price = close_price * (1 + sl_pct)
-                tp_price = close_price * (1 - tp_pct)
+    @staticmethod
+    def sl_tp_multiplier_arrays(zones=None, confidence=1.0):
+        """
+        Vectorized sl_tp_multipliers: per-bar zones (names, or ZONE_CODES
+        integers) and scalar or per-bar confidence → (sl_mult, tp_mult) arrays.
+        """
+        confidence = np.asarray(confidence, dtype=np.float64)
+        n = len(zones) if zones is not None else confidence.size
+        sl_mult = np.full(n, RiskManager.SL_ATR_MULTIPLIER)
+        tp_mult = np.full(n, RiskManager.TP_ATR_MULTIPLIER)
+
+        if zones is not None:
+            zones = np.asarray(zones)
+            if zones.dtype.kind in "iu":
+                from ml.selector_predictor import ZONE_CODES
+                keys = ZONE_CODES
             else:
-                print(f"[❌] Unknown signal type: {signal}")
-                return 0, 1, close_price, close_price
+                keys = {zone: zone for zone in RiskManager.ZONE_MULTIPLIERS}
+            for zone, key in keys.items():
+                zone_sl, zone_tp = RiskManager.ZONE_MULTIPLIERS[zone]
+                mask = zones == key
+                sl_mult[mask] *= zone_sl
+                tp_mult[mask] *= zone_tp
+
+        conditions = [confidence >= RiskManager.FULL_CONFIDENCE]
+        conditions += [confidence >= min_confidence for min_confidence, _ in RiskManager.CONFIDENCE_TIERS]
+        factor = np.select(conditions, [1.0] + [f for _, f in RiskManager.CONFIDENCE_TIERS], 1.0)
+        return sl_mult * factor, tp_mult * factor
 
-            # 🔒 Ensure SL and TP are not equal to close (which causes zero distance)
-            if abs(close_price - sl_price) < 0.00001:
-                sl_price += 1 if signal == "LONG" else -1
-            if abs(close_price - tp_price) < 0.00001:
-                tp_price += 1 if signal == "LONG" else -1
+    @staticmethod
+    def position_from_state(signal: str, close_price: float, atr: float, volatility: float, balance: float = 1000,
+                            zone: str = None, confidence: float = 1.0, verbose: bool = True):
+        """
+        Sizing from the latest close/ATR/volatility instead of a candle frame,
+        so backtests can size without rebuilding DataFrames.
+        """
+        sl_mult, tp_mult = RiskManager.sl_tp_multipliers(zone, confidence, verbose)
+
+        if atr is None or np.isnan(atr) or atr == 0:
+            if verbose:
+                print(f"[⚠️] Invalid ATR ({atr}). Using fallback SL/TP percentages.")
+            sl_price, tp_price = RiskManager._fallback_levels(signal, close_price)
+            if sl_price is None:
+                if verbose:
+                    print(f"[❌] Unknown signal type: {signal}")
+                return 0, 1, close_price, close_price
 
         else:
             sl_price = close_price - atr * sl_mult if signal == "LONG" else close_price + atr * sl_mult
@@ -81,29 +193,17 @@ class RiskManager:
         stop_loss_distance = abs(close_price - sl_price)
 
         if stop_loss_distance == 0:
-            print(f"[❌] SL distance is zero! Possible bug. SL = {sl_price}, Close = {close_price}, ATR = {atr}, SL Mult = {sl_mult}")
-            print("[⚠️] Using fallback SL/TP values...")
+            if verbose:
+                print(f"[❌] SL distance is zero! Possible bug. SL = {sl_price}, Close = {close_price}, ATR = {atr}, SL Mult = {sl_mult}")
+                print("[⚠️] Using fallback SL/TP values...")
 
             # Redo with fallback values, same as above block
-            sl_pct = RiskManager.FALLBACK_SL_PCT
-            tp_pct = RiskManager.FALLBACK_TP_PCT
-
-            if signal == "LONG":
-                sl_price = close_price * (1 - sl_pct)
-                tp_price = close_price * (1 + tp_pct)
-            elif signal == "SHORT":
-                sl_price = close_price * (1 + sl_pct)
-                tp_price = close_price * (1 - tp_pct)
-            else:
-                print(f"[❌] Unknown signal type: {signal}")
+            sl_price, tp_price = RiskManager._fallback_levels(signal, close_price)
+            if sl_price is None:
+                if verbose:
+                    print(f"[❌] Unknown signal type: {signal}")
                 return 0, 1, close_price, close_price
 
-            # 🔒 Safety net again
-            if abs(close_price - sl_price) < 0.00001:
-                sl_price += 1 if signal == "LONG" else -1
-            if abs(close_price - tp_price) < 0.00001:
-                tp_price += 1 if signal == "LONG" else -1
-
             stop_loss_distance = abs(close_price - sl_price)
 
 
@@ -111,16 +211,58 @@ class RiskManager:
         qty = risk_amount / stop_loss_distance
 
         if not np.isfinite(qty) or qty == 0:
-            print(f"[❌] Invalid qty calculated: {qty}. Skipping this trade.")
+            if verbose:
+                print(f"[❌] Invalid qty calculated: {qty}. Skipping this trade.")
             return 0, 1, sl_price, tp_price
 
         # ⚙️ Leverage adjustment based on volatility
-        volatility = df["close"].pct_change().rolling(10).std().iloc[-1]
-        leverage = min(RiskManager.MAX_LEVERAGE, max(1, int(RiskManager.DEFAULT_LEVERAGE / (volatility * 100 + 1))))
+        leverage = int(RiskManager.leverage_for(volatility))
 
-        print(f"[💡] RiskManager decision → Qty: {qty:.4f}, Leverage: {leverage}, SL: {sl_price:.2f}, TP: {tp_price:.2f}")
+        if verbose:
+            print(f"[💡] RiskManager decision → Qty: {qty:.4f}, Leverage: {leverage}, SL: {sl_price:.2f}, TP: {tp_price:.2f}")
         return qty, leverage, sl_price, tp_price
 
+    @staticmethod
+    def bracket_levels(side, close, atr, sl_mult, tp_mult):
+        """
+        Vectorized SL/TP prices for entries (side +1 LONG / -1 SHORT), with the
+        same fallback as position_from_state for invalid ATR or zero SL distance.
+        """
+        side = np.asarray(side, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        atr = np.asarray(atr, dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            sl = close - side * atr * sl_mult
+            tp = close + side * atr * tp_mult
+            fallback = ~(np.isfinite(atr) & (atr != 0)) | (np.abs(close - sl) == 0)
+
+        fallback_sl = close * (1 - side * RiskManager.FALLBACK_SL_PCT)
+        fallback_tp = close * (1 + side * RiskManager.FALLBACK_TP_PCT)
+        fallback_sl = np.where(np.abs(close - fallback_sl) < 0.00001, fallback_sl + side, fallback_sl)
+        fallback_tp = np.where(np.abs(close - fallback_tp) < 0.00001, fallback_tp + side, fallback_tp)
+        return np.where(fallback, fallback_sl, sl), np.where(fallback, fallback_tp, tp)
+
+    @staticmethod
+    def _fallback_levels(signal, close_price):
+        sl_pct = RiskManager.FALLBACK_SL_PCT
+        tp_pct = RiskManager.FALLBACK_TP_PCT
+
+        if signal == "LONG":
+            sl_price = close_price * (1 - sl_pct)
+            tp_price = close_price * (1 + tp_pct)
+        elif signal == "SHORT":
+            sl_price = close_price * (1 + sl_pct)
+            tp_price = close_price * (1 - tp_pct)
+        else:
+            return None, None
+
+        # 🔒 Ensure SL and TP are not equal to close (which causes zero distance)
+        if abs(close_price - sl_price) < 0.00001:
+            sl_price += 1 if signal == "LONG" else -1
+        if abs(close_price - tp_price) < 0.00001:
+            tp_price += 1 if signal == "LONG" else -1
+        return sl_price, tp_price
+
 
     @staticmethod
     def _calculate_atr(df: pd.DataFrame, period: int = 14):
@@ -138,7 +280,39 @@ class RiskManager:
     
 
 
+def trailing_stop_update(signal, entry_price, current_price, sl_price, tp_price, trailing_config):
+    """
+    Pure trailing-stop rule shared by the live check and the backtester.
+    Returns (action, activation_price, new_sl) with action one of
+    "update", "not_better", "waiting", "beyond_tp" or "unknown".
+    """
+    activation_pct = trailing_config["activation_pct"]
+    trail_pct = trailing_config["trail_pct"]
+
+    if signal == "LONG":
+        activation_price = entry_price * (1 + activation_pct)
+        new_sl = current_price * (1 - trail_pct)
+        if activation_price > tp_price:
+            return "beyond_tp", activation_price, new_sl
+        if current_price < activation_price:
+            return "waiting", activation_price, new_sl
+        return ("update" if new_sl > sl_price else "not_better"), activation_price, new_sl
+
+    elif signal == "SHORT":
+        activation_price = entry_price * (1 - activation_pct)
+        new_sl = current_price * (1 + trail_pct)
+        if activation_price < tp_price:
+            return "beyond_tp", activation_price, new_sl
+        if current_price > activation_price:
+            return "waiting", activation_price, new_sl
+        return ("update" if new_sl < sl_price else "not_better"), activation_price, new_sl
+
+    return "unknown", None, None
+
+
 def trailing_stop_check(client, symbol, position, entry_price, signal, sl_price, tp_price, trailing_config):
+    from utils.telegram import send_telegram
+
     current_price = client.get_current_price(symbol)
     if current_price is None:
         print(f"[⚠️] Skipping trailing check — current price not available for {symbol}")
@@ -148,9 +322,6 @@ def trailing_stop_check(client, symbol, position, entry_price, signal, sl_price,
     trail_pct = trailing_config["trail_pct"]
     position_side = position.get("positionSide", "BOTH")
 
-    activation_price = None
-    new_sl = None
-
     print(f"\n[🔍] Trailing SL Check for {symbol}")
     print(f"     ➤ Signal: {signal}")
     print(f"     ➤ Entry Price: {entry_price:.2f}")
@@ -158,59 +329,35 @@ def trailing_stop_check(client, symbol, position, entry_price, signal, sl_price,
     print(f"     ➤ TP: {tp_price:.2f} | SL: {sl_price:.2f}")
     print(f"     ➤ Trailing Config → Activation: {activation_pct*100:.2f}%, Trail: {trail_pct*100:.2f}%")
 
-    if signal == "LONG":
-        activation_price = entry_price * (1 + activation_pct)
-        new_sl = current_price * (1 - trail_pct)
+    action, activation_price, new_sl = trailing_stop_update(
+        signal, entry_price, current_price, sl_price, tp_price, trailing_config
+    )
 
-        if activation_price > tp_price:
-            print(f"[⛔] Skipping trailing — activation ({activation_price:.2f}) > TP ({tp_price:.2f})")
-            return
-
-        print(f"     ➤ Activation Price (LONG): {activation_price:.2f} | New SL: {new_sl:.2f}")
-
-        if current_price >= activation_price:
-            if new_sl > sl_price:
-                print(f"[🚨] Triggering Trailing SL (LONG) — New SL: {new_sl:.2f} > Old SL: {sl_price:.2f}")
-                try:
-                    client.cancel_stop_loss_order(symbol)
-                    client.set_stop_loss(symbol, new_sl, position_side=position_side)
-                    send_telegram(
-                        f"📉 <b>Trailing SL Updated (LONG)</b>\n"
-                        f"Symbol: {symbol}\nNew SL: {new_sl:.2f}\nEntry: {entry_price:.2f}\nPrice: {current_price:.2f}"
-                    )
-                except Exception as e:
-                    print(f"[⚠️] Failed to update trailing SL: {e}")
-            else:
-                print(f"[ℹ️] Skipped update — New SL not better than current.")
-        else:
-            print(f"[🕒] Waiting — current price below activation ({activation_price:.2f})")
+    if action == "unknown":
+        print(f"[⚠️] Unknown signal type: {signal}")
+        return
 
-    elif signal == "SHORT":
-        activation_price = entry_price * (1 - activation_pct)
-        new_sl = current_price * (1 + trail_pct)
+    if action == "beyond_tp":
+        relation = ">" if signal == "LONG" else "<"
+        print(f"[⛔] Skipping trailing — activation ({activation_price:.2f}) {relation} TP ({tp_price:.2f})")
+        return
 
-        if activation_price < tp_price:
-            print(f"[⛔] Skipping trailing — activation ({activation_price:.2f}) < TP ({tp_price:.2f})")
-            return
-
-        print(f"     ➤ Activation Price (SHORT): {activation_price:.2f} | New SL: {new_sl:.2f}")
-
-        if current_price <= activation_price:
-            if new_sl < sl_price:
-                print(f"[🚨] Triggering Trailing SL (SHORT) — New SL: {new_sl:.2f} < Old SL: {sl_price:.2f}")
-                try:
-                    client.cancel_stop_loss_order(symbol)
-                    client.set_stop_loss(symbol, new_sl, position_side=position_side)
-                    send_telegram(
-                        f"📉 <b>Trailing SL Updated (SHORT)</b>\n"
-                        f"Symbol: {symbol}\nNew SL: {new_sl:.2f}\nEntry: {entry_price:.2f}\nPrice: {current_price:.2f}"
-                    )
-                except Exception as e:
-                    print(f"[⚠️] Failed to update trailing SL: {e}")
-            else:
-                print(f"[ℹ️] Skipped update — New SL not better than current.")
-        else:
-            print(f"[🕒] Waiting — current price above activation ({activation_price:.2f})")
+    print(f"     ➤ Activation Price ({signal}): {activation_price:.2f} | New SL: {new_sl:.2f}")
 
+    if action == "waiting":
+        relation = "below" if signal == "LONG" else "above"
+        print(f"[🕒] Waiting — current price {relation} activation ({activation_price:.2f})")
+    elif action == "not_better":
+        print(f"[ℹ️] Skipped update — New SL not better than current.")
     else:
-        print(f"[⚠️] Unknown signal type: {signal}")
+        relation = ">" if signal == "LONG" else "<"
+        print(f"[🚨] Triggering Trailing SL ({signal}) — New SL: {new_sl:.2f} {relation} Old SL: {sl_price:.2f}")
+        try:
+            client.cancel_stop_loss_order(symbol)
+            client.set_stop_loss(symbol, new_sl, position_side=position_side)
+            send_telegram(
+                f"📉 <b>Trailing SL Updated ({signal})</b>\n"
+                f"Symbol: {symbol}\nNew SL: {new_sl:.2f}\nEntry: {entry_price:.2f}\nPrice: {current_price:.2f}"
+            )
+        except Exception as e:
+            print(f"[⚠️] Failed to update trailing SL: {e}")
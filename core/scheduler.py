@@ -0,0 +1,119 @@
+# core/scheduler.py
+
+import time
+import threading
+from config import SCHEDULER
+from data.historical_loader import MS_PER_CANDLE
+
+
+class CycleScheduler:
+    """
+    Decides when each (symbol, timeframe) is processed next instead of a fixed
+    sleep between passes:
+
+    - flat symbols wake right after their candle closes (close_delay_seconds
+      later) and are evaluated on the closed candles, once per candle;
+    - open positions are also polled inside the candle, every near_seconds
+      when price is within near_pct of SL or TP, stretching linearly with the
+      distance up to position_seconds.
+
+    Deadlines are absolute (epoch-aligned like Binance candles), so the time a
+    pass takes is absorbed rather than added: a slow pass never pushes the
+    next candle-close evaluation later.
+    """
+
+    def __init__(self, symbols, timeframe, config=None, clock=time.time):
+        self.config = {**SCHEDULER, **(config or {})}
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.bar_seconds = {}
+        self.next_due = {}
+        self.reason = {}
+        self.in_position = {}
+        for symbol in symbols:
+            self.add(symbol, timeframe)
+
+    def add(self, symbol, timeframe, due=None):
+        with self.lock:
+            self.bar_seconds[(symbol, timeframe)] = MS_PER_CANDLE[timeframe] / 1000
+            self.next_due[(symbol, timeframe)] = self.clock() if due is None else due
+            self.reason[(symbol, timeframe)] = "start"
+
+    def remove(self, symbol, timeframe):
+        with self.lock:
+            for table in (self.bar_seconds, self.next_due, self.reason, self.in_position):
+                table.pop((symbol, timeframe), None)
+
+    def candle_close_after(self, timeframe_key, now):
+        bar = self.bar_seconds[timeframe_key]
+        return (now // bar + 1) * bar + self.config["close_delay_seconds"]
+
+    # ---- per pass -------------------------------------------------------
+
+    def wait(self, stop=None):
+        """
+        Sleeps until the earliest deadline and returns the (symbol, timeframe)
+        keys due now. Each returned key is re-armed retry_seconds ahead, so a
+        pass that fails before observe() is retried rather than dropped.
+        """
+        while True:
+            now = self.clock()
+            with self.lock:
+                earliest = min(self.next_due.values(), default=now + self.config["retry_seconds"])
+            if earliest <= now:
+                break
+            if stop is not None:
+                if stop.wait(earliest - now):
+                    return []
+            else:
+                time.sleep(earliest - now)
+
+        with self.lock:
+            due = sorted((k for k, t in self.next_due.items() if t <= now), key=self.next_due.get)
+            for key in due:
+                self.next_due[key] = now + self.config["retry_seconds"]
+                self.reason[key] = "retry"
+        return due
+
+    def observe(self, symbol, timeframe, df=None, position_amt=0.0, sl=None, tp=None):
+        """
+        Re-arms the symbol after it was processed, from its candles (for the
+        price), its position and the protective levels.
+        Returns the next wake-up time.
+        """
+        key = (symbol, timeframe)
+        now = self.clock()
+        c = self.config
+        due = self.candle_close_after(key, now)
+        reason = "candle"
+
+        if position_amt:
+            price = float(df["close"].iloc[-1]) if df is not None and len(df) else None
+            levels = [float(x) for x in (sl, tp) if x]
+            interval = c["position_seconds"]
+            if price and levels:
+                distance = min(abs(price - x) for x in levels) / price
+                interval = min(c["position_seconds"], max(c["near_seconds"],
+                                                          c["near_seconds"] * distance / c["near_pct"]))
+            if now + interval < due:
+                due, reason = now + interval, "position"
+
+        with self.lock:
+            if key in self.next_due:
+                self.next_due[key] = due
+                self.reason[key] = reason
+                self.in_position[key] = bool(position_amt)
+        return due
+
+    def flat(self, keys):
+        # Keys last seen without a position: the ones that need a strategy evaluation
+        with self.lock:
+            return [k for k in keys if not self.in_position.get(k)]
+
+    def snapshot(self):
+        now = self.clock()
+        with self.lock:
+            return {
+                f"{s} {tf}": {"in_seconds": round(self.next_due[(s, tf)] - now, 1), "reason": self.reason[(s, tf)]}
+                for s, tf in sorted(self.next_due)
+            }
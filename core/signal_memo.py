@@ -0,0 +1,66 @@
+# core/signal_memo.py
+
+import os
+import threading
+from core.strategy_registry import get_registry
+from core.performance_logger import LOG_FILE
+from ml.predictor import resolve_model_path
+from ml.selector_predictor import SELECTOR_MODEL_PATH, SELECTOR_ENCODER_PATH
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def model_version(symbol, timeframe):
+    """
+    Everything besides the candles that an entry decision depends on: the
+    direction model in use and its mtime, the selector files, the strategy
+    registry version and the strategy scores the fallback ranks by.
+    """
+    model_path = resolve_model_path(symbol, timeframe)
+    return (model_path, _mtime(model_path), _mtime(SELECTOR_MODEL_PATH), _mtime(SELECTOR_ENCODER_PATH),
+            get_registry().version, _mtime(LOG_FILE))
+
+
+class SignalMemo:
+    """
+    The last entry decision (signal, ML confidence, zone, strategy) per
+    (symbol, timeframe), computed from the closed candles only and valid
+    while the last closed candle's open time and model_version() are
+    unchanged: a re-run would see the same inputs and decide the same way.
+    Any pass inside the same candle reuses it and skips kline features, ML
+    predict, selector and strategy signals; the position and risk checks
+    still run every pass.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(symbol, timeframe, closed):
+        # `closed` is exactly the frame the decision is computed from: closed candles only
+        closed_open_ms = closed.index[-1].value // 1_000_000 if len(closed) else None
+        return closed_open_ms, model_version(symbol, timeframe)
+
+    def get(self, symbol, timeframe, closed):
+        stamp = self._stamp(symbol, timeframe, closed)
+        with self.lock:
+            entry = self.entries.get((symbol, timeframe))
+            if entry is not None and entry[0] == stamp:
+                return dict(entry[1])
+            return None
+
+    def put(self, symbol, timeframe, closed, decision):
+        stamp = self._stamp(symbol, timeframe, closed)
+        with self.lock:
+            self.entries[(symbol, timeframe)] = (stamp, dict(decision))
+
+    def evict(self, symbol, timeframe=None):
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == symbol and (timeframe is None or k[1] == timeframe)]:
+                del self.entries[key]
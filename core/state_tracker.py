@@ -4,6 +4,7 @@ import requests
 import time
 import json
 import os
+import glob
 from config import BINANCE_API_KEY, BINANCE_API_SECRET, BASE_URL
 import hmac, hashlib
 from urllib.parse import urlencode
@@ -104,6 +105,18 @@ class StateTracker:
         return None
 
 
+    @staticmethod
+    def load_all_position_states():
+        # Every saved position, one state file per symbol
+        states = []
+        for path in sorted(glob.glob(StateTracker._get_state_file("*"))):
+            with open(path, "r") as f:
+                state = json.load(f)
+            if state.get("symbol"):
+                states.append(state)
+        return states
+
+
     @staticmethod
     def clear_state(symbol):
         path = StateTracker._get_state_file(symbol)
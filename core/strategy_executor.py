@@ -0,0 +1,147 @@
+# core/strategy_executor.py
+
+import os
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait
+import numpy as np
+from strategies.base import OHLCV, SIGNAL_NAMES
+
+DEFAULT_DEADLINE_SECONDS = 5.0
+WARMUP_TIMEOUT_SECONDS = 120.0
+
+_warm_barrier = None
+
+
+def _warm_worker(barrier):
+    # Pool initializer: every worker pays its imports and the registry build before any deadline runs
+    global _warm_barrier
+    from core.strategy_registry import get_registry
+    get_registry()
+    _warm_barrier = barrier
+
+
+def _ready():
+    # Blocks until every worker is warm, so one fast worker can't answer all the pings
+    _warm_barrier.wait(timeout=WARMUP_TIMEOUT_SECONDS)
+    return os.getpid()
+
+
+def _attach(shm_name, n_bars):
+    # Pool workers share the parent's resource tracker, so the parent's unlink covers this attach too
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray((len(OHLCV), n_bars), dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+    return shm, block
+
+
+def _evaluate(shm_name, n_bars, symbol, timeframe, strategy_name):
+    from core.strategy_registry import get_registry
+
+    started = time.perf_counter()
+    shm, block = _attach(shm_name, n_bars)
+    try:
+        arrays = {col: block[i] for i, col in enumerate(OHLCV)}
+        strategy = next((s for s in get_registry().get_strategies(symbol, timeframe) if s.name() == strategy_name), None)
+        if strategy is None:
+            raise ValueError(f"Unknown strategy {strategy_name}")
+        signals = strategy.generate_signals(arrays)
+        signal = int(signals[-1]) if len(signals) else 0
+    finally:
+        arrays = block = signals = None  # drop buffer views before closing the mapping
+        shm.close()
+    return symbol, strategy_name, signal, time.perf_counter() - started
+
+
+class StrategyEvaluationExecutor:
+    """
+    Fans a cycle's strategy × symbol signal computations out over a process
+    pool. Each symbol's OHLCV goes into one shared-memory block that workers map
+    read-only, so DataFrames are never pickled. Results are gathered until a
+    per-cycle deadline; anything slower is skipped and reported. The pool is
+    started and warmed when built, so the deadline only measures evaluation.
+    """
+
+    def __init__(self, max_workers=None, deadline=DEFAULT_DEADLINE_SECONDS):
+        self.deadline = deadline
+        self.max_workers = max_workers or os.cpu_count() or 1
+        ctx = mp.get_context("spawn")
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx,
+                                        initializer=_warm_worker, initargs=(ctx.Barrier(self.max_workers),))
+        self.warm()
+
+    def warm(self):
+        """
+        Starts every worker and waits until all have imported the strategies
+        and built the registry. Returns the seconds it took.
+        """
+        started = time.perf_counter()
+        futures = [self.pool.submit(_ready) for _ in range(self.max_workers)]
+        done, _ = wait(futures, timeout=WARMUP_TIMEOUT_SECONDS)
+        pids = set()
+        for future in done:
+            try:
+                pids.add(future.result())
+            except Exception as e:
+                print(f"[⚠️] Strategy pool warm-up failed: {e!r}")
+                break
+        elapsed = time.perf_counter() - started
+        print(f"[🔥] Strategy pool warm: {len(pids)}/{self.max_workers} workers in {elapsed:.1f}s")
+        return elapsed
+
+    def _share(self, df):
+        block = np.ascontiguousarray(df[list(OHLCV)].to_numpy(dtype=np.float64).T)
+        shm = shared_memory.SharedMemory(create=True, size=max(block.nbytes, 1))
+        np.ndarray(block.shape, dtype=np.float64, buffer=shm.buf)[:] = block
+        return shm, block.shape[1]
+
+    def evaluate_cycle(self, frames, timeframe, strategy_names, deadline=None):
+        """
+        frames: {symbol: kline DataFrame}. Returns
+        {"signals": {symbol: {strategy: "LONG"|"SHORT"|"HOLD"}}, "skipped": [(symbol, strategy)],
+         "errors": {(symbol, strategy): str}, "elapsed": seconds}
+        """
+        started = time.perf_counter()
+        deadline = self.deadline if deadline is None else deadline
+        blocks = []
+        futures = {}
+        try:
+            for symbol, df in frames.items():
+                shm, n_bars = self._share(df)
+                blocks.append(shm)
+                for name in strategy_names:
+                    future = self.pool.submit(_evaluate, shm.name, n_bars, symbol, timeframe, name)
+                    futures[future] = (symbol, name)
+
+            done, not_done = wait(futures, timeout=max(0.0, deadline - (time.perf_counter() - started)))
+
+            signals = {symbol: {} for symbol in frames}
+            errors = {}
+            for future in done:
+                key = futures[future]
+                try:
+                    symbol, name, signal, _ = future.result()
+                    signals[symbol][name] = SIGNAL_NAMES[signal]
+                except Exception as e:
+                    errors[key] = str(e)
+
+            skipped = []
+            for future in not_done:
+                future.cancel()
+                skipped.append(futures[future])
+        finally:
+            # Workers still running keep their own mapping; unlinking only drops the name
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        elapsed = time.perf_counter() - started
+        if skipped:
+            print(f"[⏱️] Skipped {len(skipped)} strategy evaluations past the {deadline:.1f}s deadline: {skipped}")
+        for (symbol, name), err in errors.items():
+            print(f"[⚠️] {name} failed on {symbol}: {err}")
+        return {"signals": signals, "skipped": skipped, "errors": errors, "elapsed": elapsed}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
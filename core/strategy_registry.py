@@ -0,0 +1,103 @@
+# core/strategy_registry.py
+
+import os
+import time
+import importlib
+import threading
+from strategies.base import BaseStrategy
+
+STRATEGY_FOLDER = "strategies"
+EXCLUDED_FILES = ("__init__.py", "base.py", "ml_predictive.py")
+RELOAD_CHECK_SECONDS = 30
+
+
+class StrategyRegistry:
+    """
+    Discovers strategy plugins once and hands out one stateless instance per
+    (symbol, timeframe) that is reused across cycles; market data is passed
+    per call. Files are re-checked at most every RELOAD_CHECK_SECONDS and
+    changed modules are reloaded.
+    """
+
+    def __init__(self, folder=STRATEGY_FOLDER, check_interval=RELOAD_CHECK_SECONDS):
+        self.folder = folder
+        self.check_interval = check_interval
+        self.modules = {}
+        self.mtimes = {}
+        self.classes = {}
+        self.instances = {}
+        self.version = 0
+        self.last_check = 0
+        self.lock = threading.RLock()
+        self.discover()
+
+    def _scan(self):
+        mtimes = {}
+        for filename in os.listdir(self.folder):
+            if filename.endswith(".py") and filename not in EXCLUDED_FILES:
+                mtimes[filename] = os.path.getmtime(os.path.join(self.folder, filename))
+        return mtimes
+
+    def discover(self):
+        with self.lock:
+            mtimes = self._scan()
+            classes = {}
+            for filename, mtime in sorted(mtimes.items()):
+                module_name = f"{self.folder}.{filename[:-3]}"
+                try:
+                    if module_name in self.modules and self.mtimes.get(filename) != mtime:
+                        module = importlib.reload(self.modules[module_name])
+                        print(f"[🔁] Reloaded strategy module {module_name}")
+                    else:
+                        module = self.modules.get(module_name) or importlib.import_module(module_name)
+                except Exception as e:
+                    print(f"[⚠️] Failed to load strategy module {module_name}: {e}")
+                    continue
+                self.modules[module_name] = module
+                for attr in dir(module):
+                    cls = getattr(module, attr)
+                    if isinstance(cls, type) and issubclass(cls, BaseStrategy) and cls is not BaseStrategy \
+                            and cls.__module__ == module_name:
+                        classes[cls.__name__] = cls
+
+            self.mtimes = mtimes
+            self.classes = classes
+            self.instances = {}
+            self.version += 1
+            self.last_check = time.time()
+            print(f"[🧩] Strategy registry v{self.version}: {', '.join(sorted(classes))}")
+
+    def reload_if_changed(self):
+        if time.time() - self.last_check < self.check_interval:
+            return False
+        with self.lock:
+            self.last_check = time.time()
+            if self._scan() == self.mtimes:
+                return False
+            self.discover()
+            return True
+
+    def get_strategies(self, symbol, timeframe):
+        self.reload_if_changed()
+        with self.lock:
+            key = (symbol, timeframe)
+            if key not in self.instances:
+                self.instances[key] = [cls(symbol, timeframe) for cls in self.classes.values()]
+            return self.instances[key]
+
+    def evict(self, symbol, timeframe=None):
+        with self.lock:
+            for key in [k for k in self.instances if k[0] == symbol and (timeframe is None or k[1] == timeframe)]:
+                del self.instances[key]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = StrategyRegistry()
+        return _registry
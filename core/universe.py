@@ -0,0 +1,99 @@
+# core/universe.py
+
+import time
+import numpy as np
+from config import UNIVERSE
+
+QUOTE_ASSET = "USDT"
+STALE_TICKER_MS = 24 * 3600 * 1000     # no trade for a day: delisted or settling
+
+
+def _pct_rank(values):
+    # 0 (lowest) .. 1 (highest); ties broken by position, which is fine for ranking
+    n = len(values)
+    if n < 2:
+        return np.zeros(n)
+    ranks = np.empty(n)
+    ranks[np.argsort(values, kind="stable")] = np.arange(n)
+    return ranks / (n - 1)
+
+
+def rank_universe(tickers, books, config=None, now_ms=None):
+    """
+    Scores every USDT perpetual from the all-symbol 24h tickers and book
+    tickers, all columns at once: percentile rank of log quote volume and of
+    24h range / VWAP (volatility), minus the percentile rank of the
+    bid/ask spread, each weighted. Symbols below min_quote_volume or above
+    max_spread_bps are dropped first. Returns [(symbol, score, quote volume,
+    volatility, spread bps)] best first.
+    """
+    c = {**UNIVERSE, **(config or {})}
+    now_ms = now_ms or int(time.time() * 1000)
+    book = {b["symbol"]: b for b in books}
+    rows = [t for t in tickers
+            if t["symbol"].endswith(QUOTE_ASSET) and "_" not in t["symbol"] and t["symbol"] in book]
+    if not rows:
+        return []
+
+    symbols = np.array([t["symbol"] for t in rows])
+    quote_volume = np.array([float(t["quoteVolume"]) for t in rows])
+    high = np.array([float(t["highPrice"]) for t in rows])
+    low = np.array([float(t["lowPrice"]) for t in rows])
+    vwap = np.array([float(t["weightedAvgPrice"]) for t in rows])
+    close_time = np.array([int(t["closeTime"]) for t in rows], dtype=np.int64)
+    bid = np.array([float(book[s]["bidPrice"]) for s in symbols])
+    ask = np.array([float(book[s]["askPrice"]) for s in symbols])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatility = (high - low) / vwap
+        spread_bps = (ask - bid) / ((ask + bid) / 2) * 1e4
+    ok = ((quote_volume >= c["min_quote_volume"]) & (now_ms - close_time < STALE_TICKER_MS)
+          & np.isfinite(volatility) & np.isfinite(spread_bps) & (bid > 0) & (spread_bps <= c["max_spread_bps"]))
+    if not ok.any():
+        return []
+
+    w = c["weights"]
+    score = (w["volume"] * _pct_rank(np.log(quote_volume[ok]))
+             + w["volatility"] * _pct_rank(volatility[ok])
+             - w["spread"] * _pct_rank(spread_bps[ok]))
+    order = np.argsort(-score, kind="stable")
+    return list(zip(symbols[ok][order].tolist(), score[order].round(4).tolist(),
+                    quote_volume[ok][order].tolist(), volatility[ok][order].round(5).tolist(),
+                    spread_bps[ok][order].round(3).tolist()))
+
+
+class UniverseScanner:
+    """
+    Picks the traded symbols: the top_k of rank_universe() plus any pinned
+    symbol, rescanned every rescan_seconds. A scan is two all-symbol
+    requests (24h tickers and book tickers) whatever the number of
+    symbols; symbols that still have a position are always kept.
+    """
+
+    def __init__(self, client, config=None, fallback=()):
+        self.client = client
+        self.config = {**UNIVERSE, **(config or {})}
+        self.symbols = list(fallback)
+        self.ranking = []
+        self.scanned_at = 0.0
+
+    def due(self):
+        return time.time() - self.scanned_at >= self.config["rescan_seconds"]
+
+    def scan(self, keep=()):
+        """
+        Returns the new symbol list; on a failed request the previous one
+        (the fallback at first) plus `keep`.
+        """
+        self.scanned_at = time.time()
+        try:
+            ranking = rank_universe(self.client.get_24h_tickers(), self.client.get_book_tickers(), self.config)
+        except Exception as e:
+            print(f"[⚠️] Universe scan failed, keeping {len(self.symbols)} symbols: {e}")
+            ranking = None
+        if ranking:
+            self.ranking = ranking
+            top = [row[0] for row in ranking[:self.config["top_k"]]]
+            self.symbols = list(dict.fromkeys(list(self.config["pinned"]) + top))
+            print(f"[🔭] Universe: {', '.join(self.symbols)}")
+        return list(dict.fromkeys(self.symbols + list(keep)))
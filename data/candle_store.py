@@ -0,0 +1,121 @@
+# data/candle_store.py
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from data.historical_loader import get_historical_klines, load_candles_csv, MS_PER_CANDLE
+
+CANDLE_STORE_DIR = "data/candles"
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class CandleStore:
+    """
+    Candles kept as .npy files per (symbol, interval): open times in ms
+    (int64) and a (5, n) float64 OHLCV block. Reads are memory-mapped, so any
+    number of processes share one copy through the page cache.
+    """
+
+    def __init__(self, root=CANDLE_STORE_DIR):
+        self.root = root
+        self._maps = {}
+
+    def _paths(self, symbol, interval):
+        base = os.path.join(self.root, f"{symbol}_{interval}")
+        return base + ".time.npy", base + ".ohlcv.npy"
+
+    def files(self, symbol, interval):
+        # The open-time and OHLCV .npy files behind (symbol, interval)
+        return self._paths(symbol, interval)
+
+    def has(self, symbol, interval):
+        return all(os.path.exists(p) for p in self._paths(symbol, interval))
+
+    def symbols(self, interval):
+        suffix = f"_{interval}.ohlcv.npy"
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(f[:-len(suffix)] for f in os.listdir(self.root) if f.endswith(suffix))
+
+    def write(self, symbol, interval, candles: pd.DataFrame):
+        """
+        Replaces the stored history with a kline DataFrame indexed by open time.
+        Written to temp files and renamed, so readers never see a partial file.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        if isinstance(candles.index, pd.DatetimeIndex):
+            times = candles.index.values.astype("datetime64[ms]").astype(np.int64)
+        else:
+            times = np.asarray(candles.index, dtype=np.int64)
+        block = np.ascontiguousarray(candles[list(COLUMNS)].to_numpy(dtype=np.float64).T)
+        for path, values in zip(self._paths(symbol, interval), (times, block)):
+            tmp = path + ".tmp.npy"
+            np.save(tmp, values)
+            os.replace(tmp, path)
+        self._maps.pop((symbol, interval), None)
+
+    def append(self, symbol, interval, candles: pd.DataFrame):
+        """
+        Adds newer candles; overlapping open times are replaced by the new rows.
+        """
+        if not self.has(symbol, interval):
+            return self.write(symbol, interval, candles)
+        merged = pd.concat([self.frame(symbol, interval), candles])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        self.write(symbol, interval, merged)
+
+    def load(self, symbol, interval):
+        """
+        (times, arrays): read-only memory-mapped open times (ms) and an
+        as_arrays-style dict of OHLCV views. Mapped once per process.
+        """
+        key = (symbol, interval)
+        time_path, block_path = self._paths(symbol, interval)
+        mtime = os.path.getmtime(block_path)
+        cached = self._maps.get(key)
+        if cached is None or cached[0] != mtime:
+            times = np.load(time_path, mmap_mode="r")
+            block = np.load(block_path, mmap_mode="r")
+            cached = (mtime, times, {col: block[i] for i, col in enumerate(COLUMNS)})
+            self._maps[key] = cached
+        return cached[1], cached[2]
+
+    def load_range(self, symbol, interval, start_ms, end_ms):
+        """
+        Candles with open time in [start_ms, end_ms), sliced from the mapping
+        without reading the rest of the file.
+        """
+        times, arrays = self.load(symbol, interval)
+        lo, hi = np.searchsorted(times, [start_ms, end_ms])
+        return times[lo:hi], {col: values[lo:hi] for col, values in arrays.items()}
+
+    def frame(self, symbol, interval):
+        times, arrays = self.load(symbol, interval)
+        df = pd.DataFrame({col: np.asarray(arrays[col]) for col in COLUMNS},
+                          index=pd.to_datetime(np.asarray(times), unit="ms"))
+        df.index.name = "timestamp"
+        return df
+
+    def import_csv(self, path, symbol, interval):
+        self.write(symbol, interval, load_candles_csv(path))
+
+    def download(self, symbol, interval, lookback_days=365):
+        """
+        Fetches only the candles from the last stored one on (or lookback_days
+        when empty). Only closed candles are stored; the last stored one is
+        fetched again, so a candle stored before it closed gets replaced.
+        """
+        start_time = None
+        if self.has(symbol, interval):
+            times, _ = self.load(symbol, interval)
+            if len(times):
+                start_time = int(times[-1])
+        fetched_ms = int(time.time() * 1000)
+        candles = get_historical_klines(symbol, interval, lookback_days=lookback_days, start_time=start_time)
+        open_ms = candles.index.values.astype("datetime64[ms]").astype(np.int64)
+        candles = candles[open_ms + MS_PER_CANDLE[interval] <= fetched_ms]
+        if not candles.empty:
+            self.append(symbol, interval, candles)
+        return len(candles)
+
@@ -4,23 +4,37 @@ import requests
 import pandas as pd
 import time
 
-def get_historical_klines(symbol="BTCUSDT", interval="5m", lookback_days=180):
+MS_PER_CANDLE = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000
+}
+
+def load_candles_csv(path):
+    """
+    Candle CSV written by the export scripts (timestamp, open, high, low, close, volume).
+    """
+    return pd.read_csv(path, parse_dates=["timestamp"]).set_index("timestamp").astype(float)
+
+
+def get_historical_klines(symbol="BTCUSDT", interval="5m", lookback_days=180, start_time=None):
+    """
+    Downloads candles from lookback_days ago until now, or from start_time
+    (ms since epoch) when given so callers can fetch only what they miss.
+    """
     base_url = "https://fapi.binance.com/fapi/v1/klines"
     end_time = int(time.time() * 1000)
     limit = 1500  # max per request
     all_data = []
 
-    ms_per_candle = {
-        "1m": 60_000,
-        "3m": 180_000,
-        "5m": 300_000,
-        "15m": 900_000,
-        "1h": 3_600_000,
-        "4h": 14_400_000
-    }[interval]
-
-    total_candles = int((lookback_days * 24 * 60 * 60 * 1000) / ms_per_candle)
-    start_time = end_time - total_candles * ms_per_candle
+    ms_per_candle = MS_PER_CANDLE[interval]
+
+    if start_time is None:
+        total_candles = int((lookback_days * 24 * 60 * 60 * 1000) / ms_per_candle)
+        start_time = end_time - total_candles * ms_per_candle
 
     while start_time < end_time:
         params = {
@@ -0,0 +1,60 @@
+# data/kline_buffer.py
+
+import time
+import threading
+import pandas as pd
+from data.historical_loader import MS_PER_CANDLE
+
+KLINE_LIMIT = 150
+
+
+class KlineBuffer:
+    """
+    The last `limit` candles per (symbol, interval) kept in memory. A read
+    only fetches the candles since the previous one (the formerly forming
+    candle included, for its final values), so a steady-state pass asks
+    for 2-3 klines instead of 150.
+    """
+
+    def __init__(self, client, limit=KLINE_LIMIT):
+        self.client = client
+        self.limit = limit
+        self.frames = {}
+        self.lock = threading.Lock()
+
+    def warm(self, symbol, interval):
+        df = self.client.get_klines(symbol, interval, limit=self.limit)
+        with self.lock:
+            self.frames[(symbol, interval)] = df
+        return df.copy()
+
+    def evict(self, symbol, interval=None):
+        with self.lock:
+            for key in [k for k in self.frames if k[0] == symbol and (interval is None or k[1] == interval)]:
+                del self.frames[key]
+
+    def get(self, symbol, interval):
+        """
+        Up-to-date candles, last row the forming one. Returns a copy:
+        callers add feature columns in place.
+        """
+        with self.lock:
+            df = self.frames.get((symbol, interval))
+        if df is None or df.empty:
+            return self.warm(symbol, interval)
+
+        last_open_ms = df.index[-1].value // 1_000_000
+        missing = int((time.time() * 1000 - last_open_ms) // MS_PER_CANDLE[interval])
+        if missing + 2 >= self.limit:
+            return self.warm(symbol, interval)
+        fresh = self.client.get_klines(symbol, interval, limit=missing + 2)   # +1 for clock skew
+        if fresh.empty:
+            return df.copy()
+        df = pd.concat([df[df.index < fresh.index[0]], fresh]).iloc[-self.limit:]
+        with self.lock:
+            self.frames[(symbol, interval)] = df
+        return df.copy()
+
+    def symbols(self):
+        with self.lock:
+            return sorted({s for s, _ in self.frames})
@@ -1,60 +1,148 @@
 # emergency/kill_switch.py
 
-from core.state_tracker import StateTracker
-import requests
 import time
-import hmac, hashlib
-from urllib.parse import urlencode
-from config import BINANCE_API_KEY, BINANCE_API_SECRET, BASE_URL
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from core.state_tracker import StateTracker
 from utils.telegram import send_telegram
 
-def emergency_exit(client):
-    print("[🚨] Emergency kill switch activated!")
+FLATTEN_WORKERS = 16          # concurrent close/cancel requests, and pooled connections kept for them
+CONFIRM_ATTEMPTS = 2          # positionRisk checks (with a re-close of any remainder) after the first round
 
-    pos = StateTracker.get_open_position("BTCUSDT")
-    if not pos:
-        print("[✅] No open position to close.")
-        return
+_flattener = None
+_flattener_lock = threading.Lock()
+
+
+class Flattener:
+    """
+    Closes every open position at once: one positionRisk call for the book,
+    then a reduce-only market order and a cancel of the brackets per symbol,
+    all in flight together over pooled keep-alive connections, then one
+    positionRisk call to confirm. Time to flat is about one round-trip plus
+    the confirmation, whatever the number of symbols.
+    """
+
+    def __init__(self, client, workers=FLATTEN_WORKERS):
+        self.client = client
+        self.workers = workers
+        session = getattr(client, "session", None)
+        if session is not None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flatten")
+
+    def warm(self, connections=None):
+        """
+        Opens (or refreshes) pooled connections with parallel pings so the
+        flatten requests don't pay for TCP/TLS handshakes.
+        """
+        n = min(connections or self.workers, self.workers)
+        futures = [self.pool.submit(self.client.ping) for _ in range(n)]
+        return sum(1 for f in futures if _result(f) is True)
+
+    def flatten(self, symbols=None, positions=None):
+        """
+        Flattens all positions (or those in `symbols`). Returns
+        {symbol: report} with side, qty, order result, cancel result, whether
+        it was confirmed flat and the time to flat in ms.
+        """
+        started = time.perf_counter()
+        if positions is None:
+            positions = self.client.get_positions()
+        if symbols is not None:
+            positions = [p for p in positions if p["symbol"] in symbols]
+        report = {
+            p["symbol"]: {"side": p["side"], "qty": abs(p["positionAmt"]), "entry": p["entryPrice"],
+                          "order": None, "cancel": None, "flat": False, "ms": None}
+            for p in positions
+        }
+        if not positions:
+            return report
+
+        closes = {p["symbol"]: self.pool.submit(self._close, p) for p in positions}
+        cancels = {s: self.pool.submit(self.client.cancel_all_orders, s) for s in report}
+        for symbol, future in closes.items():
+            report[symbol]["order"] = _result(future)
+        for symbol, future in cancels.items():
+            report[symbol]["cancel"] = _result(future)
 
-    side = "SELL" if pos["side"] == "LONG" else "BUY"
-    qty = abs(pos["positionAmt"])
+        pending = set(report)
+        for _ in range(CONFIRM_ATTEMPTS):
+            try:
+                remaining = {p["symbol"]: p for p in self.client.get_positions() if p["symbol"] in pending}
+            except Exception as e:
+                print(f"[⚠️] Flatten confirmation failed: {e}")
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            for symbol in pending - set(remaining):
+                report[symbol]["flat"] = True
+                report[symbol]["ms"] = elapsed
+            pending = set(remaining)
+            if not pending:
+                break
+            retries = {s: self.pool.submit(self._close, p) for s, p in remaining.items()}
+            for symbol, future in retries.items():
+                report[symbol]["order"] = _result(future)
+        return report
 
-    # ✅ GET LATEST PRICE
+    def _close(self, position):
+        return self.client.close_position(position["symbol"], position["positionAmt"],
+                                          position.get("positionSide", "BOTH"))
+
+
+def _result(future):
     try:
-        ticker_url = f"{BASE_URL}/fapi/v1/ticker/price?symbol=BTCUSDT"
-        price_data = requests.get(ticker_url).json()
-        current_price = float(price_data["price"])
+        return future.result()
     except Exception as e:
-        print(f"[⚠️] Failed to fetch market price: {e}")
-        current_price = pos["entryPrice"]  # fallback
-
-    entry = pos["entryPrice"]
-    size = abs(pos["positionAmt"])
-    if pos["side"] == "LONG":
-        unreal = (current_price - entry) * size
-    else:
-        unreal = (entry - current_price) * size
-
-    params = {
-        "symbol": "BTCUSDT",
-        "side": side,
-        "type": "MARKET",
-        "quantity": round(qty, 3),
-        "timestamp": int(time.time() * 1000)
-    }
-    query = urlencode(params)
-    signature = hmac.new(BINANCE_API_SECRET.encode(), query.encode(), hashlib.sha256).hexdigest()
-    url = f"{BASE_URL}/fapi/v1/order?{query}&signature={signature}"
-    headers = {"X-MBX-APIKEY": BINANCE_API_KEY}
-    res = requests.post(url, headers=headers)
-
-    print(f"[🛑] Emergency close response: {res.json()}")
-
-    send_telegram(f"🛑 <b>Position is closed by Emergency Exit</b>\nSymbol: BTCUSDT\nReason: Max drawdown exceeded.")
-    # Cancel remaining SL/TP orders after emergency exit
-    client.cancel_all_orders("BTCUSDT")  
+        return {"error": str(e)}
+
+
+def get_flattener(client=None):
+    """
+    Process-wide Flattener; call once at startup (and warm() it) so an
+    emergency doesn't start by opening connections.
+    """
+    global _flattener
+    with _flattener_lock:
+        if _flattener is None:
+            if client is None:
+                from exchange.binance import BinanceFuturesClient
+                client = BinanceFuturesClient()
+            _flattener = Flattener(client)
+        return _flattener
+
+
+def emergency_exit(client, symbols=None, reason="Max drawdown exceeded."):
+    """
+    Kill switch: flattens every open position (or just `symbols`), cancels
+    their SL/TP orders, logs and clears the saved state per symbol.
+    """
+    print("[🚨] Emergency kill switch activated!")
+    report = get_flattener(client).flatten(symbols)
+    if not report:
+        print("[✅] No open position to close.")
+        return report
+
     from core.performance_logger import log_strategy_result
-    log_strategy_result(strategy_name="Unknown", result="EMERGENCY", pnl=round(unreal, 2), timestamp=None)
+    lines = []
+    for symbol, r in report.items():
+        order = r["order"] or {}
+        exit_price = float(order.get("avgPrice") or 0)
+        pnl = 0.0
+        if exit_price:
+            pnl = (exit_price - r["entry"]) * r["qty"] if r["side"] == "LONG" else (r["entry"] - exit_price) * r["qty"]
+        print(f"[🛑] Emergency close {symbol}: {order}")
+        lines.append(f"{symbol}: {'✅ flat' if r['flat'] else '❌ NOT CONFIRMED'} "
+                     f"({r['side']} {r['qty']}, PnL {pnl:+.2f})"
+                     + (f" in {r['ms']:.0f} ms" if r["ms"] is not None else ""))
 
-    StateTracker.clear_state()
+        state = StateTracker.load_position_state(symbol) or {}
+        log_strategy_result(strategy_name=state.get("strategy", "Unknown"), result="EMERGENCY",
+                            pnl=round(pnl, 2), timestamp=None, symbol=symbol, timeframe=state.get("timeframe"))
+        if r["flat"]:
+            StateTracker.clear_state(symbol)
 
+    send_telegram(f"🛑 <b>Positions closed by Emergency Exit</b>\nReason: {reason}\n" + "\n".join(lines))
+    return report
@@ -0,0 +1,191 @@
+# emergency/watchdog.py
+
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from config import WATCHDOG, BINANCE_API_KEY, BINANCE_API_SECRET, BASE_URL
+
+MARK_PRICE_STREAM = "!markPrice@arr@1s"
+STREAM_STALE_SECONDS = 3      # no mark price message for this long → poll REST instead
+RETRIGGER_SECONDS = 10        # don't flatten the same symbol again while the last attempt settles
+
+
+class DrawdownWatchdog:
+    """
+    Watches unrealized PnL of every open position on each mark price update,
+    independently of the strategy loop: its own thread, its own price feed
+    (the all-symbol mark price stream when python-binance is installed, else
+    /fapi/v1/premiumIndex for just the watched symbols every poll_seconds)
+    and positions from the account state cache as soon as its stream changes
+    them, or positionRisk every few seconds when that isn't streaming. A breach of the per-symbol or account-wide loss limit
+    goes straight to the kill switch's concurrent flatten.
+
+    The strategy loop's sleeps and order waits release the GIL and model
+    retrains run in worker processes, so a thread keeps its cadence.
+    """
+
+    def __init__(self, client, account=None, limits=None, exit_fn=None):
+        self.client = client
+        self.account = account
+        self.limits = {**WATCHDOG, **(limits or {})}
+        if exit_fn is None:
+            from emergency.kill_switch import emergency_exit
+            exit_fn = emergency_exit
+        self.exit_fn = exit_fn
+        self.lock = threading.Lock()
+
+        self.symbols = []
+        self.amount = np.zeros(0)
+        self.entry = np.zeros(0)
+        self.positions_at = 0.0
+        self.account_seen = None     # account.updated_at the positions were last copied at
+        self.last_stream_at = 0.0
+        self.last_check_at = 0.0
+        self.checks = 0
+        self.triggered = {}          # symbol (or "*") -> time of last flatten
+        self._refresh = threading.Event()
+        self._stop = threading.Event()
+        self._exits = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watchdog-exit")
+        self._twm = None
+
+    # ---- lifecycle ------------------------------------------------------
+
+    def start(self):
+        self._start_stream()
+        threading.Thread(target=self._run, name="drawdown-watchdog", daemon=True).start()
+        print(f"[🐕] Drawdown watchdog started (symbol {self.limits['symbol_max_loss_pct']:.1%}, "
+              f"account {self.limits['account_max_loss_pct']:.1%}).")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._twm is not None:
+            try:
+                self._twm.stop()
+            except Exception:
+                pass
+
+    def refresh_positions(self):
+        # Called after an entry so the new position is watched right away
+        self._refresh.set()
+
+    def _start_stream(self):
+        try:
+            from binance import ThreadedWebsocketManager
+        except ImportError:
+            return False
+        try:
+            self._twm = ThreadedWebsocketManager(api_key=BINANCE_API_KEY, api_secret=BINANCE_API_SECRET,
+                                                 testnet="testnet" in BASE_URL)
+            self._twm.start()
+            self._twm.start_futures_multiplex_socket(callback=self._on_stream, streams=[MARK_PRICE_STREAM])
+            return True
+        except Exception as e:
+            print(f"[⚠️] Watchdog price stream failed to start: {e}")
+            self._twm = None
+            return False
+
+    def _on_stream(self, msg):
+        data = msg.get("data", msg) if isinstance(msg, dict) else msg
+        if not isinstance(data, list):
+            return
+        self.last_stream_at = time.time()
+        self.check({p["s"]: float(p["p"]) for p in data if "s" in p and "p" in p})
+
+    def _run(self):
+        poll = self.limits["poll_seconds"]
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                streaming = self.account is not None and self.account.streaming()
+                if self._refresh.is_set() or (not streaming and started - self.positions_at
+                                              >= self.limits["positions_refresh_seconds"]):
+                    self._refresh.clear()
+                    self._load_positions()
+                else:
+                    self._sync_account()
+                if len(self.symbols) and started - self.last_stream_at > STREAM_STALE_SECONDS:
+                    self.check(self.client.get_mark_prices(list(self.symbols)))
+            except Exception as e:
+                print(f"[⚠️] Watchdog error: {e}")
+            self._refresh.wait(max(0.0, poll - (time.time() - started)))
+
+    # ---- positions ------------------------------------------------------
+
+    def _sync_account(self):
+        # Streamed positions cost no request: re-copy them whenever an account event changed them,
+        # so positions opened by other processes are watched and SL/TP-closed ones dropped at once
+        if self.account is not None and self.account.streaming() and self.account.updated_at != self.account_seen:
+            self._load_positions()
+
+    def _load_positions(self):
+        if self.account is not None and self.account.streaming():
+            self.account_seen = self.account.updated_at
+            positions = [{"symbol": s, "positionAmt": p["amount"], "entryPrice": p["entry"]}
+                         for s, p in self.account.snapshot()["positions"].items()]
+        else:
+            positions = self.client.get_positions()
+        self.set_positions(positions)
+
+    def set_positions(self, positions):
+        with self.lock:
+            self.symbols = [p["symbol"] for p in positions]
+            self.amount = np.array([p["positionAmt"] for p in positions], dtype=np.float64)
+            self.entry = np.array([p["entryPrice"] for p in positions], dtype=np.float64)
+            self.positions_at = time.time()
+
+    # ---- checks ---------------------------------------------------------
+
+    def _balance(self):
+        balance = self.account.wallet_balance() if self.account is not None else None
+        return balance if balance else None
+
+    def check(self, prices):
+        """
+        Unrealized PnL of every watched position at `prices` ({symbol: mark})
+        against the limits; breaches are flattened on a separate thread.
+        Returns the symbols (or ["*"] for the whole book) it triggered.
+        """
+        self._sync_account()
+        with self.lock:
+            symbols, amount, entry = self.symbols, self.amount, self.entry
+        if not symbols:
+            return []
+        mark = np.array([prices.get(s, np.nan) for s in symbols])
+        known = np.isfinite(mark)
+        pnl = np.where(known, (mark - entry) * amount, 0.0)
+        notional = np.abs(amount) * entry
+        with np.errstate(divide="ignore", invalid="ignore"):
+            loss_pct = np.where(notional > 0, -pnl / notional, 0.0)
+        self.checks += 1
+        self.last_check_at = time.time()
+
+        balance = self._balance()
+        if balance and -pnl.sum() / balance > self.limits["account_max_loss_pct"]:
+            return self._trigger(["*"], f"Account unrealized loss {pnl.sum():.2f} USDT "
+                                        f"> {self.limits['account_max_loss_pct']:.1%} of {balance:.2f}")
+
+        breached = [symbols[k] for k in np.flatnonzero(known & (loss_pct > self.limits["symbol_max_loss_pct"]))]
+        if breached:
+            return self._trigger(breached, f"Position loss > {self.limits['symbol_max_loss_pct']:.1%}")
+        return []
+
+    def _trigger(self, symbols, reason):
+        now = time.time()
+        fresh = [s for s in symbols if now - self.triggered.get(s, 0) > RETRIGGER_SECONDS
+                 and now - self.triggered.get("*", 0) > RETRIGGER_SECONDS]
+        if not fresh:
+            return []
+        for s in fresh:
+            self.triggered[s] = now
+        print(f"[🚨] Watchdog: {reason} → flattening {', '.join(fresh)}")
+        self._exits.submit(self._exit, None if fresh == ["*"] else fresh, reason)
+        return fresh
+
+    def _exit(self, symbols, reason):
+        try:
+            self.exit_fn(self.client, symbols=symbols, reason=f"Watchdog: {reason}")
+        except Exception as e:
+            print(f"[❌] Watchdog flatten failed: {e}")
+        self._refresh.set()
@@ -0,0 +1,116 @@
+# exchange/account_config.py
+
+import threading
+
+NO_CHANGE_CODES = {-4046, -4059}   # "No need to change margin type" / "... position side": already as desired
+
+
+class AccountConfigCache:
+    """
+    Leverage and margin type per symbol and the account's position mode as
+    last confirmed by the exchange. ensure_* calls only go out when the
+    desired value differs from the known one, so a steady-state entry costs
+    no config round-trips.
+
+    With an AccountState attached its maps are the source of truth (they
+    follow ACCOUNT_CONFIG_UPDATE, so a change made in the UI is noticed) and
+    our own confirmed changes are written into them. An error response marks
+    the symbol stale, forcing the next call through.
+    """
+
+    def __init__(self, client, account=None):
+        self.client = client
+        self.account = account
+        self.lock = threading.Lock()
+        self.leverage = {}
+        self.margin_type = {}
+        self.dual_side = None
+        self.stale = set()          # (kind, symbol) pairs that must be re-applied
+        self.stats = {"skipped": 0, "sent": 0, "errors": 0}
+
+    def attach(self, account):
+        self.account = account
+        return self
+
+    def invalidate(self, symbol=None):
+        with self.lock:
+            symbols = self._symbols() if symbol is None else {symbol}
+            self.stale |= {(kind, s) for kind in ("leverage", "margin_type") for s in symbols}
+            if symbol is None:
+                self.dual_side = None
+
+    def ensure_leverage(self, symbol, leverage):
+        leverage = int(leverage)
+        if self._known("leverage", symbol) == leverage:
+            self.stats["skipped"] += 1
+            return True
+        result = self._send(symbol, lambda: self.client.change_leverage(symbol, leverage))
+        if result is None or "leverage" not in result:
+            return False
+        self._confirm("leverage", symbol, int(result["leverage"]))
+        return int(result["leverage"]) == leverage
+
+    def ensure_margin_type(self, symbol, margin_type):
+        margin_type = margin_type.upper()
+        if self._known("margin_type", symbol) == margin_type:
+            self.stats["skipped"] += 1
+            return True
+        if self._send(symbol, lambda: self.client.change_margin_type(symbol, margin_type)) is None:
+            return False
+        self._confirm("margin_type", symbol, margin_type)
+        return True
+
+    def ensure_position_mode(self, dual_side):
+        if self.dual_side is None:
+            # Cheaper to read once than to blindly write: the answer is cached for the account
+            result = self._send(None, self.client.get_position_mode)
+            if result is not None and "dualSidePosition" in result:
+                self.dual_side = bool(result["dualSidePosition"])
+        if self.dual_side == dual_side:
+            self.stats["skipped"] += 1
+            return True
+        if self._send(None, lambda: self.client.change_position_mode(dual_side)) is None:
+            return False
+        self.dual_side = dual_side
+        return True
+
+    def _known(self, kind, symbol):
+        if (kind, symbol) in self.stale:
+            return None
+        source = self.account if self.account is not None else self
+        return getattr(source, kind).get(symbol)
+
+    def _confirm(self, kind, symbol, value):
+        with self.lock:
+            getattr(self, kind)[symbol] = value
+            self.stale.discard((kind, symbol))
+        if self.account is not None:
+            with self.account.lock:
+                getattr(self.account, kind)[symbol] = value
+
+    def _symbols(self):
+        source = self.account if self.account is not None else self
+        return set(source.leverage) | set(source.margin_type)
+
+    def _send(self, symbol, request):
+        """
+        Runs one config request; returns its payload, or None after marking
+        the symbol stale on an error response ("no need to change" counts as
+        success).
+        """
+        self.stats["sent"] += 1
+        try:
+            result = request()
+        except Exception as e:
+            result = {"error": str(e)}
+        if isinstance(result, dict) and "error" not in result:
+            code = result.get("code", 200)
+            if code == 200 or code in NO_CHANGE_CODES:
+                return result
+        self.stats["errors"] += 1
+        print(f"[⚠️] Account config request failed{f' for {symbol}' if symbol else ''}: {result}")
+        if symbol is None:
+            self.dual_side = None
+        else:
+            self.invalidate(symbol)
+        return None
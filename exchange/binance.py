@@ -5,12 +5,17 @@ import hmac
 import hashlib
 import requests
 from urllib.parse import urlencode
-from config import BINANCE_API_KEY, BINANCE_API_SECRET, BASE_URL
+from config import BINANCE_API_KEY, BINANCE_API_SECRET, BASE_URL, ACCOUNT_SETTINGS
+from exchange.account_config import AccountConfigCache
+
+MARK_PRICE_ALL_WEIGHT = 10   # premiumIndex without a symbol; 1 with one
 
 class BinanceFuturesClient:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, session=None):
+        # A shared-budget session (core.coordinator.BudgetedSession) when running sharded
+        self.session = session if session is not None else requests.Session()
         self.session.headers.update({"X-MBX-APIKEY": BINANCE_API_KEY})
+        self.account_config = AccountConfigCache(self)
 
     def get_klines(self, symbol, interval="5m", limit=150):
         url = f"{BASE_URL}/fapi/v1/klines"
@@ -36,7 +41,7 @@ class BinanceFuturesClient:
         position_side = "LONG" if signal == "LONG" else "SHORT"
         sl_side = "SELL" if side == "BUY" else "BUY"
 
-        self.set_leverage(symbol, leverage)
+        self.apply_account_config(symbol, leverage)
 
         # 1. Place Market Order
         order_params = {
@@ -47,6 +52,8 @@ class BinanceFuturesClient:
             "timestamp": int(time.time() * 1000)
         }
         order_response = self._signed_post("/fapi/v1/order", order_params)
+        if '"orderId"' not in order_response.text:
+            self.account_config.invalidate(symbol)
 
         # 2. Place SL
         sl_params = {
@@ -92,12 +99,52 @@ class BinanceFuturesClient:
         return self.session.post(full_url)
 
     def set_leverage(self, symbol, leverage):
+        # Only hits the exchange when the leverage differs from the last confirmed one
+        return self.account_config.ensure_leverage(symbol, leverage)
+
+    def apply_account_config(self, symbol, leverage):
+        """
+        Position mode, margin type (per ACCOUNT_SETTINGS) and leverage for an
+        entry, each sent only when it differs from what the exchange last
+        confirmed; None in ACCOUNT_SETTINGS leaves that setting alone.
+        """
+        ok = True
+        if ACCOUNT_SETTINGS.get("dual_side_position") is not None:
+            ok &= self.account_config.ensure_position_mode(ACCOUNT_SETTINGS["dual_side_position"])
+        if ACCOUNT_SETTINGS.get("margin_type"):
+            ok &= self.account_config.ensure_margin_type(symbol, ACCOUNT_SETTINGS["margin_type"])
+        ok &= self.account_config.ensure_leverage(symbol, leverage)
+        return ok
+
+    def change_leverage(self, symbol, leverage):
         params = {
             "symbol": symbol,
             "leverage": leverage,
             "timestamp": int(time.time() * 1000)
         }
-        self._signed_post("/fapi/v1/leverage", params)
+        return self._signed_post("/fapi/v1/leverage", params).json()
+
+    def change_margin_type(self, symbol, margin_type):
+        params = {
+            "symbol": symbol,
+            "marginType": margin_type,
+            "timestamp": int(time.time() * 1000)
+        }
+        return self._signed_post("/fapi/v1/marginType", params).json()
+
+    def get_position_mode(self):
+        params = {"timestamp": int(time.time() * 1000)}
+        query = urlencode(params)
+        signature = hmac.new(BINANCE_API_SECRET.encode(), query.encode(), hashlib.sha256).hexdigest()
+        url = f"{BASE_URL}/fapi/v1/positionSide/dual?{query}&signature={signature}"
+        return self.session.get(url).json()
+
+    def change_position_mode(self, dual_side):
+        params = {
+            "dualSidePosition": "true" if dual_side else "false",
+            "timestamp": int(time.time() * 1000)
+        }
+        return self._signed_post("/fapi/v1/positionSide/dual", params).json()
 
     def round_step_size(self, symbol, qty):
         # Naive rounding to 3 decimal places; can be enhanced with exchange rules
@@ -119,16 +166,21 @@ class BinanceFuturesClient:
             print(f"[⚠️] Failed to cancel open orders: {e}")
             return None
         
+    def get_account(self):
+        # Full /fapi/v2/account payload: assets, positions (with leverage) and account totals
+        params = {
+            "timestamp": int(time.time() * 1000)
+        }
+        query = urlencode(params)
+        signature = hmac.new(BINANCE_API_SECRET.encode(), query.encode(), hashlib.sha256).hexdigest()
+        url = f"{BASE_URL}/fapi/v2/account?{query}&signature={signature}"
+        res = self.session.get(url)
+        res.raise_for_status()
+        return res.json()
+
     def get_balance(self):
         try:
-            params = {
-                "timestamp": int(time.time() * 1000)
-            }
-            query = urlencode(params)
-            signature = hmac.new(BINANCE_API_SECRET.encode(), query.encode(), hashlib.sha256).hexdigest()
-            url = f"{BASE_URL}/fapi/v2/account?{query}&signature={signature}"
-            res = self.session.get(url)
-            data = res.json()
+            data = self.get_account()
             for asset in data.get("assets", []):
                 if asset["asset"] == "USDT":
                     return float(asset["walletBalance"])
@@ -179,7 +231,7 @@ class BinanceFuturesClient:
     
     def safe_place_order(self, symbol, signal, qty, sl, tp, leverage):
         self.cancel_all_orders(symbol)
-        self.set_leverage(symbol, leverage)
+        self.apply_account_config(symbol, leverage)
 
         # 1. Place Market Order
         self.place_market_order(symbol, signal, qty)
@@ -230,6 +282,9 @@ class BinanceFuturesClient:
             "timestamp": int(time.time() * 1000)
         }
         response = self._signed_post("/fapi/v1/order", order_params)
+        if '"orderId"' not in response.text:
+            # Rejected entries (e.g. leverage/margin errors) re-apply the config next time
+            self.account_config.invalidate(symbol)
         print(f"[🟢] Market order placed: {side} {quantity} {symbol} @ market")
         return response
 
@@ -267,6 +322,81 @@ class BinanceFuturesClient:
             from utils.telegram import send_telegram
             send_telegram(f"❌ <b>TP Order FAILED</b> for {symbol}\n<code>{tp_response.text}</code>")
 
+    def ping(self):
+        # Cheap unsigned request that opens (or keeps alive) a pooled connection
+        return self.session.get(f"{BASE_URL}/fapi/v1/ping", timeout=5).ok
+
+    def get_mark_prices(self, symbols=None):
+        """
+        Mark prices of `symbols` (weight 1 each) or, for None or as many
+        symbols as the all-symbol request weighs (10), of every symbol at once.
+        """
+        if symbols and len(symbols) < MARK_PRICE_ALL_WEIGHT:
+            prices = {}
+            for symbol in symbols:
+                res = self.session.get(f"{BASE_URL}/fapi/v1/premiumIndex", params={"symbol": symbol}, timeout=5)
+                res.raise_for_status()
+                prices[symbol] = float(res.json()["markPrice"])
+            return prices
+        res = self.session.get(f"{BASE_URL}/fapi/v1/premiumIndex", timeout=5)
+        res.raise_for_status()
+        return {p["symbol"]: float(p["markPrice"]) for p in res.json()}
+
+    def get_24h_tickers(self):
+        # 24h stats of every symbol in one unsigned request (weight 40)
+        res = self.session.get(f"{BASE_URL}/fapi/v1/ticker/24hr", timeout=10)
+        res.raise_for_status()
+        return res.json()
+
+    def get_book_tickers(self):
+        # Best bid/ask of every symbol in one unsigned request
+        res = self.session.get(f"{BASE_URL}/fapi/v1/ticker/bookTicker", timeout=10)
+        res.raise_for_status()
+        return res.json()
+
+    def get_positions(self):
+        """
+        Every non-zero position in one positionRisk call.
+        """
+        params = {"timestamp": int(time.time() * 1000)}
+        query = urlencode(params)
+        signature = hmac.new(BINANCE_API_SECRET.encode(), query.encode(), hashlib.sha256).hexdigest()
+        url = f"{BASE_URL}/fapi/v2/positionRisk?{query}&signature={signature}"
+        res = self.session.get(url)
+        res.raise_for_status()
+        positions = []
+        for pos in res.json():
+            amt = float(pos["positionAmt"])
+            if amt != 0:
+                positions.append({
+                    "symbol": pos["symbol"],
+                    "positionAmt": amt,
+                    "entryPrice": float(pos["entryPrice"]),
+                    "unrealizedProfit": float(pos.get("unrealizedProfit", 0.0)),
+                    "positionSide": pos.get("positionSide", "BOTH"),
+                    "side": "LONG" if amt > 0 else "SHORT"
+                })
+        return positions
+
+    def close_position(self, symbol, position_amt, position_side="BOTH"):
+        """
+        Reduce-only market order for the whole position; returns the order
+        result (executedQty, avgPrice) or the error payload.
+        """
+        params = {
+            "symbol": symbol,
+            "side": "SELL" if position_amt > 0 else "BUY",
+            "type": "MARKET",
+            "quantity": abs(position_amt),
+            "newOrderRespType": "RESULT",
+            "timestamp": int(time.time() * 1000)
+        }
+        if position_side == "BOTH":
+            params["reduceOnly"] = "true"
+        else:
+            params["positionSide"] = position_side   # hedge mode: the side itself makes it closing-only
+        return self._signed_post("/fapi/v1/order", params).json()
+
     def get_open_position(self, symbol):
         try:
             params = {"timestamp": int(time.time() * 1000)}
@@ -0,0 +1,418 @@
+# exchange/simulated.py
+
+import time
+import threading
+import argparse
+import numpy as np
+import pandas as pd
+from data.historical_loader import MS_PER_CANDLE
+
+DEFAULT_BALANCE = 10_000.0
+DEFAULT_LEVERAGE = 20
+FEE_RATE = 0.0004          # taker fee per side
+KLINE_LIMIT = 150
+
+BUY, SELL = 1, -1
+SIDE_NAMES = {BUY: "BUY", SELL: "SELL"}
+
+
+class SimulatedFuturesExchange:
+    """
+    In-process stand-in for BinanceFuturesClient: same method surface, backed
+    by replayed or synthetic candles for any number of symbols. One-way
+    position mode, market orders fill at the current price, and closePosition
+    STOP_MARKET / TAKE_PROFIT_MARKET orders are matched against each new
+    candle's range when advance() moves the clock.
+
+    State lives in per-symbol arrays so matching thousands of symbols is a
+    few vectorized comparisons per candle. Each symbol holds at most one
+    STOP_MARKET and one TAKE_PROFIT_MARKET order; placing another replaces it.
+    Like on Binance, close orders stay open after the position is gone and
+    expire if they trigger with nothing to close.
+    """
+
+    def __init__(self, candles, interval="15m", balance=DEFAULT_BALANCE, fee_rate=FEE_RATE,
+                 slippage=0.0, start=KLINE_LIMIT, verbose=False):
+        """
+        candles: {symbol: kline DataFrame or OHLCV arrays dict}, all the same length.
+        """
+        self.symbols = list(candles)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.interval = interval
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.verbose = verbose
+
+        first = candles[self.symbols[0]]
+        n_bars = len(first["close"])
+        if isinstance(first, pd.DataFrame) and isinstance(first.index, pd.DatetimeIndex):
+            self.times = first.index.values.astype("datetime64[ms]").astype(np.int64)
+        else:
+            self.times = np.arange(n_bars, dtype=np.int64) * MS_PER_CANDLE[interval]
+        self.ohlcv = np.empty((5, len(self.symbols), n_bars))
+        for i, symbol in enumerate(self.symbols):
+            for j, col in enumerate(("open", "high", "low", "close", "volume")):
+                self.ohlcv[j, i] = np.asarray(candles[symbol][col], dtype=np.float64)[:n_bars]
+
+        n = len(self.symbols)
+        self.cursor = min(start, n_bars - 1)
+        self.wallet_balance = float(balance)
+        self.position_amt = np.zeros(n)
+        self.entry_price = np.zeros(n)
+        self.leverage = np.full(n, DEFAULT_LEVERAGE, dtype=np.int64)
+        self.sl_side = np.zeros(n, dtype=np.int8)
+        self.sl_stop = np.full(n, np.nan)
+        self.sl_id = np.zeros(n, dtype=np.int64)
+        self.tp_side = np.zeros(n, dtype=np.int8)
+        self.tp_stop = np.full(n, np.nan)
+        self.tp_id = np.zeros(n, dtype=np.int64)
+        self.next_order_id = 1
+        self.fills = []
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store, symbols, interval, bars=None, **kwargs):
+        """
+        Replays the last `bars` candles of each symbol from a CandleStore.
+        """
+        candles = {}
+        length = min(len(store.load(s, interval)[0]) for s in symbols)
+        length = min(length, bars) if bars else length
+        for symbol in symbols:
+            _, arrays = store.load(symbol, interval)
+            candles[symbol] = {col: values[-length:] for col, values in arrays.items()}
+        return cls(candles, interval=interval, **kwargs)
+
+    @classmethod
+    def synthetic(cls, n_symbols, n_bars=2000, interval="15m", volatility=0.004, seed=None, **kwargs):
+        """
+        Geometric random-walk candles for n_symbols made-up symbols.
+        """
+        rng = np.random.default_rng(seed)
+        start = rng.uniform(1, 1000, (n_symbols, 1))
+        close = start * np.exp(np.cumsum(rng.normal(0, volatility, (n_symbols, n_bars)), axis=1))
+        open_ = np.concatenate([start, close[:, :-1]], axis=1)
+        wick = rng.random((2, n_symbols, n_bars)) * volatility
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = rng.uniform(100, 10_000, (n_symbols, n_bars))
+        candles = {
+            f"SIM{i}USDT": {"open": open_[i], "high": high[i], "low": low[i], "close": close[i], "volume": volume[i]}
+            for i in range(n_symbols)
+        }
+        return cls(candles, interval=interval, **kwargs)
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _i(self, symbol):
+        if symbol not in self.index:
+            raise KeyError(f"Unknown simulated symbol {symbol}")
+        return self.index[symbol]
+
+    # Clock and matching engine
+
+    def advance(self, steps=1):
+        """
+        Moves every symbol forward by `steps` candles, matching close orders on
+        each. Returns the fills triggered, or [] at the end of the data.
+        """
+        fills = []
+        with self.lock:
+            for _ in range(steps):
+                if self.cursor + 1 >= self.ohlcv.shape[2]:
+                    break
+                self.cursor += 1
+                fills.extend(self._match(self.cursor))
+        return fills
+
+    def _match(self, bar):
+        o, h, l = self.ohlcv[0, :, bar], self.ohlcv[1, :, bar], self.ohlcv[2, :, bar]
+        # SELL stops trigger on a drop to the stop, BUY stops on a rise; take-profits the other way
+        sl_hit = ((self.sl_side == SELL) & (l <= self.sl_stop)) | ((self.sl_side == BUY) & (h >= self.sl_stop))
+        tp_hit = ((self.tp_side == SELL) & (h >= self.tp_stop)) | ((self.tp_side == BUY) & (l <= self.tp_stop))
+
+        fills = []
+        for i in np.flatnonzero(sl_hit | tp_hit):
+            # The stop wins when one candle reaches both levels
+            if sl_hit[i]:
+                side, stop, order_id, kind = int(self.sl_side[i]), self.sl_stop[i], self.sl_id[i], "STOP_MARKET"
+                price = min(o[i], stop) if side == SELL else max(o[i], stop)
+                self._clear_order(i, "sl")
+            else:
+                side, stop, order_id, kind = int(self.tp_side[i]), self.tp_stop[i], self.tp_id[i], "TAKE_PROFIT_MARKET"
+                price = max(o[i], stop) if side == SELL else min(o[i], stop)
+                self._clear_order(i, "tp")
+
+            amt = self.position_amt[i]
+            if amt == 0 or np.sign(amt) == side:
+                self._log(f"[🧪] {kind} {order_id} on {self.symbols[i]} expired: no position to close")
+                continue
+            fills.append(self._fill(i, side, abs(amt), price, kind, order_id))
+        return fills
+
+    def _fill(self, i, side, qty, price, kind, order_id):
+        amt, entry = self.position_amt[i], self.entry_price[i]
+        realized = 0.0
+        if amt != 0 and np.sign(amt) != side:
+            closed = min(qty, abs(amt))
+            realized = closed * (price - entry) * np.sign(amt)
+        fee = qty * price * self.fee_rate
+
+        new_amt = amt + side * qty
+        if abs(new_amt) < 1e-12:
+            new_amt, new_entry = 0.0, 0.0
+        elif amt == 0 or np.sign(amt) == side:
+            new_entry = (abs(amt) * entry + qty * price) / abs(new_amt)
+        elif np.sign(new_amt) == np.sign(amt):
+            new_entry = entry
+        else:
+            new_entry = price  # flipped through zero
+        self.position_amt[i], self.entry_price[i] = new_amt, new_entry
+        self.wallet_balance += realized - fee
+
+        fill = {
+            "orderId": int(order_id), "symbol": self.symbols[i], "side": SIDE_NAMES[side], "type": kind,
+            "price": float(price), "qty": float(qty), "realizedPnl": float(realized), "commission": float(fee),
+            "time": int(self.times[self.cursor]),
+        }
+        self.fills.append(fill)
+        return fill
+
+    def _clear_order(self, i, slot):
+        getattr(self, f"{slot}_side")[i] = 0
+        getattr(self, f"{slot}_stop")[i] = np.nan
+        getattr(self, f"{slot}_id")[i] = 0
+
+    def _order_id(self):
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        return order_id
+
+    def _price(self, i):
+        return float(self.ohlcv[3, i, self.cursor])
+
+    # BinanceFuturesClient surface
+
+    def get_klines(self, symbol, interval="5m", limit=KLINE_LIMIT):
+        i = self._i(symbol)
+        with self.lock:
+            lo = max(0, self.cursor + 1 - limit)
+            hi = self.cursor + 1
+            df = pd.DataFrame(
+                {col: self.ohlcv[j, i, lo:hi] for j, col in enumerate(("open", "high", "low", "close", "volume"))},
+                index=pd.to_datetime(self.times[lo:hi], unit="ms")
+            )
+        df.index.name = "timestamp"
+        return df
+
+    def new_order(self, symbol, side, order_type, quantity=None, stop_price=None, close_position=False,
+                  reduce_only=False):
+        """
+        /fapi/v1/order equivalent. Returns the order dict, or {"code", "msg"} on rejection.
+        """
+        i = self._i(symbol)
+        side = BUY if side == "BUY" else SELL
+        with self.lock:
+            if order_type == "MARKET":
+                qty = self.round_step_size(symbol, quantity or 0)
+                if qty <= 0:
+                    return {"code": -4003, "msg": "Quantity less than or equal to zero."}
+                if reduce_only:
+                    if self.position_amt[i] == 0 or np.sign(self.position_amt[i]) == side:
+                        return {"code": -2022, "msg": "ReduceOnly Order is rejected."}
+                    qty = min(qty, abs(self.position_amt[i]))
+                price = self._price(i) * (1 + side * self.slippage)
+                opening = self.position_amt[i] == 0 or np.sign(self.position_amt[i]) == side
+                if opening and qty * price / self.leverage[i] > self.available_balance():
+                    return {"code": -2019, "msg": "Margin is insufficient."}
+                order_id = self._order_id()
+                fill = self._fill(i, side, qty, price, "MARKET", order_id)
+                return {"orderId": order_id, "symbol": symbol, "status": "FILLED", "type": "MARKET",
+                        "side": SIDE_NAMES[side], "executedQty": qty, "avgPrice": fill["price"]}
+
+            if order_type in ("STOP_MARKET", "TAKE_PROFIT_MARKET"):
+                if not close_position:
+                    return {"code": -1106, "msg": "Only closePosition stop orders are simulated."}
+                slot = "sl" if order_type == "STOP_MARKET" else "tp"
+                price = self._price(i)
+                # Binance rejects stops that would trigger immediately
+                triggers_on_drop = (side == SELL) == (slot == "sl")
+                if (price <= stop_price) if triggers_on_drop else (price >= stop_price):
+                    return {"code": -2021, "msg": "Order would immediately trigger."}
+                order_id = self._order_id()
+                getattr(self, f"{slot}_side")[i] = side
+                getattr(self, f"{slot}_stop")[i] = stop_price
+                getattr(self, f"{slot}_id")[i] = order_id
+                return {"orderId": order_id, "symbol": symbol, "status": "NEW", "type": order_type,
+                        "side": SIDE_NAMES[side], "stopPrice": stop_price, "closePosition": True}
+
+        return {"code": -1116, "msg": f"Invalid orderType {order_type}."}
+
+    def set_leverage(self, symbol, leverage):
+        self.leverage[self._i(symbol)] = int(leverage)
+        return {"symbol": symbol, "leverage": int(leverage)}
+
+    def round_step_size(self, symbol, qty):
+        return round(qty, 3)
+
+    def place_market_order(self, symbol, signal, quantity):
+        side = "BUY" if signal == "LONG" else "SELL"
+        response = self.new_order(symbol, side, "MARKET", quantity=quantity)
+        self._log(f"[🟢] Market order placed: {side} {quantity} {symbol} @ market")
+        return response
+
+    def place_sl_tp_orders(self, symbol, signal, sl_price, tp_price):
+        close_side = "SELL" if signal == "LONG" else "BUY"
+        sl = self.new_order(symbol, close_side, "STOP_MARKET", stop_price=round(sl_price, 2), close_position=True)
+        tp = self.new_order(symbol, close_side, "TAKE_PROFIT_MARKET", stop_price=round(tp_price, 2), close_position=True)
+        for name, response in (("SL", sl), ("TP", tp)):
+            if "orderId" not in response:
+                self._log(f"[❌] {name} order FAILED for {symbol}: {response}")
+        return sl, tp
+
+    def place_order(self, symbol, signal, quantity, sl_price, tp_price, leverage):
+        self.set_leverage(symbol, leverage)
+        self.place_market_order(symbol, signal, quantity)
+        self.place_sl_tp_orders(symbol, signal, sl_price, tp_price)
+
+    def safe_place_order(self, symbol, signal, qty, sl, tp, leverage):
+        # Same sequence as the live client, without the waits for exchange latency
+        self.cancel_all_orders(symbol)
+        self.set_leverage(symbol, leverage)
+        response = self.place_market_order(symbol, signal, qty)
+        if not self.get_open_position(symbol):
+            self._log(f"[❌] Market order failed for {symbol}: {response}")
+            return
+        self.place_sl_tp_orders(symbol, signal, sl, tp)
+        sl_ok, tp_ok = self.verify_open_orders(symbol)
+        if not sl_ok or not tp_ok:
+            self.place_sl_tp_orders(symbol, signal, sl, tp)
+
+    def cancel_all_orders(self, symbol):
+        i = self._i(symbol)
+        with self.lock:
+            self._clear_order(i, "sl")
+            self._clear_order(i, "tp")
+        return {"code": 200, "msg": "The operation of cancel all open order is done."}
+
+    def cancel_stop_loss_order(self, symbol):
+        with self.lock:
+            self._clear_order(self._i(symbol), "sl")
+
+    def set_stop_loss(self, symbol, stop_price, position_side="BOTH"):
+        i = self._i(symbol)
+        close_side = "SELL" if self.position_amt[i] > 0 else "BUY"
+        return self.new_order(symbol, close_side, "STOP_MARKET", stop_price=round(stop_price, 2), close_position=True)
+
+    def get_open_orders(self, symbol):
+        i = self._i(symbol)
+        orders = []
+        with self.lock:
+            for slot, kind in (("sl", "STOP_MARKET"), ("tp", "TAKE_PROFIT_MARKET")):
+                side = int(getattr(self, f"{slot}_side")[i])
+                if side:
+                    orders.append({"orderId": int(getattr(self, f"{slot}_id")[i]), "symbol": symbol, "type": kind,
+                                   "side": SIDE_NAMES[side], "stopPrice": float(getattr(self, f"{slot}_stop")[i]),
+                                   "closePosition": True})
+        return orders
+
+    def verify_open_orders(self, symbol):
+        types = {o["type"] for o in self.get_open_orders(symbol)}
+        return "STOP_MARKET" in types, "TAKE_PROFIT_MARKET" in types
+
+    def get_open_position(self, symbol):
+        i = self._i(symbol)
+        with self.lock:
+            amt = float(self.position_amt[i])
+            if amt == 0:
+                return None
+            entry = float(self.entry_price[i])
+            return {
+                "symbol": symbol,
+                "positionAmt": amt,
+                "entryPrice": entry,
+                "unrealizedProfit": (self._price(i) - entry) * amt,
+                "side": "LONG" if amt > 0 else "SHORT"
+            }
+
+    def get_positions(self):
+        return [p for p in (self.get_open_position(s) for s in self.symbols) if p]
+
+    def close_position(self, symbol, position_amt, position_side="BOTH"):
+        return self.new_order(symbol, "SELL" if position_amt > 0 else "BUY", "MARKET", abs(position_amt),
+                              reduce_only=True)
+
+    def get_mark_prices(self):
+        return {s: self._price(i) for s, i in self.index.items()}
+
+    def ping(self):
+        return True
+
+    def unrealized_pnl(self):
+        prices = self.ohlcv[3, :, self.cursor]
+        return float(((prices - self.entry_price) * self.position_amt).sum())
+
+    def available_balance(self):
+        margin = np.abs(self.position_amt) * self.entry_price / self.leverage
+        return self.wallet_balance + min(0.0, self.unrealized_pnl()) - float(margin.sum())
+
+    def get_balance(self):
+        return self.wallet_balance
+
+    def get_ticker(self, symbol):
+        return self._price(self._i(symbol))
+
+    def get_current_price(self, symbol):
+        return self._price(self._i(symbol))
+
+
+def run_load_test(n_symbols, cycles, interval="15m", seed=0):
+    """
+    Drives StrategyEngine + RiskManager + order placement for every symbol per
+    candle against the simulator and reports per-cycle timings.
+    """
+    from core.strategy_engine import StrategyEngine
+    from core.risk_manager import RiskManager
+
+    exchange = SimulatedFuturesExchange.synthetic(n_symbols, n_bars=KLINE_LIMIT + cycles + 1,
+                                                  interval=interval, seed=seed)
+    cycle_times = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        entries = []
+        for symbol in exchange.symbols:
+            if exchange.get_open_position(symbol):
+                continue
+            df = exchange.get_klines(symbol, interval)
+            engine = StrategyEngine(symbol, interval, df, verbose=False)
+            signal = engine.select_strategy_and_generate_signal()
+            if signal not in ("LONG", "SHORT"):
+                continue
+            entries.append((symbol, signal, df, engine.last_market_zone or "Unknown", engine.last_ml_confidence or 1.0))
+
+        if entries:
+            symbols, signals, frames, zones, confidences = zip(*entries)
+            sizes = RiskManager.calculate_positions(signals, frames, balance=1000, zones=np.array(zones),
+                                                    confidence=np.array(confidences))
+            for symbol, signal, qty, leverage, sl, tp in zip(symbols, signals, *sizes):
+                exchange.safe_place_order(symbol, signal, qty, sl, tp, int(leverage))
+        cycle_times.append(time.perf_counter() - started)
+        exchange.advance()
+
+    cycle_times = np.array(cycle_times)
+    open_positions = int((exchange.position_amt != 0).sum())
+    print(f"[🧪] {n_symbols} symbols × {cycles} cycles: median cycle {np.median(cycle_times):.3f}s, "
+          f"p95 {np.percentile(cycle_times, 95):.3f}s, {np.median(cycle_times) / n_symbols * 1000:.2f} ms/symbol")
+    print(f"[💰] Balance {exchange.get_balance():.2f}, {len(exchange.fills)} fills, {open_positions} open positions")
+    return cycle_times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scale test of the bot's per-symbol loop on a simulated exchange")
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--interval", default="15m")
+    args = parser.parse_args()
+    run_load_test(args.symbols, args.cycles, args.interval)
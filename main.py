@@ -2,26 +2,49 @@
 
 import os
 import time
+import socket
+import argparse
 import traceback
 import datetime
+import multiprocessing as mp
 from exchange.binance import BinanceFuturesClient
 import requests  # ✅ FIXED
-from config import BASE_URL  # ✅ FIXED
+from config import BASE_URL, UNIVERSE  # ✅ FIXED
 from core.strategy_engine import StrategyEngine
+from core.strategy_executor import StrategyEvaluationExecutor
+from core.strategy_registry import get_registry
 from core.risk_manager import RiskManager
+from core.portfolio_risk import PortfolioRisk
+from core.account_state import get_account_state
+from core.scheduler import CycleScheduler
+from core.coordinator import Coordinator
+from core.universe import UniverseScanner
+from core.signal_memo import SignalMemo
+from data.kline_buffer import KlineBuffer
 from core.state_tracker import StateTracker
-from emergency.kill_switch import emergency_exit
-from ml.trainer import train_model
+from core.performance_logger import log_entry_signal
+from emergency.kill_switch import get_flattener
+from emergency.watchdog import DrawdownWatchdog
+from ml.trainer import train_model, retrain_model
+from ml.predictor import model_path_for, warm_model, evict_model
+from ml.retrain_scheduler import RetrainScheduler, retrain_reason
+from ml.selector_trainer import auto_selector_update_loop
 from utils.telegram import send_telegram
 from utils.telegram import poll_telegram
 import threading
 
-MODEL_PATH = "ml/model_lightgbm.txt"
-RETRAIN_INTERVAL_HOURS = 24
 
 SYMBOLS = ["BTCUSDT", "ETHUSDT"]
 TIMEFRAME = "15m"
 
+# > 0 evaluates every strategy for every symbol in a process pool each cycle
+STRATEGY_POOL_WORKERS = 0
+STRATEGY_DEADLINE_SECONDS = 5.0
+FALLBACK_RISK_BALANCE = 1000   # sizing balance until the account state has loaded
+
+# What this process trades (single loop) or splits across workers (supervisor); the retrain targets
+traded_symbols = list(SYMBOLS)
+
 last_trade_close_time = 0
 last_trade_result = None
 cooldown_tp = 3 * 60   # 3 minutes
@@ -41,60 +64,113 @@ confidence_sl_tp_multipliers = [
 ]
 
 
-def auto_retrain_loop(symbol, interval):
-    while True:
-        if os.path.exists(MODEL_PATH):
-            mod_time = os.path.getmtime(MODEL_PATH)
-            age_hours = (time.time() - mod_time) / 3600
-            if age_hours > RETRAIN_INTERVAL_HOURS:
-                print(f"[🔄] Last trained {age_hours:.2f}h ago. Retraining...")
-                train_model(symbol, interval)
-            else:
-                print(f"[🧠] Model is fresh ({age_hours:.2f}h ago). Skipping retrain.")
-        else:
-            print("[⚠️] No model found. Training from scratch...")
-            train_model(symbol, interval)
-
-        time.sleep(3600)  # Check once every hour
+def auto_retrain_loop(symbols, interval):
+    # One model per symbol, retrained in parallel worker processes when its features drift;
+    # follows the scanned universe, so newly traded symbols get their own model
+    scheduler = RetrainScheduler([(symbol, interval) for symbol in symbols],
+                                 source=lambda: [(symbol, interval) for symbol in traded_symbols])
+    scheduler.run_forever()
 
 def auto_retrain_model(symbol="BTCUSDT", interval="5m"):
-    retrain_interval_hours = 24
-    now = time.time()
+    model_path = model_path_for(symbol, interval)
 
-    if not os.path.exists(MODEL_PATH):
+    if not os.path.exists(model_path):
         print("[⚠️] No existing model found. Training from scratch.")
-        train_model(symbol, interval)
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        train_model(symbol, interval, model_path)
         return
 
-    last_modified = os.path.getmtime(MODEL_PATH)
-    hours_since_last_train = (now - last_modified) / 3600
-
-    if hours_since_last_train > retrain_interval_hours:
-        print(f"[🔄] Last trained {hours_since_last_train:.2f}h ago. Retraining...")
-        train_model(symbol, interval)
+    reason = retrain_reason(model_path)
+    if reason:
+        print(f"[🔄] Retraining {symbol} {interval}: {reason}")
+        retrain_model(symbol, interval, model_path)
     else:
-        print(f"[🧠] Model is fresh ({hours_since_last_train:.2f}h ago). Skipping retrain.")
+        print("[🧠] Model is fresh and features are stable. Skipping retrain.")
 
 #adding run_bot
 #   engine = StrategyEngine(symbol=SYMBOL, timeframe=TIMEFRAME, data=df)
 #   signal = engine.select_strategy_and_generate_signal()
 
-def run_bot():
+def run_bot(symbols=SYMBOLS, shard=None):
+    """
+    Trading loop over `symbols`, or with a Coordinator (`shard`) over the
+    symbols whose leases it holds at the moment; the kill switch and
+    watchdog then live in the supervisor process.
+    """
     print("🚀 TitanBot AI starting (multi-symbol mode)...")
 
-    client = BinanceFuturesClient()
-    SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+    client = BinanceFuturesClient(session=shard.session() if shard else None)
+    if shard:
+        symbols = shard.symbols()
+    account = get_account_state(client)
+    # Entries re-send leverage / margin type only when they differ from the account's current ones
+    client.account_config.attach(account)
+    flattener = watchdog = None
+    if shard is None:
+        flattener = get_flattener(client)
+        # Emergency kill-switch: checks every open position on each mark price update, on its own
+        # thread and client/session so it keeps running while this loop sleeps in safe_place_order
+        watchdog = DrawdownWatchdog(BinanceFuturesClient(), account).start()
+    portfolio = PortfolioRisk(TIMEFRAME, balance=FALLBACK_RISK_BALANCE, symbols=SYMBOLS)
+    klines = KlineBuffer(client)
+    memo = SignalMemo()   # one entry decision per closed candle and model version
+    # Sharded workers get their symbols from the coordinator, which the supervisor's scanner feeds
+    scanner = UniverseScanner(client, fallback=symbols) if shard is None and UNIVERSE["enabled"] else None
+    executor = None
+    if STRATEGY_POOL_WORKERS > 0:
+        executor = StrategyEvaluationExecutor(STRATEGY_POOL_WORKERS, STRATEGY_DEADLINE_SECONDS)
+
+    # Wakes each symbol just after its candle closes, and more often near SL/TP while in a position
+    scheduler = CycleScheduler(symbols, TIMEFRAME)
 
     while True:
-        for symbol in SYMBOLS:
+        if shard:
+            shard.changed.clear()
+            symbols = _switch_symbols(symbols, shard.symbols(), scheduler, klines, memo)
+        elif scanner and scanner.due():
+            symbols = _switch_symbols(symbols, scanner.scan(keep=account.snapshot()["positions"]),
+                                     scheduler, klines, memo)
+            traded_symbols[:] = symbols
+        due = [symbol for symbol, _ in scheduler.wait(stop=shard.changed if shard else None)]
+        if not due:
+            continue
+        balance = account.wallet_balance() or FALLBACK_RISK_BALANCE
+        if flattener:
+            flattener.warm(len(symbols))   # keep the kill switch's connections open
+        portfolio.set_balance(balance)
+        frames, cycle_signals = {}, {}
+        evaluate = [symbol for symbol, _ in scheduler.flat([(s, TIMEFRAME) for s in due])]
+        if executor and evaluate:
+            for symbol in evaluate:
+                try:
+                    frames[symbol] = klines.get(symbol, TIMEFRAME)
+                except Exception as e:
+                    print(f"[⚠️] Kline fetch failed for {symbol}: {e}")
+            closed = {s: df.iloc[:-1] for s, df in frames.items()}
+            stale = {s: c for s, c in closed.items() if memo.get(s, TIMEFRAME, c) is None}
+            if stale:
+                names = [s.name() for s in get_registry().get_strategies(next(iter(stale)), TIMEFRAME)]
+                cycle_signals = executor.evaluate_cycle(stale, TIMEFRAME, names)["signals"]
+
+        for symbol in due:
+            if shard and not shard.begin(symbol):
+                continue   # lease moved to another worker during this pass
             try:
-                df = client.get_klines(symbol, TIMEFRAME)
-                engine = StrategyEngine(symbol=symbol, timeframe=TIMEFRAME, data=df)
+                df = frames[symbol] if symbol in frames else klines.get(symbol, TIMEFRAME)
 
                 # ✅ LOAD previous position (to compare against current)
                 previous_state = StateTracker.load_position_state(symbol)
                 current_position = StateTracker.get_open_position(symbol)
                 print(f"[DEBUG] Position info for {symbol}:", current_position)
+                portfolio.observe(symbol, df)
+                portfolio.set_position(symbol, current_position["positionAmt"] if current_position else 0,
+                                       df["close"].iloc[-1])
+                if shard:
+                    shard.publish_position(symbol, current_position["positionAmt"] if current_position else 0,
+                                           df["close"].iloc[-1])
+                scheduler.observe(symbol, TIMEFRAME, df,
+                                  current_position["positionAmt"] if current_position else 0,
+                                  sl=(previous_state or {}).get("sl"), tp=(previous_state or {}).get("tp"))
 
                 # ✅ If previous existed and current is gone = trade closed
                 if previous_state and not current_position:
@@ -122,7 +198,9 @@ def run_bot():
                     log_strategy_result(
                         strategy_name=previous_state.get("strategy", "Unknown"),
                         result="TP_OR_CLOSE",
-                        pnl=round(pnl, 2)
+                        pnl=round(pnl, 2),
+                        symbol=symbol,
+                        timeframe=previous_state.get("timeframe", TIMEFRAME)
                     )
                     StateTracker.clear_state(symbol)
                     continue  # ⛔ important: prevent new entry in same cycle
@@ -160,12 +238,30 @@ def run_bot():
                     continue  # Skip placing a new order
 
                 # ✅ Cooldowns (optional per-symbol tracking if desired)
-                signal = engine.select_strategy_and_generate_signal()
+                # Signals from closed candles only: right after a close the forming candle is seconds old.
+                # ♻️ Same closed candles and models as the last evaluation → same decision, no pipeline run
+                closed_df = df.iloc[:-1]
+                decision = memo.get(symbol, TIMEFRAME, closed_df)
+                if decision is None:
+                    engine = StrategyEngine(symbol=symbol, timeframe=TIMEFRAME, data=closed_df,
+                                            precomputed_signals=cycle_signals.get(symbol))
+                    signal = engine.select_strategy_and_generate_signal()
+                    decision = {
+                        "signal": signal,
+                        "confidence": getattr(engine, "last_ml_confidence", None),
+                        "zone": getattr(engine, "last_market_zone", None),
+                        "strategy": engine.last_strategy_name or (
+                            engine._select_best_strategy().name() if signal in ["LONG", "SHORT"] else None),
+                    }
+                    memo.put(symbol, TIMEFRAME, closed_df, decision)
+                else:
+                    print(f"[♻️] {symbol}: candle unchanged, reusing decision {decision['signal']}")
+                signal = decision["signal"]
                 if signal not in ["LONG", "SHORT"]:
                     continue
 
-                ml_conf = getattr(engine, "last_ml_confidence", None)
-                zone = getattr(engine, "last_market_zone", None)
+                ml_conf = decision["confidence"]
+                zone = decision["zone"]
 
                 print(f"[DEBUG] {symbol} → ML Confidence: {ml_conf}, Zone: {zone}")
 
@@ -173,45 +269,132 @@ def run_bot():
                 zone_for_risk = zone if zone is not None else "Unknown"
 
                 qty, leverage, sl, tp = RiskManager.calculate_position(
-                    signal, df, balance=1000, zone=zone_for_risk, confidence=conf_for_risk
+                    signal, df, balance=balance, zone=zone_for_risk, confidence=conf_for_risk
                 )
 
+                # 🧮 Portfolio exposure / correlation caps across all symbols
+                if shard:
+                    # Checked against every worker's positions and reserved atomically
+                    capped_qty, limit = shard.reserve(portfolio, symbol, signal, qty, df["close"].iloc[-1])
+                else:
+                    capped_qty, limit = portfolio.cap_quantity(symbol, signal, qty, df["close"].iloc[-1])
+                if limit:
+                    print(f"[📉] {symbol} qty capped by {limit} exposure limit: {qty:.4f} → {capped_qty:.4f}")
+                    qty = capped_qty
+                if qty <= 0:
+                    continue
+
                 print(f"[✅] Final SL/TP values for {symbol}:")
                 print(f"     ➤ Signal: {signal}")
                 print(f"     ➤ SL: {sl:.2f} | TP: {tp:.2f}")
 
+                if shard and not shard.owns(symbol):
+                    print(f"[🔀] {symbol} lease lost before the order; skipping.")
+                    continue
+
                 # 🧹 Cleanup before placing a new order (in case old ones lingered)
                 client.cancel_all_orders(symbol)
 
                 client.safe_place_order(symbol, signal, qty, sl, tp, leverage)
+                portfolio.set_position(symbol, qty if signal == "LONG" else -qty, df["close"].iloc[-1])
+                if watchdog:
+                    watchdog.refresh_positions()
+                scheduler.observe(symbol, TIMEFRAME, df, qty if signal == "LONG" else -qty, sl, tp)
 
+                strategy_name = decision["strategy"]
                 StateTracker.save_position_state({
                     "symbol": symbol,
+                    "timeframe": TIMEFRAME,
                     "side": signal,
                     "qty": qty,
                     "sl": sl,
                     "tp": tp,
                     "leverage": leverage,
                     "entry": df["close"].iloc[-1],
-                    "strategy": engine._select_best_strategy().name()
+                    "strategy": strategy_name
                 })
+                log_entry_signal(symbol, TIMEFRAME, signal, strategy_name, zone_for_risk, conf_for_risk,
+                                 df["close"].iloc[-1], sl, tp)
 
                 send_telegram(f"🚀 <b>New {signal} Position Opened</b>\n"
                               f"Symbol: {symbol}\nQty: {qty:.4f} @ Leverage {leverage}x\n"
                               f"SL: {sl:.2f} | TP: {tp:.2f}")
 
-                # ✅ Emergency kill-switch
-                if StateTracker.detect_unusual_drawdown(symbol=symbol, max_loss_pct=0.03):
-                    emergency_exit(client)
-                    send_telegram(f"🛑 <b>Emergency Exit Triggered</b>\nSymbol: {symbol}")
-
             except Exception as e:
                 print(f"[❌] Critical error in symbol loop ({symbol}):")
                 traceback.print_exc()
                 send_telegram(f"❌ <b>Error in TitanBot</b>\nSymbol: {symbol}\n{str(e)}")
-
-        print("[⏳] Sleeping for 60 seconds...\n")
-        time.sleep(60)
+            finally:
+                if shard:
+                    shard.end(symbol)
+
+        print(f"[⏳] Next wake-ups: {scheduler.snapshot()}\n")
+
+
+def _switch_symbols(symbols, new, scheduler, klines, memo):
+    """
+    Moves the loop to `new`: dropped symbols stop being scheduled and lose
+    their kline buffer, memoized decision, strategy instances and
+    per-symbol model; added ones get their candles and model loaded before
+    their first pass.
+    """
+    for symbol in set(symbols) - set(new):
+        scheduler.remove(symbol, TIMEFRAME)
+        klines.evict(symbol, TIMEFRAME)
+        memo.evict(symbol, TIMEFRAME)
+        get_registry().evict(symbol, TIMEFRAME)
+        evict_model(symbol, TIMEFRAME)
+    for symbol in new:
+        if symbol in symbols:
+            continue
+        try:
+            klines.warm(symbol, TIMEFRAME)
+            warm_model(symbol, TIMEFRAME)
+        except Exception as e:
+            print(f"[⚠️] Warm-up failed for {symbol}: {e}")
+        scheduler.add(symbol, TIMEFRAME)
+    return list(new)
+
+
+def run_worker(index):
+    # Worker process: a stable id per slot, so a restarted worker gets its old symbols back
+    shard = Coordinator(worker_id=f"{socket.gethostname()}:w{index}").start(SYMBOLS)
+    run_bot(shard=shard)
+
+
+def run_sharded(workers):
+    """
+    Supervisor: `workers` processes split the scanned universe (SYMBOLS
+    when scanning is off) by consistent hashing through the coordinator;
+    this process keeps the account-wide duties
+    (drawdown watchdog, kill switch, Telegram, retraining) and restarts any
+    worker that exits. All of them draw from one request-weight budget.
+    """
+    print(f"🚀 TitanBot AI starting {workers} workers...")
+    coordinator = Coordinator(worker_id=f"{socket.gethostname()}:supervisor")
+    client = BinanceFuturesClient(session=coordinator.session())
+    account = get_account_state(client)
+    # Emergency traffic never queues behind the workers' budget
+    get_flattener(BinanceFuturesClient(session=coordinator.session(exempt=True))).warm()
+    DrawdownWatchdog(BinanceFuturesClient(session=coordinator.session(exempt=True)), account).start()
+    scanner = UniverseScanner(client, fallback=SYMBOLS) if UNIVERSE["enabled"] else None
+
+    ctx = mp.get_context("spawn")
+    processes = {}
+    while True:
+        if scanner and scanner.due():
+            traded_symbols[:] = scanner.scan(keep=account.snapshot()["positions"])
+            coordinator.publish_universe(traded_symbols)
+        for i in range(workers):
+            process = processes.get(i)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                print(f"[💀] Worker {i} exited with code {process.exitcode}; restarting.")
+                send_telegram(f"⚠️ <b>Worker {i} restarted</b> (exit code {process.exitcode})")
+            processes[i] = ctx.Process(target=run_worker, args=(i,), name=f"titanbot-w{i}", daemon=True)
+            processes[i].start()
+        time.sleep(5)
 
 
 def refresh_chart_every_12h():
@@ -226,9 +409,17 @@ def refresh_chart_every_12h():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TitanBot live trading")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="split SYMBOLS across this many worker processes (0: single loop)")
+    args = parser.parse_args()
 
     # Start background threads BEFORE the bot loop
     threading.Thread(target=poll_telegram, daemon=True).start()
-    threading.Thread(target=auto_retrain_loop, args=("BTCUSDT", TIMEFRAME), daemon=True).start()  # Optional default
+    threading.Thread(target=auto_retrain_loop, args=(SYMBOLS, TIMEFRAME), daemon=True).start()
+    threading.Thread(target=auto_selector_update_loop, daemon=True).start()
     threading.Thread(target=refresh_chart_every_12h, daemon=True).start()
-    run_bot()
+    if args.workers > 0:
+        run_sharded(args.workers)
+    else:
+        run_bot()
@@ -0,0 +1,272 @@
+# ml/drift_monitor.py
+
+import os
+import json
+import glob
+import threading
+import numpy as np
+
+PSI_BINS = 10
+PSI_THRESHOLD = 0.25       # > 0.25 is the usual "significant shift" cut-off for PSI
+DRIFT_WINDOW = 96          # live observations (closed candles) the running stats mostly reflect
+MIN_DRIFT_SAMPLES = 48     # don't judge drift on less than this many candles
+PSI_EPSILON = 1e-4
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def stats_path_for(model_path):
+    return os.path.splitext(model_path)[0] + ".stats.json"
+
+
+def live_path_for(model_path):
+    # Live running stats, shared by every process that loads the model (--workers mode)
+    return os.path.splitext(model_path)[0] + ".drift.json"
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def compute_feature_stats(X, bins=PSI_BINS):
+    """
+    Training-time reference for drift checks: mean/std plus decile bin edges
+    and per-bin counts for every feature column of X.
+    """
+    stats = {}
+    for col in X.columns:
+        values = X[col].to_numpy(dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        stats[col] = {
+            "count": int(len(values)),
+            "mean": float(values.mean()),
+            "var": float(values.var()),
+            "edges": edges.tolist(),
+            "counts": counts.tolist()
+        }
+    return stats
+
+
+def merge_feature_stats(old, X):
+    """
+    Folds the rows of X into existing stats (warm-start retrains), keeping
+    the original bin edges so PSI stays comparable.
+    """
+    merged = {}
+    for col, ref in old.items():
+        if col not in X.columns:
+            merged[col] = ref
+            continue
+        values = X[col].to_numpy(dtype=np.float64)
+        n_a, n_b = ref["count"], len(values)
+        n = n_a + n_b
+        delta = values.mean() - ref["mean"]
+        edges = np.asarray(ref["edges"])
+        counts = np.asarray(ref["counts"]) + np.bincount(
+            np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1
+        )
+        merged[col] = {
+            "count": int(n),
+            "mean": float(ref["mean"] + delta * n_b / n),
+            "var": float((ref["var"] * n_a + values.var() * n_b + delta ** 2 * n_a * n_b / n) / n),
+            "edges": ref["edges"],
+            "counts": counts.tolist()
+        }
+    return merged
+
+
+def save_feature_stats(model_path, stats):
+    # Replaced atomically: monitors in other processes reload it on mtime change
+    path = stats_path_for(model_path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(stats, f)
+    os.replace(tmp, path)
+
+
+def load_feature_stats(model_path):
+    path = stats_path_for(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class DriftMonitor:
+    """
+    Exponentially weighted running mean/variance and bin proportions of the
+    live feature vectors, compared against the training-time reference.
+    With a model_path the running state is saved to live_path_for() after
+    every observation and re-read by sync() when another process wrote it,
+    so the workers that predict and the supervisor that retrains and
+    answers /status see the same drift.
+    """
+
+    def __init__(self, stats, window=DRIFT_WINDOW, model_path=None, ref_mtime=None):
+        self.model_path = model_path
+        self.ref_mtime = ref_mtime
+        self.synced_mtime = None
+        self.features = list(stats.keys())
+        self.alpha = 2 / (window + 1)
+        self.ref_mean = np.array([stats[f]["mean"] for f in self.features])
+        self.ref_std = np.sqrt(np.array([stats[f]["var"] for f in self.features]))
+        self.edges = [np.asarray(stats[f]["edges"]) for f in self.features]
+        self.ref_props = [self._smooth(np.asarray(stats[f]["counts"], dtype=np.float64)) for f in self.features]
+
+        self.n = 0
+        self.mean = np.zeros(len(self.features))
+        self.var = np.zeros(len(self.features))
+        self.props = [np.zeros(len(e) + 1) for e in self.edges]
+        self.last_keys = {}          # source (symbol) -> last key observed from it
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _smooth(counts):
+        props = counts / max(counts.sum(), 1)
+        props = np.maximum(props, PSI_EPSILON)
+        return props / props.sum()
+
+    def observe(self, values, key=None, source=None):
+        """
+        Adds one feature vector (ordered like the training columns). A key
+        repeated by the same source (e.g. one symbol's closed-candle
+        timestamp) is ignored; symbols sharing a model each count.
+        """
+        key = None if key is None else str(key)
+        source = "" if source is None else str(source)
+        with self.lock:
+            if key is not None and key == self.last_keys.get(source):
+                return
+            self.last_keys[source] = key
+
+            x = np.asarray(values, dtype=np.float64)
+            self.n += 1
+            # Plain running average until the window fills, then exponential forgetting
+            a = max(self.alpha, 1 / self.n)
+            diff = x - self.mean
+            self.mean += a * diff
+            self.var = (1 - a) * (self.var + a * diff ** 2)
+            for i, edges in enumerate(self.edges):
+                self.props[i] *= (1 - a)
+                self.props[i][np.searchsorted(edges, x[i], side="right")] += a
+            self._save()
+
+    def _save(self):
+        if self.model_path is None:
+            return
+        path = live_path_for(self.model_path)
+        state = {"model_path": self.model_path, "ref_mtime": self.ref_mtime, "n": self.n,
+                 "mean": self.mean.tolist(), "var": self.var.tolist(),
+                 "props": [p.tolist() for p in self.props], "last_keys": self.last_keys}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+            self.synced_mtime = _mtime_ns(path)
+        except OSError as e:
+            print(f"[⚠️] Could not save drift state for {self.model_path}: {e}")
+
+    def sync(self):
+        """
+        Loads the saved running state when another process wrote it since
+        (state saved against an older training reference is ignored).
+        """
+        if self.model_path is None:
+            return
+        path = live_path_for(self.model_path)
+        mtime = _mtime_ns(path)
+        with self.lock:
+            if mtime is None or mtime == self.synced_mtime:
+                return
+            self.synced_mtime = mtime
+            try:
+                with open(path, "r") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                return
+            if state.get("ref_mtime") != self.ref_mtime or len(state.get("mean", [])) != len(self.features):
+                return
+            self.n = state["n"]
+            self.mean = np.asarray(state["mean"], dtype=np.float64)
+            self.var = np.asarray(state["var"], dtype=np.float64)
+            self.props = [np.asarray(p, dtype=np.float64) for p in state["props"]]
+            self.last_keys = dict(state.get("last_keys", {}))
+
+    def scores(self):
+        """
+        {feature: {"psi": ..., "z": ...}} where z is the live mean shift in training std units.
+        """
+        with self.lock:
+            result = {}
+            for i, name in enumerate(self.features):
+                live = self._smooth(self.props[i])
+                ref = self.ref_props[i]
+                psi = float(np.sum((live - ref) * np.log(live / ref)))
+                z = float(abs(self.mean[i] - self.ref_mean[i]) / self.ref_std[i]) if self.ref_std[i] > 0 else 0.0
+                result[name] = {"psi": psi, "z": z}
+            return result
+
+    def max_psi(self):
+        scores = self.scores()
+        if not scores:
+            return None, 0.0
+        name = max(scores, key=lambda f: scores[f]["psi"])
+        return name, scores[name]["psi"]
+
+    def drift_detected(self, threshold=PSI_THRESHOLD):
+        if self.n < MIN_DRIFT_SAMPLES:
+            return False
+        return self.max_psi()[1] > threshold
+
+
+def get_drift_monitor(model_path):
+    """
+    Shared monitor for a model file; rebuilt whenever a retrain rewrites the
+    stats, and synced with the running state other processes saved.
+    """
+    path = stats_path_for(model_path)
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    with _monitors_lock:
+        cached = _monitors.get(model_path)
+        if cached and cached[0] == mtime:
+            monitor = cached[1]
+        else:
+            try:
+                monitor = DriftMonitor(load_feature_stats(model_path), model_path=model_path, ref_mtime=mtime)
+            except Exception as e:
+                print(f"[⚠️] Could not load drift reference for {model_path}: {e}")
+                return None
+            _monitors[model_path] = (mtime, monitor)
+    monitor.sync()
+    return monitor
+
+
+def drift_report(root="ml"):
+    """
+    One line per monitored model, for /status: the ones used in this process
+    plus every model with saved running state under `root`.
+    """
+    for live in glob.glob(os.path.join(root, "**", "*.drift.json"), recursive=True):
+        try:
+            with open(live, "r") as f:
+                model_path = json.load(f).get("model_path")
+        except (OSError, ValueError):
+            continue
+        if model_path:
+            get_drift_monitor(model_path)
+    with _monitors_lock:
+        monitors = {path: m for path, (_, m) in _monitors.items()}
+    lines = []
+    for path, monitor in monitors.items():
+        name, psi = monitor.max_psi()
+        flag = "🚨" if monitor.drift_detected() else "✅"
+        lines.append(f"{flag} {os.path.basename(path)}: max PSI {psi:.3f} ({name}), n={monitor.n}")
+    return lines
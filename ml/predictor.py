@@ -4,10 +4,47 @@ import pandas as pd
 import numpy as np
 import lightgbm as lgb
 import os
+import threading
+from ml.drift_monitor import get_drift_monitor
+
+SHARED_MODEL_PATH = "ml/model_lightgbm.txt"
+MODEL_DIR = "ml/models"
+
+# model_path -> (mtime, model); shared by every predictor so a model is read once per retrain
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+
+
+def model_path_for(symbol, interval):
+    return os.path.join(MODEL_DIR, f"{symbol}_{interval}.txt")
+
+
+def resolve_model_path(symbol=None, interval=None):
+    """
+    Per-symbol model when one has been trained, otherwise the shared model.
+    """
+    if symbol and interval:
+        path = model_path_for(symbol, interval)
+        if os.path.exists(path):
+            return path
+    return SHARED_MODEL_PATH
+
+
+def warm_model(symbol, interval):
+    # Loads the symbol's model into the shared cache before its first prediction
+    PredictMarketDirection(symbol=symbol, timeframe=interval)
+
+
+def evict_model(symbol, interval):
+    # Drops a per-symbol model that is no longer traded; the shared model stays
+    with _model_cache_lock:
+        _model_cache.pop(model_path_for(symbol, interval), None)
+
 
 class PredictMarketDirection:
-    def __init__(self, model_path="ml/model_lightgbm.txt"):
-        self.model_path = model_path
+    def __init__(self, model_path=None, symbol=None, timeframe=None):
+        self.symbol = symbol
+        self.model_path = model_path or resolve_model_path(symbol, timeframe)
         self.model = self._load_model()
         self.expected_features = [
             "return", "volatility", "ema_5", "ema_13", "rsi",
@@ -16,11 +53,23 @@ class PredictMarketDirection:
 
     def _load_model(self):
         if os.path.exists(self.model_path):
-            model = lgb.LGBMClassifier()
-            model._Booster = lgb.Booster(model_file=self.model_path)
-            model._fit_called = True           # ✅ Prevents "Estimator not fitted" error
-            model.fitted_ = True               # ✅ Optional but safe for newer versions
-            return model
+            mtime = os.path.getmtime(self.model_path)
+            with _model_cache_lock:
+                cached = _model_cache.get(self.model_path)
+                if cached and cached[0] == mtime:
+                    return cached[1]
+
+                model = lgb.LGBMClassifier()
+                try:
+                    model._Booster = lgb.Booster(model_file=self.model_path)
+                except Exception as e:
+                    # Not cached, so the next pass tries again; meanwhile keep the previous model
+                    print(f"[⚠️] Could not load model {self.model_path}: {e}")
+                    return cached[1] if cached else None
+                model._fit_called = True           # ✅ Prevents "Estimator not fitted" error
+                model.fitted_ = True               # ✅ Optional but safe for newer versions
+                _model_cache[self.model_path] = (mtime, model)
+                return model
         else:
             print("[!] LightGBM model not found. Using fallback prediction.")
             return None
@@ -73,21 +122,58 @@ class PredictMarketDirection:
         X_latest = df[self.expected_features].dropna().tail(1)
         if X_latest.empty:
             return None, -1.0
+        self._observe_drift(df)
         try:
-            probs = self.model.predict_proba(X_latest)[0]
+            probs = self._class_probabilities(X_latest)[0]
             return probs, max(probs)
         except Exception as e:
             print(f"[⚠️] Prediction error: {e}")
             return None, -1.0
 
+    def _class_probabilities(self, X):
+        # Straight from the booster: the sklearn wrapper around a file-loaded
+        # booster doesn't know the class count and returns binary-shaped output
+        return self.model.booster_.predict(X).reshape(len(X), -1)
+
+    def predict_proba_batch(self, df: pd.DataFrame):
+        """
+        Class probabilities for every candle of df in one model call,
+        (len(df), n_classes) with NaN rows where features are still warming up.
+        Features come from one pass over the whole history. No drift updates.
+        """
+        if self.model is None or df.empty:
+            return None
+        features = self._build_features(df.copy())
+        if features.empty:
+            return np.full((len(df), 3), np.nan)
+        scored = self._class_probabilities(features[self.expected_features])
+        probs = np.full((len(df), scored.shape[1]), np.nan)
+        probs[df.index.get_indexer(features.index)] = scored
+        return probs
+
+    def _observe_drift(self, features: pd.DataFrame):
+        # Callers pass closed candles only (main.py drops the forming one), so the last
+        # row is the latest closed candle; observed once per candle
+        if features.empty:
+            return
+        monitor = get_drift_monitor(self.model_path)
+        if monitor is None:
+            return
+        row = features.iloc[-1]
+        try:
+            monitor.observe(row[monitor.features].to_numpy(dtype=float), key=features.index[-1], source=self.symbol)
+        except Exception as e:
+            print(f"[⚠️] Drift monitor update failed: {e}")
+
     def get_signal_from_probs(self, probs):
         if probs is None:
             return "HOLD"
         class_idx = int(np.argmax(probs))
         return ["SHORT", "HOLD", "LONG"][class_idx]
 
-    def predict(self, df: pd.DataFrame):
+    def predict(self, df: pd.DataFrame, verbose=True):
         probs, confidence = self.predict_proba(df)
         signal = self.get_signal_from_probs(probs)
-        print(f"[🧠] ML Signal: {signal} ({confidence:.2f})")
+        if verbose:
+            print(f"[🧠] ML Signal: {signal} ({confidence:.2f})")
         return signal, confidence
@@ -0,0 +1,103 @@
+# ml/retrain_scheduler.py
+
+import os
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from ml.predictor import model_path_for, MODEL_DIR
+from ml.trainer import retrain_model
+from ml.drift_monitor import get_drift_monitor
+
+# Retrains are driven by feature drift; these only bound how stale or how eager we get
+MAX_MODEL_AGE_HOURS = 24 * 7
+MIN_RETRAIN_GAP_HOURS = 4
+CHECK_INTERVAL_SECONDS = 300
+
+
+def retrain_reason(model_path, max_age_hours=MAX_MODEL_AGE_HOURS, min_gap_hours=MIN_RETRAIN_GAP_HOURS):
+    """
+    Why the model at model_path should be retrained now, or None if it shouldn't.
+    """
+    if not os.path.exists(model_path):
+        return "no model"
+    age_hours = (time.time() - os.path.getmtime(model_path)) / 3600
+    if age_hours > max_age_hours:
+        return f"model is {age_hours:.1f}h old"
+    if age_hours < min_gap_hours:
+        return None
+    monitor = get_drift_monitor(model_path)
+    if monitor is not None and monitor.drift_detected():
+        feature, psi = monitor.max_psi()
+        return f"feature drift on {feature} (PSI {psi:.3f})"
+    return None
+
+
+class RetrainScheduler:
+    """
+    Keeps one model per (symbol, interval) fresh by fanning retrains out over a
+    bounded process pool, so adding symbols adds parallel work instead of
+    lengthening a serial retrain loop. A model is retrained when its live
+    features drift from the training reference (or it hits MAX_MODEL_AGE_HOURS).
+    `source`, if given, is called every check for the current targets (e.g.
+    the scanned universe); a target without a model gets one built.
+    """
+
+    def __init__(self, targets, max_workers=None, max_age_hours=MAX_MODEL_AGE_HOURS, source=None):
+        self.targets = list(targets)
+        self.source = source
+        self.max_age_hours = max_age_hours
+        # With a source the target count changes, so only the machine bounds the pool
+        cpu_limit = (os.cpu_count() or 2) // 2
+        self.max_workers = max_workers or max(1, cpu_limit if source else min(len(self.targets), cpu_limit))
+        self.in_flight = {}
+        self.last_attempt = {}
+        # spawn: the bot process has already run LightGBM, and forking its OpenMP pool can deadlock
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp.get_context("spawn"))
+        os.makedirs(MODEL_DIR, exist_ok=True)
+
+    def set_targets(self, targets):
+        self.targets = list(targets)
+
+    def due_targets(self):
+        due = []
+        for symbol, interval in self.targets:
+            if (symbol, interval) in self.in_flight:
+                continue
+            # A warm-start can be skipped for lack of new rows; don't hammer it while drift persists
+            if time.time() - self.last_attempt.get((symbol, interval), 0) < MIN_RETRAIN_GAP_HOURS * 3600:
+                continue
+            reason = retrain_reason(model_path_for(symbol, interval), self.max_age_hours)
+            if reason:
+                due.append((symbol, interval, reason))
+        return due
+
+    def _collect_finished(self):
+        for key, future in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[key]
+            try:
+                print(f"[✅] Retrain finished for {key[0]} {key[1]} ({future.result()})")
+            except Exception as e:
+                print(f"[❌] Retrain failed for {key[0]} {key[1]}: {e}")
+
+    def run_once(self):
+        self._collect_finished()
+        if self.source is not None:
+            self.set_targets(self.source())
+        due = self.due_targets()
+        for symbol, interval, reason in due:
+            print(f"[🔄] Scheduling retrain for {symbol} {interval}: {reason}")
+            self.last_attempt[(symbol, interval)] = time.time()
+            self.in_flight[(symbol, interval)] = self.pool.submit(
+                retrain_model, symbol, interval, model_path_for(symbol, interval)
+            )
+        return due
+
+    def run_forever(self, check_interval=CHECK_INTERVAL_SECONDS):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[⚠️] Retrain scheduler error: {e}")
+            time.sleep(check_interval)
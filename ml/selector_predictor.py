@@ -1,33 +1,115 @@
-import pandas as pd
+import os
+import threading
+import numpy as np
 import joblib
 import lightgbm as lgb
-import warnings
-warnings.filterwarnings("ignore", category=FutureWarning, message=".*Downcasting behavior in `replace`.*")
+from core.indicators import rsi, atr, rolling_mean, shift
+
+SELECTOR_MODEL_PATH = "ml/model_strategy_selector.txt"
+SELECTOR_ENCODER_PATH = "ml/strategy_encoder.pkl"
+
+MARKET_FEATURES = ["rsi", "atr", "ma_trend", "volume_ratio", "body_ratio", "zone"]
+SELECTOR_FEATURES = MARKET_FEATURES + ["strategy_encoded"]
+ZONE_CODES = {"Sideways": 0, "Bullish": 1, "Bearish": -1}
+
+_selector_cache = {}
+_selector_lock = threading.Lock()
+
+
+def zone_codes(close, lookback=20, threshold=0.015):
+    """
+    Per-bar zone code, matching StrategyEngine's 20-bar trend zones.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    past = shift(close, lookback - 1)
+    with np.errstate(invalid="ignore"):
+        trend = (close - past) / past
+    return np.select([trend > threshold, trend < -threshold], [1, -1], 0)
+
+
+def market_feature_matrix(open_, high, low, close, volume, zones=None):
+    """
+    (n_bars, len(MARKET_FEATURES)) matrix for every bar of the given arrays,
+    built in one vectorized pass. Used for live scoring (last row) and training.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    if zones is None:
+        zones = zone_codes(close)
+
+    X = np.empty((len(close), len(MARKET_FEATURES)))
+    X[:, 0] = rsi(close)
+    X[:, 1] = atr(high, low, close)
+    past = shift(close, 9)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        X[:, 2] = (close - past) / past
+        X[:, 3] = volume / rolling_mean(volume, 10)
+    X[:, 4] = np.abs(close - open_) / (high - low + 1e-9)
+    X[:, 5] = zones
+    return X
 
 
 class StrategySelector:
-    def __init__(self, model_path="ml/model_strategy_selector.txt", encoder_path="ml/strategy_encoder.pkl"):
+    def __init__(self, model_path=SELECTOR_MODEL_PATH, encoder_path=SELECTOR_ENCODER_PATH):
         self.model = joblib.load(model_path)
         self.encoder = joblib.load(encoder_path)
+        self.booster = self.model.booster_
+        self.codes = {name: i for i, name in enumerate(self.encoder.classes_)}
+
+    def score_matrix(self, market_features, strategy_names):
+        """
+        P(TP) for every (bar, strategy) pair in one booster call.
+        market_features: (n_bars, 6) or (6,); returns (n_bars, n_strategies).
+        Strategies the encoder has never seen score NaN.
+        """
+        market_features = np.atleast_2d(market_features)
+        n, k = len(market_features), len(strategy_names)
+        codes = np.array([self.codes.get(name, -1) for name in strategy_names], dtype=np.float64)
+        known = codes >= 0
+
+        X = np.empty((n, int(known.sum()), len(SELECTOR_FEATURES)))
+        X[:, :, :-1] = market_features[:, None, :]
+        X[:, :, -1] = codes[known]
+
+        probs = np.full((n, k), np.nan)
+        if known.any():
+            probs[:, known] = self.booster.predict(X.reshape(-1, len(SELECTOR_FEATURES))).reshape(n, -1)
+        return probs
+
+    def select(self, market_features, strategy_names):
+        """
+        Best strategy name and its probability for one bar's market features.
+        """
+        probs = self.score_matrix(market_features, strategy_names)[0]
+        if np.all(np.isnan(probs)):
+            raise ValueError(f"Selector knows none of the strategies: {strategy_names}")
+        best_idx = int(np.nanargmax(probs))
+        return strategy_names[best_idx], float(probs[best_idx])
 
     def predict_best_strategy(self, features_df):
         df = features_df.copy()
+        if "zone" in df.columns and df["zone"].dtype.kind not in "biuf":
+            df["zone"] = df["zone"].map(ZONE_CODES).fillna(0)
 
-        # Encode strategy
-        df["strategy_encoded"] = self.encoder.transform(df["strategy"])
+        X = df[MARKET_FEATURES].to_numpy(dtype=np.float64)
+        names = df["strategy"].tolist()
+        codes = np.array([self.codes[name] for name in names], dtype=np.float64)
+        probs = self.booster.predict(np.column_stack([X, codes]))
 
-        # Convert 'zone' to numeric if it's categorical
-        if "zone" in df.columns:
-            df["zone"] = df["zone"].replace({
-                "Sideways": 0,
-                "Bullish": 1,
-                "Bearish": -1
-            }).astype("int64", copy=False)
+        best_idx = int(np.argmax(probs))
+        return names[best_idx], float(probs[best_idx])
 
-        # Prepare inputs
-        model_features = ["rsi", "atr", "ma_trend", "volume_ratio", "body_ratio", "zone", "strategy_encoded"]
-        preds = self.model.predict_proba(df[model_features])
-        probs = [p[1] for p in preds]  # Class 1 = expected TP
 
-        best_idx = probs.index(max(probs))
-        return df.iloc[best_idx]["strategy"], max(probs)
+def get_selector(model_path=SELECTOR_MODEL_PATH, encoder_path=SELECTOR_ENCODER_PATH):
+    """
+    Shared selector, reloaded only when the online trainer rewrites its files.
+    """
+    key = (model_path, encoder_path)
+    mtimes = (os.path.getmtime(model_path), os.path.getmtime(encoder_path))
+    with _selector_lock:
+        cached = _selector_cache.get(key)
+        if cached and cached[0] == mtimes:
+            return cached[1]
+        selector = StrategySelector(model_path, encoder_path)
+        _selector_cache[key] = (mtimes, selector)
+        return selector
@@ -1,69 +1,209 @@
-import pandas as pd
+# ml/selector_trainer.py
+
+import os
+import json
+import time
+import argparse
 import numpy as np
+import pandas as pd
 import lightgbm as lgb
-import ta
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
 import joblib
+from sklearn.preprocessing import LabelEncoder
+from core.strategy_rating import load_strategy_logs
+from data.historical_loader import get_historical_klines, MS_PER_CANDLE
+from ml.selector_predictor import (
+    market_feature_matrix, MARKET_FEATURES, SELECTOR_FEATURES,
+    SELECTOR_MODEL_PATH, SELECTOR_ENCODER_PATH
+)
+
+SELECTOR_META_PATH = "ml/selector_meta.json"
+# Market of journal entries logged without one (before trades recorded their symbol and timeframe)
+SELECTOR_SYMBOL = "ETHUSDT"
+SELECTOR_INTERVAL = "1h"
+FEATURE_WARMUP_CANDLES = 50      # candles before the first trade so RSI/ATR/zone are defined
+MIN_NEW_TRADES = 10
+INCREMENTAL_ROUNDS = 10
+UPDATE_INTERVAL_SECONDS = 6 * 3600
 
-# Load ETH candle data
-eth_df = pd.read_csv("ETHUSDT_1h.csv")
-eth_df["timestamp"] = pd.to_datetime(eth_df["timestamp"])
-eth_df.set_index("timestamp", inplace=True)
-
-# Compute features
-eth_df["rsi"] = ta.momentum.RSIIndicator(eth_df["close"]).rsi()
-eth_df["atr"] = ta.volatility.AverageTrueRange(eth_df["high"], eth_df["low"], eth_df["close"]).average_true_range()
-eth_df["ma14"] = eth_df["close"].rolling(14).mean()
-eth_df["ma_trend"] = eth_df["ma14"].pct_change(periods=5)
-eth_df["volume_ratio"] = eth_df["volume"] / eth_df["volume"].rolling(14).mean()
-eth_df["body_ratio"] = abs(eth_df["close"] - eth_df["open"]) / (eth_df["high"] - eth_df["low"] + 1e-6)
-
-# Add zone feature (numeric encoding)
-def compute_zone(row):
-    if abs(row["ma_trend"]) < 0.001:
-        return 0  # Sideways
-    elif row["ma_trend"] > 0:
-        return 1  # Bullish
+
+def load_journal(path=None, symbol=SELECTOR_SYMBOL, interval=SELECTOR_INTERVAL):
+    """
+    Closed trades as a DataFrame (timestamp, symbol, timeframe, strategy, pnl),
+    sorted by time. Reads journal.csv when a path is given, otherwise the live
+    performance log; entries without a symbol/timeframe get `symbol`/`interval`.
+    """
+    if path:
+        journal = pd.read_csv(path)
     else:
-        return -1  # Bearish
-
-eth_df["zone"] = eth_df.apply(compute_zone, axis=1)
-eth_df.dropna(inplace=True)
-eth_df.reset_index(inplace=True)
-
-# Load trade journal
-journal = pd.read_csv("journal.csv")
-journal["timestamp"] = pd.to_datetime(journal["timestamp"])
-journal["timestamp_rounded"] = journal["timestamp"].dt.floor("H")
-journal["target"] = (journal["pnl"] > 0).astype(int)
-
-# Merge candles with journal
-merged = pd.merge(
-    journal,
-    eth_df,
-    how="inner",
-    left_on="timestamp_rounded",
-    right_on="timestamp"
-)
+        journal = pd.DataFrame(load_strategy_logs())
+    if journal.empty:
+        return pd.DataFrame(columns=["timestamp", "symbol", "timeframe", "strategy", "pnl"])
+    journal = journal.dropna(subset=["timestamp", "strategy", "pnl"])
+    for column, default in (("symbol", symbol), ("timeframe", interval)):
+        journal[column] = journal[column].fillna(default) if column in journal else default
+    journal["timestamp"] = pd.to_datetime(journal["timestamp"], format="ISO8601")
+    journal["pnl"] = journal["pnl"].astype(float)
+    return journal.sort_values("timestamp").reset_index(drop=True)
+
+
+def candle_features(candles):
+    """
+    Per-candle selector features (same definitions the live engine scores with),
+    indexed by candle open time.
+    """
+    X = market_feature_matrix(
+        candles["open"].to_numpy(), candles["high"].to_numpy(), candles["low"].to_numpy(),
+        candles["close"].to_numpy(), candles["volume"].to_numpy()
+    )
+    features = pd.DataFrame(X, columns=MARKET_FEATURES, index=candles.index).dropna()
+    features.index.name = "timestamp"
+    return features.reset_index()
+
+
+def align_trades(journal, features, interval=SELECTOR_INTERVAL):
+    """
+    Attaches to every trade the features of the candle it happened in
+    (latest candle open at or before the trade), in one merge_asof pass.
+    """
+    merged = pd.merge_asof(
+        journal.sort_values("timestamp"), features.sort_values("timestamp"),
+        on="timestamp", direction="backward",
+        tolerance=pd.Timedelta(milliseconds=MS_PER_CANDLE[interval])
+    )
+    merged = merged.dropna(subset=MARKET_FEATURES)
+    merged["target"] = (merged["pnl"] > 0).astype(int)
+    return merged
+
+
+def fetch_candles(since, symbol=SELECTOR_SYMBOL, interval=SELECTOR_INTERVAL):
+    start_ms = int(since.value // 1_000_000) - FEATURE_WARMUP_CANDLES * MS_PER_CANDLE[interval]
+    return get_historical_klines(symbol=symbol, interval=interval, start_time=start_ms)
+
+
+def align_journal(journal, candles=None):
+    """
+    align_trades() per (symbol, timeframe) of the journal, so every trade gets
+    the features of its own market. `candles` optionally maps (symbol,
+    interval) to preloaded candles; other markets are downloaded from just
+    before their first trade.
+    """
+    candles = candles or {}
+    parts = []
+    for (symbol, interval), trades in journal.groupby(["symbol", "timeframe"]):
+        market = candles.get((symbol, interval))
+        if market is None:
+            market = fetch_candles(trades["timestamp"].iloc[0], symbol, interval)
+        parts.append(align_trades(trades, candle_features(market), interval))
+    if not parts:
+        return pd.DataFrame(columns=list(journal.columns) + MARKET_FEATURES + ["target"])
+    return pd.concat(parts).sort_values("timestamp").reset_index(drop=True)
+
 
-# Encode strategy
-le = LabelEncoder()
-merged["strategy_encoded"] = le.fit_transform(merged["strategy"])
+def load_selector_meta():
+    if not os.path.exists(SELECTOR_META_PATH):
+        return None
+    with open(SELECTOR_META_PATH, "r") as f:
+        return json.load(f)
 
-# Prepare training data
-features = ["rsi", "atr", "ma_trend", "volume_ratio", "body_ratio", "zone", "strategy_encoded"]
-X = merged[features]
-y = merged["target"]
 
-# Train/test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def save_selector(model, encoder, last_trade, rows, full):
+    joblib.dump(model, SELECTOR_MODEL_PATH)
+    joblib.dump(encoder, SELECTOR_ENCODER_PATH)
+    meta = load_selector_meta() or {}
+    meta.update({
+        "last_trade": last_trade.isoformat(),
+        "classes": list(encoder.classes_),
+        "rows": rows if full else meta.get("rows", 0) + rows,
+        "updated_at": int(time.time())
+    })
+    if full:
+        meta["last_full_train"] = meta["updated_at"]
+    with open(SELECTOR_META_PATH, "w") as f:
+        json.dump(meta, f, indent=2)
 
-# Train LightGBM
-model = lgb.LGBMClassifier()
-model.fit(X_train, y_train)
 
-# Save model and encoder
-joblib.dump(model, "model_strategy_selector.txt")
-joblib.dump(le, "strategy_encoder.pkl")
-print("✅ Model and encoder saved.")
+def train_selector(journal, candles=None):
+    merged = align_journal(journal, candles)
+    if merged["target"].nunique() < 2:
+        print(f"[⏭️] Selector: {len(merged)} aligned trades with one outcome class. Skipping.")
+        return False
+
+    encoder = LabelEncoder()
+    merged["strategy_encoded"] = encoder.fit_transform(merged["strategy"])
+
+    model = lgb.LGBMClassifier(verbose=-1)
+    model.fit(merged[SELECTOR_FEATURES], merged["target"])
+
+    save_selector(model, encoder, merged["timestamp"].iloc[-1], len(merged), full=True)
+    print(f"[✅] Selector trained on {len(merged)} trades ({', '.join(encoder.classes_)})")
+    return True
+
+
+def update_selector(journal=None, symbol=SELECTOR_SYMBOL, interval=SELECTOR_INTERVAL):
+    """
+    Adds boosting rounds for the trades journaled since the last update. Falls
+    back to a full retrain when a strategy appears that the encoder doesn't know.
+    symbol/interval only apply to journal entries that don't record their own.
+    """
+    journal = load_journal(symbol=symbol, interval=interval) if journal is None else journal
+    if journal.empty:
+        return False
+
+    meta = load_selector_meta()
+    if meta is None or not os.path.exists(SELECTOR_MODEL_PATH):
+        return train_selector(journal)
+
+    new_trades = journal[journal["timestamp"] > pd.Timestamp(meta["last_trade"])]
+    if len(new_trades) < MIN_NEW_TRADES:
+        print(f"[🧠] Selector: {len(new_trades)} new trades since last update. Skipping.")
+        return False
+
+    if not set(new_trades["strategy"]) <= set(meta.get("classes", [])):
+        print("[🔁] Selector: new strategies in the journal. Full retrain.")
+        return train_selector(journal)
+
+    merged = align_journal(new_trades)
+    if len(merged) < MIN_NEW_TRADES or merged["target"].nunique() < 2:
+        print(f"[⏭️] Selector: {len(merged)} aligned new trades, not enough to update.")
+        return False
+
+    old_model = joblib.load(SELECTOR_MODEL_PATH)
+    encoder = joblib.load(SELECTOR_ENCODER_PATH)
+    merged["strategy_encoded"] = encoder.transform(merged["strategy"])
+
+    model = lgb.LGBMClassifier(n_estimators=INCREMENTAL_ROUNDS, verbose=-1)
+    model.fit(merged[SELECTOR_FEATURES], merged["target"], init_model=old_model.booster_)
+
+    save_selector(model, encoder, merged["timestamp"].iloc[-1], len(merged), full=False)
+    print(f"[✅] Selector updated with {len(merged)} new trades")
+    return True
+
+
+def auto_selector_update_loop(symbol=SELECTOR_SYMBOL, interval=SELECTOR_INTERVAL):
+    while True:
+        try:
+            update_selector(symbol=symbol, interval=interval)
+        except Exception as e:
+            print(f"[⚠️] Selector update error: {e}")
+        time.sleep(UPDATE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the Phase 12 strategy selector")
+    parser.add_argument("--journal", default=None, help="journal.csv (defaults to strategy_performance.json)")
+    parser.add_argument("--candles", default=None,
+                        help="candle CSV of --symbol/--interval (other markets are downloaded)")
+    parser.add_argument("--symbol", default=SELECTOR_SYMBOL, help="market of journal entries without one")
+    parser.add_argument("--interval", default=SELECTOR_INTERVAL)
+    parser.add_argument("--full", action="store_true", help="retrain from scratch instead of updating")
+    args = parser.parse_args()
+
+    journal = load_journal(args.journal, args.symbol, args.interval)
+    if args.full:
+        candles = {}
+        if args.candles:
+            candles[(args.symbol, args.interval)] = pd.read_csv(
+                args.candles, parse_dates=["timestamp"]).set_index("timestamp").astype(float)
+        train_selector(journal, candles)
+    else:
+        update_selector(journal, args.symbol, args.interval)
@@ -1,10 +1,14 @@
 # ml/trainer.py
 
+import os
+import json
 import pandas as pd
 import numpy as np
+import time
 import lightgbm as lgb
-from data.historical_loader import get_historical_klines
+from data.historical_loader import get_historical_klines, MS_PER_CANDLE
 from ml.predictor import PredictMarketDirection
+from ml.drift_monitor import compute_feature_stats, merge_feature_stats, load_feature_stats, save_feature_stats
 
 def add_technical_indicators(df):
     df["return"] = df["close"].pct_change()
@@ -82,30 +86,194 @@ def generate_multiclass_labels(df, threshold=0.004, horizon=6):
 
 #test
 
-def train_model(symbol="BTCUSDT", interval="15m", model_path="ml/model_lightgbm.txt"):
-    print(f"[📚] Training LightGBM model for {symbol} on {interval} data")
+MODEL_FEATURES = [
+    "return", "volatility", "ema_5", "ema_13", "rsi",
+    "bb_upper", "bb_lower", "bb_width", "macd_hist", "atr", "volume_delta"
+]
 
-    df = get_historical_klines(symbol=symbol, interval=interval)
+# Used whenever no tuned configuration has been saved next to the model
+DEFAULT_MODEL_PARAMS = {"n_estimators": 100, "max_depth": 5}
+
+LABEL_HORIZON = 6               # generate_multiclass_labels default horizon
+INDICATOR_WARMUP_CANDLES = 200  # history re-fetched before the cursor so EMAs/rolling windows settle
+INCREMENTAL_ROUNDS = 20         # boosting rounds appended per warm-start retrain
+MIN_INCREMENTAL_ROWS = 50
+FULL_REBUILD_DAYS = 7           # periodic from-scratch rebuild guards against drift
+
+
+def params_path_for(model_path):
+    return os.path.splitext(model_path)[0] + ".params.json"
+
+
+def meta_path_for(model_path):
+    return os.path.splitext(model_path)[0] + ".meta.json"
+
+
+def load_model_meta(model_path="ml/model_lightgbm.txt"):
+    path = meta_path_for(model_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[⚠️] Could not read model metadata from {path}: {e}")
+        return None
+
+
+def staging_path(path):
+    # Same-directory temp file to os.replace() over `path`: the live bot reloads models and
+    # their json on mtime change and must never read a half-written file
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def save_booster(model, model_path):
+    tmp = staging_path(model_path)
+    model.booster_.save_model(tmp)
+    os.replace(tmp, model_path)
+
+
+def save_json(path, data):
+    tmp = staging_path(path)
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def save_model_meta(model_path, meta):
+    save_json(meta_path_for(model_path), meta)
+
+
+def load_model_params(model_path="ml/model_lightgbm.txt"):
+    """
+    Returns the LightGBM params for the model at model_path: the defaults,
+    overridden by the best configuration found by ml/tuner.py if one exists.
+    """
+    params = dict(DEFAULT_MODEL_PARAMS)
+    path = params_path_for(model_path)
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                params.update(json.load(f).get("params", {}))
+        except Exception as e:
+            print(f"[⚠️] Could not read tuned params from {path}: {e}")
+    return params
+
+
+def build_training_matrix(df, since=None, labeled_only=False):
+    """
+    Returns (X, y) indexed by candle timestamp. since drops rows at or before
+    that timestamp; labeled_only drops the tail rows whose label horizon runs
+    past the data (they only carry the default HOLD label).
+    """
     df = add_technical_indicators(df)
-    df = generate_multiclass_labels(df)
+    df = generate_multiclass_labels(df, horizon=LABEL_HORIZON)
 
-    df = df.dropna().reset_index(drop=True)
+    if labeled_only:
+        df = df.iloc[:-LABEL_HORIZON]
+    if since is not None:
+        df = df[df.index > since]
 
-    features = [
-        "return", "volatility", "ema_5", "ema_13", "rsi",
-        "bb_upper", "bb_lower", "bb_width", "macd_hist", "atr", "volume_delta"
-    ]
-    features = [f for f in features if f in df.columns]
+    df = df.dropna()
+
+    features = [f for f in MODEL_FEATURES if f in df.columns]
     X = df[features]
     y = df["label_class"]
+    return X, y
+
+
+def train_model(symbol="BTCUSDT", interval="15m", model_path="ml/model_lightgbm.txt"):
+    print(f"[📚] Training LightGBM model for {symbol} on {interval} data")
 
-    model = lgb.LGBMClassifier(objective="multiclass", num_class=3, n_estimators=100, max_depth=5)
+    df = get_historical_klines(symbol=symbol, interval=interval)
+    X, y = build_training_matrix(df)
+
+    params = load_model_params(model_path)
+    print(f"[⚙️] LightGBM params: {params}")
+    model = lgb.LGBMClassifier(objective="multiclass", num_class=3, **params)
     model.fit(X, y)
 
-    model.booster_.save_model(model_path)
+    save_booster(model, model_path)
     print(f"[✅] Model trained and saved to {model_path}")
 
+    # Cursor for the next warm-start: the last candle whose label was fully known
+    last_labeled = X.index[-(LABEL_HORIZON + 1)] if len(X) > LABEL_HORIZON else X.index[-1]
+    save_model_meta(model_path, {
+        "symbol": symbol,
+        "interval": interval,
+        "last_labeled_ms": int(last_labeled.value // 1_000_000),
+        "last_full_train": int(time.time()),
+        "incremental_updates": 0,
+        "rows": len(X)
+    })
+    save_feature_stats(model_path, compute_feature_stats(X))
+
     # Print feature importances
     importance = pd.Series(model.feature_importances_, index=X.columns).sort_values(ascending=False)
     print("[📊] Top Features:")
     print(importance.head(10))
+
+
+def train_incremental(symbol="BTCUSDT", interval="15m", model_path="ml/model_lightgbm.txt"):
+    """
+    Continues boosting the saved booster on the candles added since the last
+    training. Returns False when there is not enough new labeled data yet.
+    """
+    meta = load_model_meta(model_path)
+    cursor_ms = meta["last_labeled_ms"]
+    start_ms = cursor_ms - INDICATOR_WARMUP_CANDLES * MS_PER_CANDLE[interval]
+
+    print(f"[📚] Warm-start retrain for {symbol} {interval} on candles after {pd.Timestamp(cursor_ms, unit='ms')}")
+    df = get_historical_klines(symbol=symbol, interval=interval, start_time=start_ms)
+    X, y = build_training_matrix(df, since=pd.Timestamp(cursor_ms, unit="ms"), labeled_only=True)
+
+    # The sklearn wrapper re-derives classes from y, so all three must be present
+    if len(X) < MIN_INCREMENTAL_ROWS or y.nunique() < 3:
+        print(f"[⏭️] Only {len(X)} new labeled rows ({y.nunique()} classes). Skipping warm-start.")
+        return False
+
+    params = load_model_params(model_path)
+    params["n_estimators"] = INCREMENTAL_ROUNDS
+    model = lgb.LGBMClassifier(objective="multiclass", num_class=3, **params)
+    model.fit(X, y, init_model=model_path)
+
+    save_booster(model, model_path)
+    meta.update({
+        "last_labeled_ms": int(X.index[-1].value // 1_000_000),
+        "incremental_updates": meta.get("incremental_updates", 0) + 1,
+        "rows": meta.get("rows", 0) + len(X)
+    })
+    save_model_meta(model_path, meta)
+    stats = load_feature_stats(model_path)
+    save_feature_stats(model_path, merge_feature_stats(stats, X) if stats else compute_feature_stats(X))
+    print(f"[✅] Appended {INCREMENTAL_ROUNDS} rounds on {len(X)} new rows → {model.booster_.num_trees() // 3} total rounds")
+    return True
+
+
+def retrain_model(symbol="BTCUSDT", interval="15m", model_path="ml/model_lightgbm.txt"):
+    """
+    Warm-starts the existing model when possible and falls back to a full
+    rebuild when there is no usable model, the last full rebuild is older than
+    FULL_REBUILD_DAYS, or newer tuned params were saved since.
+    """
+    meta = load_model_meta(model_path)
+    reason = None
+    if not os.path.exists(model_path) or meta is None:
+        reason = "no model metadata"
+    elif meta.get("symbol") != symbol or meta.get("interval") != interval:
+        reason = f"model was trained on {meta.get('symbol')} {meta.get('interval')}"
+    elif time.time() - meta.get("last_full_train", 0) > FULL_REBUILD_DAYS * 86400:
+        reason = f"last full rebuild over {FULL_REBUILD_DAYS} days ago"
+    elif os.path.exists(params_path_for(model_path)) and \
+            os.path.getmtime(params_path_for(model_path)) > meta.get("last_full_train", 0):
+        reason = "new tuned params"
+
+    if reason is None:
+        try:
+            return "incremental" if train_incremental(symbol, interval, model_path) else "skipped"
+        except Exception as e:
+            reason = f"warm-start failed ({e})"
+
+    print(f"[🔁] Full rebuild: {reason}")
+    train_model(symbol, interval, model_path)
+    return "full"
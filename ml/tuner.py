@@ -0,0 +1,157 @@
+# ml/tuner.py
+
+import os
+import time
+import shutil
+import tempfile
+import argparse
+import multiprocessing as mp
+import numpy as np
+import lightgbm as lgb
+from data.historical_loader import get_historical_klines
+from ml.trainer import build_training_matrix, params_path_for, save_json
+
+VALIDATION_FRACTION = 0.2     # last 20% of candles, never shuffled (time series)
+EARLY_STOPPING_ROUNDS = 20
+
+SEARCH_SPACE = {
+    "learning_rate": ("log", 0.01, 0.3),
+    "num_leaves": ("int", 8, 128),
+    "max_depth": ("int", 3, 12),
+    "min_child_samples": ("int", 10, 200),
+    "subsample": ("float", 0.5, 1.0),
+    "colsample_bytree": ("float", 0.5, 1.0),
+    "reg_lambda": ("log", 1e-3, 10.0),
+}
+
+# Worker-side views of the feature matrix, memory-mapped read-only once per process
+_X_train = _y_train = _X_val = _y_val = None
+
+
+def sample_params(rng):
+    params = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if kind == "int":
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    # subsample only takes effect with bagging enabled
+    params["subsample_freq"] = 1
+    return params
+
+
+def _init_worker(matrix_dir, split):
+    global _X_train, _y_train, _X_val, _y_val
+    X = np.load(os.path.join(matrix_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(matrix_dir, "y.npy"), mmap_mode="r")
+    _X_train, _y_train = X[:split], y[:split]
+    _X_val, _y_val = X[split:], y[split:]
+
+
+def _run_trial(args):
+    trial_id, params, rounds = args
+    model = lgb.LGBMClassifier(
+        objective="multiclass", num_class=3, n_estimators=rounds,
+        n_jobs=1, verbose=-1, **params
+    )
+    model.fit(
+        _X_train, _y_train,
+        eval_set=[(_X_val, _y_val)],
+        eval_metric="multi_logloss",
+        callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+    )
+    score = model.best_score_["valid_0"]["multi_logloss"]
+    best_iteration = model.best_iteration_ or rounds
+    return trial_id, float(score), int(best_iteration)
+
+
+def random_search(pool, configs, rounds):
+    results = pool.map(_run_trial, [(i, p, rounds) for i, p in enumerate(configs)])
+    return [(score, configs[i], best_it) for i, score, best_it in results]
+
+
+def successive_halving(pool, configs, min_rounds, max_rounds, eta=3):
+    """
+    Runs every config with a small boosting budget, keeps the best 1/eta,
+    multiplies the budget by eta and repeats until one config or max_rounds is left.
+    """
+    survivors = list(enumerate(configs))
+    rounds = min_rounds
+    while True:
+        results = pool.map(_run_trial, [(i, p, rounds) for i, p in survivors])
+        scored = sorted(results, key=lambda r: r[1])
+        print(f"[🔬] Halving rung: {len(survivors)} configs @ {rounds} rounds → best logloss {scored[0][1]:.4f}")
+
+        if len(survivors) <= 1 or rounds >= max_rounds:
+            return [(score, configs[i], best_it) for i, score, best_it in scored]
+
+        keep = {i for i, _, _ in scored[:max(1, len(survivors) // eta)]}
+        survivors = [(i, p) for i, p in survivors if i in keep]
+        rounds = min(max_rounds, rounds * eta)
+
+
+def tune_model(symbol="BTCUSDT", interval="15m", model_path="ml/model_lightgbm.txt",
+               method="halving", n_trials=27, n_workers=None, max_rounds=1000, seed=None):
+    print(f"[🔬] Hyperparameter search ({method}, {n_trials} trials) for {symbol} {interval}")
+
+    df = get_historical_klines(symbol=symbol, interval=interval)
+    X, y = build_training_matrix(df)
+    split = int(len(X) * (1 - VALIDATION_FRACTION))
+
+    rng = np.random.default_rng(seed)
+    configs = [sample_params(rng) for _ in range(n_trials)]
+    n_workers = n_workers or os.cpu_count() or 1
+
+    matrix_dir = tempfile.mkdtemp(prefix="titanbot_tune_")
+    try:
+        # Built once, shared read-only with every worker through np.load(mmap_mode="r")
+        np.save(os.path.join(matrix_dir, "X.npy"), X.to_numpy(dtype=np.float64))
+        np.save(os.path.join(matrix_dir, "y.npy"), y.to_numpy(dtype=np.int64))
+
+        # spawn: forking a process that already ran LightGBM's OpenMP pool can deadlock
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(n_workers, initializer=_init_worker, initargs=(matrix_dir, split)) as pool:
+            if method == "random":
+                results = random_search(pool, configs, max_rounds)
+            elif method == "halving":
+                results = successive_halving(pool, configs, min_rounds=max(50, max_rounds // 27), max_rounds=max_rounds)
+            else:
+                raise ValueError(f"Unknown search method: {method}")
+    finally:
+        shutil.rmtree(matrix_dir, ignore_errors=True)
+
+    score, params, best_iteration = min(results, key=lambda r: r[0])
+    params = dict(params, n_estimators=best_iteration)
+
+    path = params_path_for(model_path)
+    save_json(path, {
+        "symbol": symbol,
+        "interval": interval,
+        "method": method,
+        "n_trials": n_trials,
+        "val_logloss": score,
+        "tuned_at": int(time.time()),
+        "params": params
+    })
+
+    print(f"[✅] Best logloss {score:.4f} with {params}")
+    print(f"[💾] Saved tuned params to {path} (picked up by the next retrain)")
+    return params, score
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LightGBM hyperparameter search for the direction model")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--model-path", default="ml/model_lightgbm.txt")
+    parser.add_argument("--method", choices=["random", "halving"], default="halving")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    tune_model(args.symbol, args.interval, args.model_path, args.method,
+               args.trials, args.workers, args.max_rounds, args.seed)
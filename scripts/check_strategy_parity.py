@@ -0,0 +1,82 @@
+import sys
+import os
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from strategies.base import SIGNAL_NAMES, as_arrays
+from strategies.breakout import BreakoutStrategy
+from strategies.trend_following import TrendFollowingStrategy
+from strategies.volatility_reversal import VolatilityReversalStrategy
+
+# Checks that generate_signals (whole history, one pass) agrees bar by bar with
+# the original per-call pandas implementations run on df.iloc[:i + 1].
+
+
+def legacy_breakout(df):
+    df = df.copy()
+    df["high_range"] = df["high"].rolling(window=20).max()
+    df["low_range"] = df["low"].rolling(window=20).min()
+    last_close = df["close"].iloc[-1]
+    if last_close > df["high_range"].iloc[-2]:
+        return "LONG"
+    elif last_close < df["low_range"].iloc[-2]:
+        return "SHORT"
+    return "HOLD"
+
+
+def legacy_trend_following(df):
+    df = df.copy()
+    df["ema20"] = df["close"].ewm(span=20).mean()
+    df["ema50"] = df["close"].ewm(span=50).mean()
+    if df["ema20"].iloc[-1] > df["ema50"].iloc[-1] and df["ema20"].iloc[-2] <= df["ema50"].iloc[-2]:
+        return "LONG"
+    elif df["ema20"].iloc[-1] < df["ema50"].iloc[-1] and df["ema20"].iloc[-2] >= df["ema50"].iloc[-2]:
+        return "SHORT"
+    return "HOLD"
+
+
+def legacy_volatility_reversal(df):
+    df = df.copy()
+    df["range"] = df["high"] - df["low"]
+    df["range_mean"] = df["range"].rolling(window=20).mean()
+    last_range = df["range"].iloc[-1]
+    low_vol = df["range"].iloc[-5:-1].mean() < df["range_mean"].iloc[-1] * 0.7
+    if low_vol and last_range > df["range_mean"].iloc[-1] * 1.5:
+        if df["close"].iloc[-1] > df["open"].iloc[-1]:
+            return "LONG"
+        elif df["close"].iloc[-1] < df["open"].iloc[-1]:
+            return "SHORT"
+    return "HOLD"
+
+
+LEGACY = {
+    BreakoutStrategy: legacy_breakout,
+    TrendFollowingStrategy: legacy_trend_following,
+    VolatilityReversalStrategy: legacy_volatility_reversal,
+}
+
+
+def check_parity(df, warmup=5):
+    arrays = as_arrays(df)
+    ok = True
+    for cls, legacy in LEGACY.items():
+        strategy = cls("PARITY", "1h", df)
+        signals = strategy.generate_signals(arrays)
+        mismatches = [
+            i for i in range(warmup, len(df))
+            if SIGNAL_NAMES[int(signals[i])] != legacy(df.iloc[:i + 1])
+        ]
+        active = int((signals != 0).sum())
+        status = "✅" if not mismatches else "❌"
+        print(f"{status} {strategy.name()}: {len(df) - warmup} bars, {active} signals, {len(mismatches)} mismatches")
+        if mismatches:
+            print(f"   first mismatching bars: {mismatches[:10]}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "ETHUSDT_1h.csv"
+    candles = pd.read_csv(path, parse_dates=["timestamp"]).set_index("timestamp").astype(float)
+    sys.exit(0 if check_parity(candles) else 1)
@@ -1,21 +1,70 @@
 # strategies/base.py
 
 from abc import ABC, abstractmethod
-import pandas as pds
+import numpy as np
+
+SIGNAL_HOLD = 0
+SIGNAL_LONG = 1
+SIGNAL_SHORT = -1
+SIGNAL_NAMES = {SIGNAL_LONG: "LONG", SIGNAL_SHORT: "SHORT", SIGNAL_HOLD: "HOLD"}
+
+OHLCV = ("open", "high", "low", "close", "volume")
+
+
+def as_arrays(data):
+    """
+    Read-only float64 OHLCV arrays for a kline DataFrame (views, not copies,
+    when the frame is already float). Dicts of arrays are passed through.
+    """
+    if isinstance(data, dict):
+        return data
+    arrays = {}
+    for col in OHLCV:
+        values = data[col].to_numpy(dtype=np.float64)
+        if values.flags.writeable:
+            values = values.view()
+            values.flags.writeable = False
+        arrays[col] = values
+    return arrays
+
 
 class BaseStrategy(ABC):
-    def __init__(self, symbol, timeframe, data):
+    # Instances are reused across cycles by the strategy registry, so strategies
+    # must not keep per-call state; market data comes in with each call.
+    DEFAULT_PARAMS = {}   # tunable settings, read from self.params
+    PARAM_GRID = {}       # values the sweep runner tries per setting
+
+    def __init__(self, symbol, timeframe, data=None, params=None):
         self.symbol = symbol
         self.timeframe = timeframe
-        self.data = data  # Should be a pandas DataFrame
+        self.data = data  # Optional default DataFrame for generate_signal()
+        self.params = {**self.DEFAULT_PARAMS, **(params or {})}
 
     @abstractmethod
-    def generate_signal(self):
+    def generate_signals(self, arrays):
         """
-        Should return one of: "LONG", "SHORT", or "HOLD"
+        Vectorized signals for every bar: int8 array of SIGNAL_LONG / SIGNAL_SHORT /
+        SIGNAL_HOLD aligned with the input. arrays maps "open", "high", "low",
+        "close", "volume" to read-only arrays; bar i may only use bars <= i.
         """
         pass
 
+    def generate_signal(self, data=None):
+        """
+        Should return one of: "LONG", "SHORT", or "HOLD"
+        """
+        signals = self.generate_signals(as_arrays(self.data if data is None else data))
+        if len(signals) == 0:
+            return "HOLD"
+        return SIGNAL_NAMES[int(signals[-1])]
+
+    @classmethod
+    def valid_params(cls, params):
+        """
+        False for parameter combinations that make no sense (skipped by sweeps).
+        """
+        return True
+
     @abstractmethod
     def name(self):
         pass
@@ -1,23 +1,24 @@
 # strategies/breakout.py
 
-from strategies.base import BaseStrategy
+import numpy as np
+from strategies.base import BaseStrategy, SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_HOLD
+from core.indicators import rolling_max, rolling_min, shift
 
 class BreakoutStrategy(BaseStrategy):
-    def generate_signal(self):
-        df = self.data.copy()
-        df["high_range"] = df["high"].rolling(window=20).max()
-        df["low_range"] = df["low"].rolling(window=20).min()
+    DEFAULT_PARAMS = {"window": 20}
+    PARAM_GRID = {"window": [10, 15, 20, 30, 40, 55]}
 
-        last_close = df["close"].iloc[-1]
-        high_range = df["high_range"].iloc[-2]  # use previous candle range
-        low_range = df["low_range"].iloc[-2]
+    def generate_signals(self, arrays):
+        close = arrays["close"]
+        window = self.params["window"]
+        high_range = shift(rolling_max(arrays["high"], window))  # use previous candle range
+        low_range = shift(rolling_min(arrays["low"], window))
 
-        if last_close > high_range:
-            return "LONG"
-        elif last_close < low_range:
-            return "SHORT"
-        else:
-            return "HOLD"
+        return np.select(
+            [close > high_range, close < low_range],
+            [SIGNAL_LONG, SIGNAL_SHORT],
+            SIGNAL_HOLD
+        ).astype(np.int8)
 
     def name(self):
         return "BreakoutStrategy"
@@ -1,19 +1,27 @@
 # strategies/trend_following.py
 
-from strategies.base import BaseStrategy
+import numpy as np
+from strategies.base import BaseStrategy, SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_HOLD
+from core.indicators import ewm_mean, shift
 
 class TrendFollowingStrategy(BaseStrategy):
-    def generate_signal(self):
-        df = self.data.copy()
-        df["ema20"] = df["close"].ewm(span=20).mean()
-        df["ema50"] = df["close"].ewm(span=50).mean()
+    DEFAULT_PARAMS = {"fast": 20, "slow": 50}
+    PARAM_GRID = {"fast": [10, 20, 30], "slow": [50, 100, 200]}
 
-        if df["ema20"].iloc[-1] > df["ema50"].iloc[-1] and df["ema20"].iloc[-2] <= df["ema50"].iloc[-2]:
-            return "LONG"
-        elif df["ema20"].iloc[-1] < df["ema50"].iloc[-1] and df["ema20"].iloc[-2] >= df["ema50"].iloc[-2]:
-            return "SHORT"
-        else:
-            return "HOLD"
+    @classmethod
+    def valid_params(cls, params):
+        return params["fast"] < params["slow"]
+
+    def generate_signals(self, arrays):
+        fast = ewm_mean(arrays["close"], self.params["fast"])
+        slow = ewm_mean(arrays["close"], self.params["slow"])
+        prev_fast, prev_slow = shift(fast), shift(slow)
+
+        return np.select(
+            [(fast > slow) & (prev_fast <= prev_slow), (fast < slow) & (prev_fast >= prev_slow)],
+            [SIGNAL_LONG, SIGNAL_SHORT],
+            SIGNAL_HOLD
+        ).astype(np.int8)
 
     def name(self):
         return "TrendFollowingStrategy"
@@ -1,24 +1,28 @@
 # strategies/volatility_reversal.py
 
-from strategies.base import BaseStrategy
+import numpy as np
+from strategies.base import BaseStrategy, SIGNAL_LONG, SIGNAL_SHORT, SIGNAL_HOLD
+from core.indicators import rolling_mean, shift
 
 class VolatilityReversalStrategy(BaseStrategy):
-    def generate_signal(self):
-        df = self.data.copy()
-        df["range"] = df["high"] - df["low"]
-        df["range_std"] = df["range"].rolling(window=20).std()
-        df["range_mean"] = df["range"].rolling(window=20).mean()
+    DEFAULT_PARAMS = {"window": 20, "quiet_bars": 4, "quiet_factor": 0.7, "expansion_factor": 1.5}
+    PARAM_GRID = {"window": [10, 20, 40], "quiet_factor": [0.6, 0.7, 0.8], "expansion_factor": [1.3, 1.5, 2.0]}
 
-        last_range = df["range"].iloc[-1]
-        low_vol = df["range"].iloc[-5:-1].mean() < df["range_mean"].iloc[-1] * 0.7
+    def generate_signals(self, arrays):
+        p = self.params
+        close, open_ = arrays["close"], arrays["open"]
+        bar_range = arrays["high"] - arrays["low"]
+        range_mean = rolling_mean(bar_range, p["window"])
 
-        if low_vol and last_range > df["range_mean"].iloc[-1] * 1.5:
-            if df["close"].iloc[-1] > df["open"].iloc[-1]:
-                return "LONG"
-            elif df["close"].iloc[-1] < df["open"].iloc[-1]:
-                return "SHORT"
+        # previous quiet_bars candles were quiet
+        low_vol = shift(rolling_mean(bar_range, p["quiet_bars"])) < range_mean * p["quiet_factor"]
+        expansion = low_vol & (bar_range > range_mean * p["expansion_factor"])
 
-        return "HOLD"
+        return np.select(
+            [expansion & (close > open_), expansion & (close < open_)],
+            [SIGNAL_LONG, SIGNAL_SHORT],
+            SIGNAL_HOLD
+        ).astype(np.int8)
 
     def name(self):
         return "VolatilityReversalStrategy"
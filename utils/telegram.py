@@ -4,13 +4,15 @@ import requests
 import json
 import time
 import threading
+import multiprocessing
 import os
 import datetime
 import pandas as pd
 from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 from exchange.binance import BinanceFuturesClient
 from core.state_tracker import StateTracker
-from ml.predictor import PredictMarketDirection
+from ml.predictor import PredictMarketDirection, resolve_model_path
+from ml.drift_monitor import drift_report
 
 BASE_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
 LAST_UPDATE_FILE = "telegram_last_update.json"
@@ -57,75 +59,70 @@ def set_last_update_id(update_id):
 
 def handle_status():
     try:
-        pos = StateTracker.load_position_state()
-        if not pos:
-            send_telegram("🟢 No open position.")
+        drift_lines = drift_report() or ["No drift data yet"]
+        drift = "📡 <b>Feature Drift:</b>\n" + "\n".join(drift_lines)
+        positions = StateTracker.load_all_position_states()
+        if not positions:
+            send_telegram("🟢 No open position.\n\n" + drift)
             return
 
-        symbol = "BTCUSDT"
-        side = pos.get("side", "?").upper()
-        strategy = pos.get("strategy", "Unknown")
-        entry = float(pos.get("entry", 0))
-        qty = float(pos.get("qty", 0))
-        leverage = int(pos.get("leverage", 0))
-        timestamp = pos.get("timestamp", None)
-
         client = BinanceFuturesClient()
-        price = client.get_ticker(symbol)
-
-
-        df = client.get_klines(symbol, "15m", limit=150)
-        df = pd.DataFrame(df, columns=[
-            "timestamp", "open", "high", "low", "close", "volume",
-            "close_time", "quote_asset_volume", "number_of_trades",
-            "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume", "ignore"
-        ])
-        df["close"] = df["close"].astype(float)
-
-        predictor = PredictMarketDirection()
-        ml = predictor.predict(df)
-        proba = predictor.predict_proba(df)
-        print(f"[DEBUG] predict_proba returned: {proba}")
-
-        #confidence = max(proba) * 100 if proba is not None else 0
-        try:
-            confidence = max(proba) * 100
-        except:
-            confidence = proba * 100 if isinstance(proba, (int, float)) else 0
-
-        pnl = (price - entry) * qty if side == "LONG" else (entry - price) * qty
-        pnl_pct = (pnl / (entry * qty)) * 100 if entry and qty else 0
-
-        if timestamp:
-            last_signal_time = datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            last_signal_time = "Unknown"
-
-        model_path = "ml/model_lightgbm.txt"
-        retrain_hours = 24
-        if os.path.exists(model_path):
-            mod_time = os.path.getmtime(model_path)
-            next_retrain_ts = mod_time + (retrain_hours * 3600)
-            next_retrain = datetime.datetime.fromtimestamp(next_retrain_ts).strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            next_retrain = "Unknown"
-
-        msg = (
-            f"📟 <b>TitanBot Status</b>\n\n"
-            f"🪙 <b>Symbol:</b> {symbol}\n"
-            f"📊 <b>Strategy:</b> {strategy}\n"
-            f"💡 <b>Signal:</b> {side}\n"
-            f"🧠 <b>ML Prediction:</b> {ml} ({confidence:.1f}%)\n"
-            f"📈 <b>Entry Price:</b> {entry:.2f}\n"
-            f"📉 <b>Current PnL:</b> {pnl:+.2f} USDT ({pnl_pct:+.2f}%)\n"
-            f"📌 <b>Leverage:</b> {leverage}x | <b>Size:</b> {qty:.3f} BTC\n"
-            f"🔄 <b>Last Signal:</b> {last_signal_time}\n"
-            f"🔁 <b>Next Retrain:</b> {next_retrain}"
-        )
-        send_telegram(msg)
+        blocks = [_position_status(client, pos) for pos in positions]
+        send_telegram("📟 <b>TitanBot Status</b>\n\n" + "\n\n".join(blocks) + "\n\n" + drift)
     except Exception as e:
         send_telegram(f"⚠️ Failed to fetch status: {str(e)}")
 
+def _position_status(client, pos):
+    symbol = pos["symbol"]
+    side = pos.get("side", "?").upper()
+    strategy = pos.get("strategy", "Unknown")
+    entry = float(pos.get("entry", 0))
+    qty = float(pos.get("qty", 0))
+    leverage = int(pos.get("leverage", 0))
+    timestamp = pos.get("timestamp", None)
+    asset = symbol[:-4] if symbol.endswith("USDT") else symbol
+
+    price = client.get_ticker(symbol)
+    df = client.get_klines(symbol, "15m", limit=150).iloc[:-1]   # closed candles, like the live loop
+
+    predictor = PredictMarketDirection(symbol=symbol, timeframe="15m")
+    ml = predictor.predict(df)
+    proba = predictor.predict_proba(df)
+    print(f"[DEBUG] predict_proba returned: {proba}")
+
+    #confidence = max(proba) * 100 if proba is not None else 0
+    try:
+        confidence = max(proba) * 100
+    except:
+        confidence = proba * 100 if isinstance(proba, (int, float)) else 0
+
+    pnl = (price - entry) * qty if side == "LONG" else (entry - price) * qty
+    pnl_pct = (pnl / (entry * qty)) * 100 if entry and qty else 0
+
+    if timestamp:
+        last_signal_time = datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        last_signal_time = "Unknown"
+
+    model_path = resolve_model_path(symbol, "15m")
+    if os.path.exists(model_path):
+        mod_time = os.path.getmtime(model_path)
+        last_retrain = datetime.datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        last_retrain = "Unknown"
+
+    return (
+        f"🪙 <b>Symbol:</b> {symbol}\n"
+        f"📊 <b>Strategy:</b> {strategy}\n"
+        f"💡 <b>Signal:</b> {side}\n"
+        f"🧠 <b>ML Prediction:</b> {ml} ({confidence:.1f}%)\n"
+        f"📈 <b>Entry Price:</b> {entry:.2f}\n"
+        f"📉 <b>Current PnL:</b> {pnl:+.2f} USDT ({pnl_pct:+.2f}%)\n"
+        f"📌 <b>Leverage:</b> {leverage}x | <b>Size:</b> {qty:.3f} {asset}\n"
+        f"🔄 <b>Last Signal:</b> {last_signal_time}\n"
+        f"🔁 <b>Last Retrain:</b> {last_retrain}"
+    )
+
 def handle_cancel():
     try:
         client = BinanceFuturesClient()
@@ -135,12 +132,25 @@ def handle_cancel():
     except Exception as e:
         send_telegram(f"⚠️ Failed to cancel orders: {str(e)}")
 
+def handle_flatten():
+    try:
+        from emergency.kill_switch import emergency_exit
+        report = emergency_exit(None, reason="Manual /flatten")
+        if not report:
+            send_telegram("✅ No open positions to flatten.")
+    except Exception as e:
+        send_telegram(f"⚠️ Failed to flatten positions: {str(e)}")
+
 def handle_summary():
     try:
         from core.strategy_rating import summarize, load_strategy_logs
         stats = summarize(load_strategy_logs())
-        client = BinanceFuturesClient()
-        balance = client.get_balance()
+        from core.account_state import get_account_state
+        account = get_account_state()
+        balance = account.wallet_balance()
+        available = account.available_balance()
+        if balance is None:
+            balance = BinanceFuturesClient().get_balance()
 
         today = datetime.datetime.now().strftime("%Y-%m-%d")
         week = datetime.datetime.now().strftime("%Y-W%U")
@@ -169,6 +179,7 @@ def handle_summary():
             f"📅 Week: {week}\n"
             f"💰 Total PnL This Week: {total_pnl_week:.2f} USDT\n"
             f"💼 Current Balance: {balance:.2f} USDT"
+            + (f"\n🪙 Available Margin: {available:.2f} USDT" if available is not None else "")
         )
         send_telegram(msg)
     except Exception as e:
@@ -309,7 +320,8 @@ def send_command_list():
         "/journal – Today's trade log (CSV)\n"
         "/monthly – This month's total PnL\n"
         "/lifetime – All-time performance\n"
-        "/cancel – Emergency order cancel"
+        "/cancel – Emergency order cancel\n"
+        "/flatten – Close every open position now"
     )
 
 def send_document(file_path, caption=None):
@@ -360,6 +372,8 @@ def poll_telegram():
                     handle_status()
                 elif message == "/cancel":
                     handle_cancel()
+                elif message == "/flatten":
+                    handle_flatten()
                 elif message == "/summary":
                     handle_summary()
                 elif message == "/weekly":
@@ -380,4 +394,6 @@ def poll_telegram():
 
 
 # Start auto daily journaling in background
-threading.Thread(target=auto_daily_journal, daemon=True).start()
+# Once per bot: not again in every worker process that imports this module
+if multiprocessing.parent_process() is None:
+    threading.Thread(target=auto_daily_journal, daemon=True).start()